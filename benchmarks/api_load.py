@@ -0,0 +1,97 @@
+"""
+Prueba de carga del modo servidor: varias terminales simuladas venden en paralelo por la API.
+
+Uso (desde la raíz del proyecto, con el servidor ya corriendo sobre una BD de prueba):
+    python main.py --server
+    python -m benchmarks.api_load [--terminals 8] [--orders 50] [--seed-stock]
+
+Cada terminal es un hilo con su propio ApiClient: agrega 1-3 menús disponibles al carrito
+del servidor y hace checkout. Reporta pedidos/s y latencias del checkout.
+--seed-stock suma stock a todos los ingredientes para que las ventas no se agoten.
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+
+from src.api_client import ApiClient
+from src.config.consts import SERVER_HOST, SERVER_PORT
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def ensure_client(api: ApiClient, terminal: str) -> int:
+    email = f"{terminal}@carga.test"
+    api.register_client(f"Carga {terminal}", email)  # Si ya existe, la API responde ok=false
+    matches = [c for c in api.search_clients(email) if c["email"] == email]
+    return matches[0]["id"]
+
+
+def run_terminal(host, port, terminal, n_orders, menus, results):
+    api = ApiClient(host, port, terminal=terminal)
+    client_id = ensure_client(api, terminal)
+    rng = random.Random(terminal)
+    api.clear_cart()
+
+    for _ in range(n_orders):
+        for menu in rng.sample(menus, k=min(len(menus), rng.randint(1, 3))):
+            api.add_to_cart(menu, rng.randint(1, 2))
+
+        start = time.perf_counter()
+        response = api.checkout(client_id)
+        results.append((response["ok"], (time.perf_counter() - start) * 1000))
+        if not response["ok"]:
+            api.clear_cart()
+    api.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API del servidor POS")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--terminals", type=int, default=8)
+    parser.add_argument("--orders", type=int, default=50, help="Pedidos por terminal")
+    parser.add_argument("--seed-stock", action="store_true")
+    args = parser.parse_args()
+
+    api = ApiClient(args.host, args.port)
+    if args.seed_stock:
+        for ing in api.get_ingredients():
+            api.add_ingredient(ing["name"], ing["unit"], 100000)
+
+    menus = [m["name"] for m in api.get_menus()["available"]]
+    if not menus:
+        print("No hay menús disponibles: cargue stock o use --seed-stock.")
+        return
+
+    results = []
+    threads = [
+        threading.Thread(target=run_terminal, args=(args.host, args.port, f"caja-{i + 1}", args.orders, menus, results))
+        for i in range(args.terminals)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = [ms for _, ms in results]
+    ok = sum(1 for success, _ in results if success)
+    print(f"Terminales: {args.terminals} | Pedidos: {len(results)} ({ok} ok, {len(results) - ok} rechazados)")
+    print(f"Duración: {elapsed:.2f} s | Rendimiento: {ok / elapsed:.1f} pedidos/s")
+    if latencies:
+        print(f"Checkout (ms): p50 {percentile(latencies, 50):.1f} | p95 {percentile(latencies, 95):.1f} | "
+              f"p99 {percentile(latencies, 99):.1f} | media {statistics.mean(latencies):.1f}")
+    metrics = api.request("GET", "/metrics")
+    print(f"Servidor: {metrics['requests']} peticiones, {metrics['writes']} escrituras, {metrics['errors']} errores")
+    api.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Respaldo en caliente con la caja vendiendo: latencia de los pedidos sin respaldo, con el
+respaldo por pasos (src/utils/backup.py) y con VACUUM INTO, más la duración de cada copia.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.backup [--preset small] [--rate 20] [--db /tmp/bench.db]
+                                [--step-pages 64] [--pause-ms 5]
+
+Un hilo vende a --rate pedidos/s (OrderService.process_order, como una terminal) mientras
+otro respalda en bucle durante la fase. Se informa p50/p95/máx del tiempo de servicio de
+los pedidos y, por respaldo, páginas, pasos, reinicios y segundos. Cada respaldo se verifica
+(PRAGMA integrity_check) antes de darlo por bueno.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.datagen import PRESETS, create_database, generate_preset, set_stock
+from benchmarks.terminals import percentile
+from src.config.database import db
+from src.services.client_service import ClientService
+from src.services.menu_service import MenuService
+from src.services.order_service import OrderService
+from src.utils import backup
+
+
+def sell(rate: float, stop: threading.Event, latencies: list, failures: list):
+    orders, catalog = OrderService(), MenuService().get_all_menus()
+    client_id = ClientService().search_clients("", 1)[0].id
+    interval, i = 1.0 / rate, 0
+    next_at = time.perf_counter()
+    while not stop.is_set():
+        menu = catalog[i % len(catalog)]
+        started = time.perf_counter()
+        success, msg, _ = orders.process_order(client_id, [{"menu_name": menu.name, "quantity": 1, "price": menu.price}])
+        latencies.append((time.perf_counter() - started) * 1000)
+        if not success:
+            failures.append(msg)
+        i += 1
+        next_at += interval
+        time.sleep(max(0.0, next_at - time.perf_counter()))
+
+
+def phase(name: str, seconds: float, rate: float, copy=None):
+    latencies, failures, copies = [], [], []
+    stop = threading.Event()
+    seller = threading.Thread(target=sell, args=(rate, stop, latencies, failures))
+    seller.start()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        if copy is None:
+            time.sleep(0.1)
+        else:
+            copies.append(copy())
+    stop.set()
+    seller.join()
+
+    line = (f"{name:<22} {len(latencies):>7} {percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f} "
+            f"{max(latencies, default=0):>8.1f} {len(failures):>7}")
+    if copies:
+        line += (f"  | {len(copies)} copias, {sum(c.seconds for c in copies) / len(copies):.2f} s prom., "
+                 f"reinicios {sum(c.restarts for c in copies)}, métodos {sorted({c.method for c in copies})}")
+    print(line)
+    for msg in failures[:3]:
+        print(f"    fallo: {msg[:120]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Respaldo en caliente durante la venta")
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--db", help="BD existente (se respalda una copia, no el original)")
+    parser.add_argument("--rate", type=float, default=20.0, help="Pedidos por segundo durante cada fase")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duración de cada fase")
+    parser.add_argument("--step-pages", type=int, default=backup.BACKUP_STEP_PAGES)
+    parser.add_argument("--pause-ms", type=float, default=backup.BACKUP_PAUSE_MS)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_backup_")
+    db_path = os.path.join(work_dir, "caja.db")
+    if args.db:
+        shutil.copyfile(os.path.abspath(args.db), db_path)
+    else:
+        generate_preset(create_database(db_path), args.preset)
+    db.configure(db_path)
+    db.create_tables()
+    with db._engine.begin() as connection:
+        set_stock(connection, 1e9)   # Sin rechazos por stock
+
+    snapshots = os.path.join(work_dir, "respaldos")
+    copy_steps = lambda: backup.online_backup(db_path, backup.snapshot_path(db_path, snapshots),
+                                              args.step_pages, args.pause_ms)
+    copy_vacuum = lambda: backup.vacuum_backup(db_path, backup.snapshot_path(db_path, snapshots))
+
+    size_mb = os.path.getsize(db_path) / 1e6
+    print(f"BD {size_mb:.1f} MB en {db_path} | {args.rate:.0f} pedidos/s | pasos de {args.step_pages} páginas, "
+          f"pausa {args.pause_ms} ms\n")
+    print(f"{'Fase':<22} {'pedidos':>7} {'p50 ms':>8} {'p95 ms':>8} {'máx ms':>8} {'fallos':>7}")
+    phase("sin respaldo", args.seconds, args.rate)
+    phase("respaldo por pasos", args.seconds, args.rate, copy_steps)
+    phase("VACUUM INTO", args.seconds, args.rate, copy_vacuum)
+
+    ok, msg = backup.verify(backup.list_backups(db_path, snapshots)[0])
+    print(f"\nÚltimo respaldo: {msg}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
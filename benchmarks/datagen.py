@@ -0,0 +1,188 @@
+"""
+Generador de datos sintéticos para los benchmarks: ingredientes, menús con receta,
+clientes, pedidos y detalles, con volúmenes configurables.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.datagen /tmp/bench.db --preset medium
+    python -m benchmarks.datagen /tmp/bench.db --clients 1000 --orders 20000
+
+También se usa como módulo: create_database(ruta) + generate(manager, ...) o generate_preset().
+
+- Sin --ingredients/--menus se usan solo los menús por defecto (migración de datos semilla).
+- Las fechas de los pedidos siguen una distribución realista por hora (peaks de almuerzo y
+  cena) y por día de la semana (más ventas viernes y sábado).
+- La inserción es en bloque con executemany por lotes, así 'large' (~5M líneas) no necesita
+  tener todo en memoria.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from src.config.database import DatabaseManager
+
+# Volúmenes por preset. 'orders' con max_lines=5 da ~3 líneas por pedido.
+PRESETS = {
+    "tiny": {"ingredients": 0, "menus": 0, "clients": 200, "orders": 2_000},
+    "small": {"ingredients": 500, "menus": 100, "clients": 5_000, "orders": 20_000},
+    "medium": {"ingredients": 2_000, "menus": 500, "clients": 20_000, "orders": 200_000},
+    "large": {"ingredients": 10_000, "menus": 2_000, "clients": 100_000, "orders": 1_700_000},
+}
+
+# Peso relativo de ventas por hora del día (0-23): almuerzo 12-15 h y cena 19-22 h
+HOUR_WEIGHTS = [0, 0, 0, 0, 0, 0, 0, 1, 2, 3, 4, 8, 20, 26, 18, 7, 5, 6, 9, 15, 17, 12, 5, 1]
+# Lunes (0) a domingo (6)
+WEEKDAY_WEIGHTS = [0.8, 0.85, 0.9, 1.0, 1.3, 1.4, 1.1]
+
+BATCH_SIZE = 50_000
+UNITS = ["kg", "unid", "lt"]
+
+
+# Stock actual de cada ingrediente: foto + movimientos posteriores (ver IngredientCRUD.stock_column)
+CURRENT_STOCK_SQL = """
+    SELECT i.id, i.quantity + COALESCE((SELECT SUM(m.quantity) FROM ingredient_movements m
+                                        WHERE m.ingredient_id = i.id AND m.id > i.snapshot_movement_id), 0)
+    FROM ingredients i
+"""
+
+
+def set_stock(connection, stock: float):
+    """Deja todos los ingredientes con 'stock' como foto nueva (los movimientos previos quedan cubiertos)."""
+    connection.execute(text("""
+        UPDATE ingredients SET quantity = :stock,
+            snapshot_movement_id = (SELECT COALESCE(MAX(id), 0) FROM ingredient_movements)
+    """), {"stock": stock})
+
+
+def create_database(path: str) -> DatabaseManager:
+    """BD nueva en 'path' (absoluta) con el esquema y los menús por defecto."""
+    if os.path.exists(path):
+        os.remove(path)
+    manager = DatabaseManager(os.path.abspath(path))
+    manager.create_tables()
+    return manager
+
+
+def order_dates(rng: random.Random, count: int, days: int, now: datetime):
+    """Fechas de pedido repartidas en los últimos 'days' días según hora y día de la semana."""
+    start_day = (now - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    day_list = [start_day + timedelta(days=i) for i in range(days)]
+    day_weights = [WEEKDAY_WEIGHTS[day.weekday()] for day in day_list]
+    chosen_days = rng.choices(day_list, weights=day_weights, k=count)
+    hours = rng.choices(range(24), weights=HOUR_WEIGHTS, k=count)
+    for day, hour in zip(chosen_days, hours):
+        yield day + timedelta(hours=hour, seconds=rng.randrange(3600))
+
+
+def _next_id(connection, table: str) -> int:
+    return (connection.execute(text(f"SELECT MAX(id) FROM {table}")).scalar() or 0) + 1
+
+
+def _insert_catalog(connection, rng, ingredients: int, menus: int, stock: float):
+    """Ingredientes y menús sintéticos (2-8 ingredientes por receta)."""
+    first = _next_id(connection, "ingredients")
+    connection.exec_driver_sql(
+        "INSERT INTO ingredients (id, name, unit, quantity) VALUES (?, ?, ?, ?)",
+        [(first + i, f"Ingrediente {first + i}", rng.choice(UNITS), stock) for i in range(ingredients)]
+    )
+    ingredient_ids = [row[0] for row in connection.execute(text("SELECT id FROM ingredients"))]
+
+    first = _next_id(connection, "menu_items")
+    connection.exec_driver_sql(
+        "INSERT INTO menu_items (id, name, price, description, image_path) VALUES (?, ?, ?, '', NULL)",
+        [(first + i, f"Menú {first + i}", float(rng.randrange(1000, 15000, 100))) for i in range(menus)]
+    )
+    recipes = []
+    for menu_id in range(first, first + menus):
+        for ingredient_id in rng.sample(ingredient_ids, k=min(len(ingredient_ids), rng.randint(2, 8))):
+            recipes.append((menu_id, ingredient_id, round(rng.uniform(0.05, 2.0), 2)))
+    connection.exec_driver_sql(
+        "INSERT INTO recipes (menu_item_id, ingredient_id, required_quantity) VALUES (?, ?, ?)", recipes
+    )
+
+
+def generate(manager: DatabaseManager, clients: int = 1000, orders: int = 20000, max_lines: int = 5,
+             ingredients: int = 0, menus: int = 0, days: int = 365, stock: float = 1_000_000,
+             seed: int = 42, progress: bool = False) -> dict:
+    rng = random.Random(seed)
+    now = datetime.now()
+    started = time.perf_counter()
+    detail_count = 0
+
+    with manager._engine.begin() as connection:
+        # Solo para esta conexión de carga: sin fsync por lote (la BD es desechable)
+        connection.exec_driver_sql("PRAGMA synchronous = OFF")
+        set_stock(connection, stock)
+        if ingredients or menus:
+            _insert_catalog(connection, rng, ingredients, menus, stock)
+        menu_list = connection.execute(text("SELECT id, name, price FROM menu_items")).all()
+
+        first_client = _next_id(connection, "clients")
+        connection.exec_driver_sql("INSERT INTO clients (id, name, email) VALUES (?, ?, ?)", [
+            (first_client + i, f"Cliente {first_client + i}", f"cliente{first_client + i}@bench.cl") for i in range(clients)
+        ])
+        client_ids = range(first_client, first_client + clients)
+
+        order_id = _next_id(connection, "orders")
+        dates = order_dates(rng, orders, days, now)
+        remaining = orders
+        while remaining > 0:
+            batch = min(BATCH_SIZE, remaining)
+            order_rows, detail_rows = [], []
+            for _ in range(batch):
+                total = 0.0
+                for menu_id, name, price in rng.sample(menu_list, k=rng.randint(1, min(max_lines, len(menu_list)))):
+                    quantity = rng.randint(1, 3)
+                    total += price * quantity
+                    detail_rows.append((order_id, menu_id, quantity, price * quantity, name, price))
+                order_rows.append((order_id, rng.choice(client_ids), next(dates).strftime("%Y-%m-%d %H:%M:%S.%f"), total))
+                order_id += 1
+
+            connection.exec_driver_sql("INSERT INTO orders (id, client_id, date, total) VALUES (?, ?, ?, ?)", order_rows)
+            connection.exec_driver_sql("""
+                INSERT INTO order_details (order_id, menu_item_id, quantity, subtotal, menu_name, unit_price)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, detail_rows)
+            detail_count += len(detail_rows)
+            remaining -= batch
+            if progress:
+                print(f"  {orders - remaining:,}/{orders:,} pedidos ({time.perf_counter() - started:.0f} s)")
+
+        connection.execute(text("ANALYZE"))
+
+    return {"ingredients": ingredients, "menus": menus, "clients": clients, "orders": orders, "details": detail_count}
+
+
+def generate_preset(manager: DatabaseManager, preset: str, seed: int = 42, progress: bool = False) -> dict:
+    return generate(manager, seed=seed, progress=progress, **PRESETS[preset])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera una BD de prueba con datos sintéticos")
+    parser.add_argument("path")
+    parser.add_argument("--preset", choices=PRESETS, help="Volúmenes predefinidos (se pueden sobrescribir)")
+    parser.add_argument("--ingredients", type=int)
+    parser.add_argument("--menus", type=int)
+    parser.add_argument("--clients", type=int)
+    parser.add_argument("--orders", type=int)
+    parser.add_argument("--max-lines", type=int, default=5)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    volumes = dict(PRESETS[args.preset]) if args.preset else {"clients": 1000, "orders": 20000}
+    for key in ("ingredients", "menus", "clients", "orders"):
+        if getattr(args, key) is not None:
+            volumes[key] = getattr(args, key)
+
+    started = time.perf_counter()
+    manager = create_database(args.path)
+    counts = generate(manager, max_lines=args.max_lines, days=args.days, seed=args.seed, progress=True, **volumes)
+    print(f"BD generada en {args.path} en {time.perf_counter() - started:.1f} s: {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Diario de pedidos contra el camino directo: pedidos confirmados por segundo y latencia que
+ve el cajero con process_order grabando en SQLite o confirmando en el diario
+(src/utils/order_journal.py), y verificación de que el aplicador deja la BD igual.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.journal [--preset small] [--cashiers 4] [--seconds 10] [--group-ms 2]
+
+Cada modo trabaja sobre su propia copia de la misma BD sintética, con stock de sobra. Las
+cajas (hilos) venden en lazo cerrado: un pedido apenas se confirma el anterior. Al final
+del modo con diario se espera al aplicador y se compara el stock descontado y la cantidad
+de pedidos en la BD con lo que se confirmó a las cajas.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import text
+
+from benchmarks.datagen import CURRENT_STOCK_SQL, PRESETS, create_database, generate_preset, set_stock
+from benchmarks.terminals import percentile
+from src.config.database import db
+from src.crud.menu_crud import MenuCRUD
+from src.services.client_service import ClientService
+from src.services.menu_service import MenuService
+from src.services.order_service import OrderService
+
+
+def cashier(seed: int, stop: threading.Event, latencies: list, sold: Counter, failures: list):
+    rng = random.Random(seed)
+    service, catalog = OrderService(), MenuService().get_all_menus()
+    client_ids = [client.id for client in ClientService().search_clients("", 200)]
+    while not stop.is_set():
+        menu = rng.choice(catalog)
+        started = time.perf_counter()
+        success, msg, _ = service.process_order(rng.choice(client_ids), [{"menu_name": menu.name, "quantity": 1, "price": menu.price}])
+        latencies.append((time.perf_counter() - started) * 1000)
+        if success:
+            sold[menu.id] += 1
+        else:
+            failures.append(msg)
+
+
+def snapshot():
+    with db._engine.connect() as connection:
+        stock = dict(connection.execute(text(CURRENT_STOCK_SQL)).all())
+        orders = connection.execute(text("SELECT COUNT(*) FROM orders")).scalar()
+    return stock, orders
+
+
+def expected_deductions(sold: Counter) -> dict:
+    session_gen = db.get_session()
+    session = next(session_gen)
+    try:
+        totals = Counter()
+        for menu_id, count in sold.items():
+            for ingredient_id, quantity in MenuCRUD.flatten_recipe(session, menu_id).items():
+                totals[ingredient_id] += quantity * count
+        return totals
+    finally:
+        session.close()
+
+
+def run_mode(name: str, base_path: str, work_dir: str, args) -> list:
+    db_path = os.path.join(work_dir, f"{name}.db")
+    shutil.copyfile(base_path, db_path)
+    db.configure(db_path)
+    if name == "diario":
+        db.start_journal(True, group_ms=args.group_ms)
+    before_stock, before_orders = snapshot()
+
+    latencies, sales, failures = [[] for _ in range(args.cashiers)], [Counter() for _ in range(args.cashiers)], []
+    stop = threading.Event()
+    threads = [threading.Thread(target=cashier, args=(42 + i, stop, latencies[i], sales[i], failures)) for i in range(args.cashiers)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    sold = sum(sales, Counter())
+
+    drain_ms, stats = 0.0, {}
+    if db.journal is not None:
+        drain_started = time.perf_counter()
+        db.journal.wait_applied()
+        drain_ms = (time.perf_counter() - drain_started) * 1000
+        stats = dict(db.journal.stats)
+        db.stop_journal()
+
+    all_latencies = [value for per_cashier in latencies for value in per_cashier]
+    acked = sum(sold.values())
+    print(f"{name:<9} {acked / elapsed:>10.1f} {percentile(all_latencies, 50):>8.2f} {percentile(all_latencies, 99):>8.2f} "
+          f"{max(all_latencies, default=0):>8.1f} {len(failures):>7} {drain_ms:>12.0f}")
+    if stats:
+        print(f"          fsyncs {stats['fsyncs']} ({acked / max(1, stats['fsyncs']):.1f} pedidos/fsync), "
+              f"lotes aplicados {stats['batches']} ({stats['applied'] / max(1, stats['batches']):.1f} pedidos/lote), "
+              f"compactaciones {stats['compactions']}")
+
+    # Consistencia: lo que se confirmó a las cajas es exactamente lo que quedó en la BD
+    errors = []
+    after_stock, after_orders = snapshot()
+    if after_orders - before_orders != acked:
+        errors.append(f"{name}: {after_orders - before_orders} pedidos en BD, {acked} confirmados")
+    for ingredient_id, amount in expected_deductions(sold).items():
+        deducted = before_stock[ingredient_id] - after_stock[ingredient_id]
+        if abs(deducted - amount) > 1e-6 * max(1.0, amount):
+            errors.append(f"{name}: ingrediente {ingredient_id} descontado {deducted:.3f}, esperado {amount:.3f}")
+    for msg in failures[:3]:
+        print(f"    fallo: {msg[:120]}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diario de pedidos contra escritura directa")
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--db", help="BD existente (se trabaja sobre copias)")
+    parser.add_argument("--cashiers", type=int, default=4, help="Cajas vendiendo a la vez (hilos)")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--group-ms", type=float, default=2.0, help="Ventana de confirmación en grupo del diario")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_journal_")
+    base_path = os.path.join(work_dir, "base.db")
+    if args.db:
+        shutil.copyfile(os.path.abspath(args.db), base_path)
+    else:
+        generate_preset(create_database(base_path), args.preset)
+    db.configure(base_path)
+    db.create_tables()
+    with db._engine.begin() as connection:
+        set_stock(connection, 1e9)   # Sin rechazos por stock
+    db._engine.dispose()
+
+    print(f"{args.cashiers} cajas en lazo cerrado, {args.seconds:.0f} s por modo, {os.cpu_count()} núcleos, en {work_dir}\n")
+    print(f"{'Modo':<9} {'pedidos/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'máx ms':>8} {'fallos':>7} {'aplicar ms':>12}")
+    errors = run_mode("directo", base_path, work_dir, args) + run_mode("diario", base_path, work_dir, args)
+    print("\nConsistencia: " + ("OK (BD = lo confirmado a las cajas)" if not errors else "FALLA\n  " + "\n  ".join(errors)))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Libro de movimientos de stock: costo de leer el stock actual y el stock a una fecha con
+fotos periódicas, contra sumar todo el historial, y cuánto pesa el delta sin materializar.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.ledger [--preset small] [--movements 200000] [--snapshot-every 5000] [--runs 5]
+
+Sobre una BD sintética se registran --movements movimientos repartidos en 30 días (entregas,
+ventas y mermas), tomando una foto (IngredientCRUD.take_snapshot) cada --snapshot-every. Se
+mide y se verifica contra la suma completa del historial:
+- stock actual (IngredientService.get_all_ingredients) y disponibilidad de la carta;
+- stock a 20 fechas al azar (IngredientService.get_stock_at);
+- lo mismo con --snapshot-every movimientos aún sin materializar;
+- que una baja de ingrediente después de una foto no deje movimientos nuevos sin sumar.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from benchmarks.datagen import PRESETS, create_database, generate_preset, set_stock
+from src.config.database import db
+from src.crud.ingredient_crud import IngredientCRUD
+from src.models import IngredientMovementModel
+from src.services.ingredient_service import IngredientService
+from src.services.menu_service import MenuService
+
+FULL_SCAN_SQL = """
+    SELECT i.id, COALESCE((SELECT SUM(m.quantity) FROM ingredient_movements m
+                           WHERE m.ingredient_id = i.id AND m.date <= :when), 0)
+    FROM ingredients i ORDER BY i.id
+"""
+
+
+def best_of(runs: int, fn) -> float:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return min(times)
+
+
+def fill_ledger(rng: random.Random, movements: int, every: int, start: datetime, days: int) -> int:
+    """Registra los movimientos en bloques de 'every', con una foto al final de cada bloque."""
+    with db._engine.connect() as connection:
+        ingredient_ids = [row[0] for row in connection.execute(text("SELECT id FROM ingredients"))]
+    step = timedelta(days=days) / movements
+    snapshots = 0
+    with db._engine.begin() as connection:
+        set_stock(connection, 0.0)   # Todo el stock sale del libro: la suma completa es la referencia
+        connection.execute(insert(IngredientMovementModel), [
+            {"ingredient_id": ingredient_id, "kind": "entrega", "quantity": 1e6, "date": start} for ingredient_id in ingredient_ids
+        ])
+
+    for first in range(0, movements, every):
+        rows = []
+        for i in range(first, min(movements, first + every)):
+            kind = rng.choices(["venta", "entrega", "merma"], weights=[90, 8, 2])[0]
+            amount = rng.uniform(0.5, 3) * (50 if kind == "entrega" else -1)
+            rows.append({"ingredient_id": rng.choice(ingredient_ids), "kind": kind, "quantity": amount,
+                         "date": start + step * (i + 1)})
+        session_gen = db.get_session()
+        session = next(session_gen)
+        try:
+            IngredientCRUD.add_movements(session, rows)
+            if first + every < movements:   # El último bloque queda sin materializar
+                IngredientCRUD.take_snapshot(session, rows[-1]["date"])
+                snapshots += 1
+            session.commit()
+        finally:
+            session.close()
+    return snapshots
+
+
+def check(service: IngredientService, when: datetime) -> int:
+    """Ingredientes cuyo stock a 'when' difiere de la suma completa del historial."""
+    with db._engine.connect() as connection:
+        expected = dict(connection.execute(text(FULL_SCAN_SQL), {"when": when}).all())
+    return sum(abs(row.quantity - expected[row.id]) > 1e-6 * max(1.0, abs(row.quantity)) for row in service.get_stock_at(when))
+
+
+def check_deleted_ids(service: IngredientService) -> int:
+    """
+    Borrar un ingrediente después de una foto no debe liberar ids por debajo de la marca de
+    los demás: alta de dos ingredientes, foto, baja del segundo y entrega al primero.
+    Retorna 1 si la entrega no se suma al stock.
+    """
+    for name in ("Control A", "Control B"):
+        service.add_ingredient(name, "unid", 1.0)
+    service.take_stock_snapshot()
+    service.delete_ingredient("Control B")
+    session_gen = db.get_session()
+    session = next(session_gen)
+    try:
+        ingredient = IngredientCRUD.get_by_name(session, "Control A")
+        IngredientCRUD.add_movement(session, ingredient.id, "entrega", 100.0)
+        session.commit()
+        stock = IngredientCRUD.get_quantities(session, [ingredient.id])[ingredient.id]
+    finally:
+        session.close()
+    service.delete_ingredient("Control A")
+    return 0 if abs(stock - 101.0) < 1e-9 else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Libro de movimientos de stock con fotos periódicas")
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--movements", type=int, default=200_000)
+    parser.add_argument("--snapshot-every", type=int, default=5_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_ledger_"), "ledger.db")
+    generate_preset(create_database(path), args.preset)
+    db.configure(path)
+    start = datetime.now() - timedelta(days=31)
+    rng = random.Random(42)
+
+    started = time.perf_counter()
+    snapshots = fill_ledger(rng, args.movements, args.snapshot_every, start, 30)
+    print(f"{args.movements} movimientos y {snapshots} fotos en {time.perf_counter() - started:.1f} s ({path})")
+
+    service, menus = IngredientService(), MenuService()
+    dates = [start + timedelta(days=rng.uniform(0, 30)) for _ in range(20)]
+    mismatches = sum(check(service, when) for when in dates) + check(service, datetime.now())
+    reused = check_deleted_ids(service)
+
+    def full_scan():
+        with db._engine.connect() as connection:
+            for when in dates:
+                connection.execute(text(FULL_SCAN_SQL), {"when": when}).all()
+
+    print(f"\n{'Consulta':<44} {'ms':>9}")
+    rows = [
+        (f"stock actual ({args.snapshot_every} mov. sin foto)", lambda: service.get_all_ingredients()),
+        (f"carta ({args.snapshot_every} mov. sin foto)", lambda: menus.get_all_menus()),
+        ("stock a 20 fechas (foto + delta)", lambda: [service.get_stock_at(when) for when in dates]),
+        ("stock a 20 fechas (suma de todo el historial)", full_scan),
+    ]
+    for name, fn in rows:
+        print(f"{name:<44} {best_of(args.runs, fn):>9.1f}")
+
+    service.take_stock_snapshot()
+    print(f"{'stock actual (recién materializado)':<44} {best_of(args.runs, service.get_all_ingredients):>9.1f}")
+    print(f"{'carta (recién materializado)':<44} {best_of(args.runs, menus.get_all_menus):>9.1f}")
+
+    print("\nVerificación contra el historial completo: " + ("OK" if not mismatches else f"FALLA ({mismatches} diferencias)"))
+    print("Alta, foto, baja y entrega (ids no reutilizados): " + ("OK" if not reused else "FALLA (la entrega no suma)"))
+    return 1 if mismatches or reused else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Estadísticas de varios locales: consulta secuencial (un shard tras otro) contra la
+consulta en paralelo de StatisticsService (*_all_locations), y verificación de la mezcla.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.locations [--locations 4] [--preset small] [--runs 3] [--dir /tmp/locales]
+
+Cada local es una BD sintética propia (benchmarks/datagen.py, semilla distinta por local);
+si ya existen en --dir se reutilizan. El primer local ocupa la instancia global 'db' (local
+por defecto) y los demás se registran en 'locations'.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.datagen import PRESETS, create_database, generate_preset
+from src.config.database import db, locations
+from src.services.statistics_service import StatisticsService
+
+METHODS = ["get_sales_data", "get_popular_menus_data", "get_ingredient_usage_data"]
+
+
+def prepare_shards(directory: str, count: int, preset: str) -> list:
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"local_{i}.db")
+        if not os.path.exists(path):
+            print(f"Generando {path} ({preset})...")
+            generate_preset(create_database(path), preset, seed=42 + i)
+        paths.append(path)
+    return paths
+
+
+def sequential(method: str):
+    """Referencia: un local tras otro, con el mismo servicio que usa la interfaz."""
+    return {name: getattr(StatisticsService(name), method)() for name in locations.names()}
+
+
+def best_of(runs: int, fn) -> float:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return min(times)
+
+
+def check_merge(service: StatisticsService) -> list:
+    """Diferencias entre el total mezclado y la suma de los totales por local."""
+    errors = []
+    per_location = {method: sequential(method) for method in METHODS}
+    expected = {
+        "ventas": sum(data["total"].sum() for ok, data in per_location["get_sales_data"].values() if ok),
+        "menús": sum(data["total_qty"].sum() for ok, data in per_location["get_popular_menus_data"].values() if ok),
+        "ingredientes": sum(data["total_used"].sum() for ok, data in per_location["get_ingredient_usage_data"].values() if ok),
+    }
+    merged = {
+        "ventas": service.get_sales_data_all_locations()[1]["total"].sum(),
+        "menús": service.get_popular_menus_data_all_locations()[1]["total_qty"].sum(),
+        "ingredientes": service.get_ingredient_usage_data_all_locations()[1]["total_used"].sum(),
+    }
+    for key, value in expected.items():
+        if abs(merged[key] - value) > 1e-6 * max(1.0, abs(value)):
+            errors.append(f"{key}: mezclado {merged[key]:.2f}, suma por local {value:.2f}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estadísticas en paralelo sobre varios locales")
+    parser.add_argument("--locations", type=int, default=4)
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--dir", help="Carpeta de los shards (por defecto una temporal)")
+    args = parser.parse_args()
+
+    directory = os.path.abspath(args.dir or tempfile.mkdtemp(prefix="bench_locations_"))
+    os.makedirs(directory, exist_ok=True)
+    paths = prepare_shards(directory, args.locations, args.preset)
+
+    db.configure(paths[0])
+    locations.current = locations.default_name
+    for i, path in enumerate(paths[1:], start=1):
+        locations.register(f"local_{i}", path)
+    service = StatisticsService()
+
+    # Con un solo núcleo y la BD en caché el paralelo no puede ganar: el trabajo es de CPU
+    print(f"\n{args.locations} locales ({args.preset}) en {directory}, mejor de {args.runs}, "
+          f"{os.cpu_count()} núcleos")
+    print(f"{'Consulta':<28} {'secuencial ms':>14} {'paralelo ms':>12} {'aceleración':>12}")
+    for method in METHODS:
+        sequential(method)   # Calentamiento: migraciones, conexiones e importación de pandas
+        serial_ms = best_of(args.runs, lambda: sequential(method))
+        parallel_ms = best_of(args.runs, getattr(service, f"{method}_all_locations"))
+        print(f"{method:<28} {serial_ms:>14.1f} {parallel_ms:>12.1f} {serial_ms / parallel_ms:>11.2f}x")
+
+    errors = check_merge(service)
+    print("\nMezcla: " + ("OK (totales = suma por local)" if not errors else "FALLA\n  " + "\n  ".join(errors)))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+Modo sin conexión: latencia de venta contra la cola local con la BD bloqueada y pedidos por
+segundo al sincronizar la cola (src/utils/offline_queue.py) según el tamaño de lote.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.offline [--preset small] [--orders 2000] [--cashiers 2] [--batches 1,50,200,1000]
+
+1. Sobre una BD sintética con stock de sobra, otra conexión toma un bloqueo exclusivo (como
+   una escritura larga de otra caja o un respaldo con VACUUM) y las cajas venden --orders
+   pedidos con process_order: el primero espera el tiempo de espera de SQLite y pasa a modo
+   sin conexión; los demás van directo a la cola local.
+2. Se libera el bloqueo y se deja sin stock --conflicts ingredientes usados (otra caja los
+   vendió mientras tanto), para que parte de la cola llegue en conflicto.
+3. Cada tamaño de lote sincroniza su propia copia de la BD y de la cola. Se verifica que
+   todos los pedidos queden en la BD una sola vez y que los conflictos sean los mismos.
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import text
+
+from benchmarks.datagen import PRESETS, create_database, generate_preset, set_stock
+from benchmarks.terminals import percentile
+from src.config.database import db
+from src.services.client_service import ClientService
+from src.services.menu_service import MenuService
+from src.services.order_service import OrderService
+from src.utils.offline_queue import OfflineQueue
+
+
+def cashier(seed: int, count: int, catalog: list, client_ids: list, latencies: list, failures: list):
+    rng, service = random.Random(seed), OrderService()
+    for _ in range(count):
+        cart = [{"menu_name": menu.name, "quantity": rng.randint(1, 3), "price": menu.price}
+                for menu in rng.sample(catalog, rng.randint(1, 3))]
+        started = time.perf_counter()
+        success, msg, _ = service.process_order(rng.choice(client_ids), cart)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if not success:
+            failures.append(msg)
+
+
+def take_offline(db_path: str, queue_path: str, args) -> tuple[list, list]:
+    """Vende con la BD bloqueada. Retorna (latencias ms, fallos)."""
+    db.configure(db_path)
+    db.offline = OfflineQueue(db, queue_path, retry_seconds=3600)   # Sin hilo: la sincronización se mide aparte
+    db.offline.refresh()
+    # Carta y clientes se leen antes del bloqueo (la búsqueda de clientes no tiene copia local)
+    catalog = [menu for menu in MenuService().get_all_menus() if menu.available]
+    client_ids = [client.id for client in ClientService().search_clients("", 200)]
+
+    blocker = sqlite3.connect(db_path, isolation_level=None)
+    blocker.execute("BEGIN EXCLUSIVE")
+    latencies, failures = [[] for _ in range(args.cashiers)], []
+    per_cashier = args.orders // args.cashiers
+    threads = [threading.Thread(target=cashier, args=(42 + i, per_cashier, catalog, client_ids, latencies[i], failures))
+               for i in range(args.cashiers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    blocker.execute("ROLLBACK")
+    blocker.close()
+
+    db.offline.store.close()
+    db.offline = None
+    db._engine.dispose()
+    return [value for values in latencies for value in values], failures
+
+
+def starve_ingredients(db_path: str, count: int, seed: int = 7) -> list:
+    """Deja en cero el stock de 'count' ingredientes usados en recetas (vendidos por otra caja)."""
+    db.configure(db_path)
+    with db._engine.begin() as connection:
+        used = [row[0] for row in connection.execute(text(
+            "SELECT DISTINCT ingredient_id FROM recipes WHERE ingredient_id IS NOT NULL ORDER BY ingredient_id"
+        ))]
+        starved = random.Random(seed).sample(used, min(count, len(used)))
+        for ingredient_id in starved:
+            connection.execute(text("""
+                INSERT INTO ingredient_movements (ingredient_id, kind, quantity, date, note)
+                SELECT id, 'ajuste', -(quantity + COALESCE((SELECT SUM(m.quantity) FROM ingredient_movements m
+                    WHERE m.ingredient_id = ingredients.id AND m.id > ingredients.snapshot_movement_id), 0)),
+                    :now, 'benchmark' FROM ingredients WHERE id = :id
+            """), {"id": ingredient_id, "now": "2000-01-01 00:00:00.000000"})
+    db._engine.dispose()
+    return starved
+
+
+def run_sync(name: str, db_path: str, queue_path: str, work_dir: str, batch: int) -> dict:
+    db_copy, queue_copy = os.path.join(work_dir, f"{name}.db"), os.path.join(work_dir, f"{name}.offline.db")
+    shutil.copyfile(db_path, db_copy)
+    shutil.copyfile(queue_path, queue_copy)
+    db.configure(db_copy)
+    queue = OfflineQueue(db, queue_copy, retry_seconds=3600, sync_batch=batch)
+    queued = queue.backlog()
+
+    started = time.perf_counter()
+    processed = queue.sync()
+    elapsed = time.perf_counter() - started
+
+    with db._engine.connect() as connection:
+        in_db = connection.execute(text("SELECT COUNT(*) FROM orders WHERE offline_id IS NOT NULL")).scalar()
+        distinct = connection.execute(text("SELECT COUNT(DISTINCT offline_id) FROM orders WHERE offline_id IS NOT NULL")).scalar()
+    result = {
+        "batch": batch, "queued": queued, "processed": processed, "seconds": elapsed, "in_db": in_db,
+        "distinct": distinct, "conflicts": queue.stats["conflicts"], "rejected": queue.stats["rejected"],
+        "backlog": queue.backlog(), "conflict_rows": [row[:5] for row in queue.conflicts()],
+    }
+    queue.store.close()
+    db._engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cola de ventas sin conexión y su sincronización")
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--orders", type=int, default=2000, help="Pedidos vendidos con la BD bloqueada")
+    parser.add_argument("--cashiers", type=int, default=2, help="Cajas vendiendo a la vez (hilos)")
+    parser.add_argument("--conflicts", type=int, default=3, help="Ingredientes que otra caja agota mientras tanto")
+    parser.add_argument("--batches", default="1,50,200,1000", help="Tamaños de lote a comparar")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_offline_")
+    db_path, queue_path = os.path.join(work_dir, "base.db"), os.path.join(work_dir, "base.offline.db")
+    generate_preset(create_database(db_path), args.preset)
+    db.configure(db_path)
+    db.create_tables()
+    with db._engine.begin() as connection:
+        set_stock(connection, 1e9)   # Sin rechazos por stock en la cola local
+    db._engine.dispose()
+
+    print(f"{args.orders} pedidos con la BD bloqueada, {args.cashiers} cajas, {os.cpu_count()} núcleos, en {work_dir}\n")
+    latencies, failures = take_offline(db_path, queue_path, args)
+    first, rest = max(latencies), sorted(latencies)[:-1]
+    print(f"Venta sin conexión: {len(latencies) - len(failures)} en cola, {len(failures)} fallos; primera {first:.0f} ms "
+          f"(espera del bloqueo), luego p50 {percentile(rest, 50):.2f} ms, p99 {percentile(rest, 99):.2f} ms")
+    for msg in failures[:3]:
+        print(f"    fallo: {msg[:120]}")
+    starved = starve_ingredients(db_path, args.conflicts)
+    print(f"Ingredientes agotados por otra caja: {starved}\n")
+
+    print(f"{'Lote':>6} {'pedidos':>8} {'segundos':>9} {'pedidos/s':>10} {'conflictos':>11} {'en BD':>7}")
+    errors, results = [], []
+    for batch in [int(value) for value in args.batches.split(",")]:
+        result = run_sync(f"lote_{batch}", db_path, queue_path, work_dir, batch)
+        results.append(result)
+        print(f"{batch:>6} {result['processed']:>8} {result['seconds']:>9.2f} {result['processed'] / result['seconds']:>10.0f} "
+              f"{result['conflicts']:>11} {result['in_db']:>7}")
+        if result["backlog"] or result["in_db"] != result["queued"] or result["distinct"] != result["in_db"]:
+            errors.append(f"lote {batch}: {result['queued']} en cola, {result['in_db']} en BD "
+                          f"({result['distinct']} distintos), {result['backlog']} sin sincronizar")
+        if result["conflict_rows"] != results[0]["conflict_rows"]:
+            errors.append(f"lote {batch}: conflictos distintos a los del lote {results[0]['batch']}")
+
+    print("\nVerificación: " + ("OK (cada venta en la BD una vez, mismos conflictos en todos los lotes)" if not errors
+                                else "FALLA\n  " + "\n  ".join(errors)))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
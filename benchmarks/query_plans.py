@@ -0,0 +1,245 @@
+"""
+Benchmark de estrategias de carga para las lecturas de los CRUD.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.query_plans [--orders 20000] [--clients 1000] [--runs 20] [--plans]
+
+Para cada lectura (página del historial, pedidos de un cliente, pedido por id para la boleta,
+menús con receta) compara joinedload, selectinload, la combinación de ambos y SQL directo.
+Cada variante "consume" el resultado igual que su usuario real (historial, Receipt, etc.),
+así las cargas perezosas (N+1) también se cuentan.
+
+Reporta por variante: tiempo, sentencias SQL, filas y celdas (filas x columnas) transferidas.
+--plans imprime el EXPLAIN QUERY PLAN de cada sentencia distinta.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import joinedload, selectinload
+
+from benchmarks.datagen import create_database, generate
+from src.crud.menu_crud import MenuCRUD
+from src.crud.order_crud import OrderCRUD
+from src.models import OrderModel, OrderDetailModel, MenuItemModel, RecipeModel
+
+PAGE_SIZE = 50
+
+
+class StatementRecorder:
+    """Registra las sentencias ejecutadas sobre el engine (texto, parámetros, columnas)."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+        self.enabled = False
+        event.listen(engine, "after_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled:
+            columns = len(cursor.description) if cursor.description else 0
+            self.statements.append((statement, parameters, columns))
+
+    def capture(self, fn):
+        self.statements = []
+        self.enabled = True
+        try:
+            fn()
+        finally:
+            self.enabled = False
+        return list(self.statements)
+
+
+# --- Consumidores: acceden a los mismos atributos que el código real ---
+def consume_history(orders):
+    return [(o.id, o.date, o.client.name, [(d.quantity, d.menu_name) for d in o.details]) for o in orders]
+
+def consume_receipt(order):
+    return (order.id, order.date, order.client.name, order.total,
+            [(d.menu_name, d.quantity, d.unit_price, d.subtotal) for d in order.details])
+
+def consume_menus(menus):
+    return [(m.name, [(l.ingredient.name, l.ingredient.quantity, l.required_quantity) for l in m.recipe_links]) for m in menus]
+
+
+def history_query(session, client_id, loader_client, loader_details):
+    query = session.query(OrderModel).options(loader_client(OrderModel.client), loader_details(OrderModel.details))
+    query = query.filter(OrderModel.client_id == client_id) if client_id else query.filter(OrderModel.client_id.isnot(None))
+    return query.order_by(OrderModel.date.desc(), OrderModel.id.desc()).limit(PAGE_SIZE).all()
+
+
+def history_raw(session, client_id):
+    """SQL directo: página de pedidos + cliente en una consulta, detalles de esa página en otra."""
+    where = "o.client_id = :client_id" if client_id else "o.client_id IS NOT NULL"
+    orders = session.execute(text(f"""
+        SELECT o.id, o.date, c.name, o.total FROM orders o JOIN clients c ON c.id = o.client_id
+        WHERE {where} ORDER BY o.date DESC, o.id DESC LIMIT :limit
+    """), {"client_id": client_id, "limit": PAGE_SIZE}).all()
+    ids = [row[0] for row in orders]
+    details = {}
+    if ids:
+        rows = session.execute(
+            select(OrderDetailModel.order_id, OrderDetailModel.quantity, OrderDetailModel.menu_name)
+            .where(OrderDetailModel.order_id.in_(ids))
+        )
+        for order_id, quantity, name in rows:
+            details.setdefault(order_id, []).append((quantity, name))
+    return [(oid, date, name, total, details.get(oid, [])) for oid, date, name, total in orders]
+
+
+def receipt_raw(session, order_id):
+    head = session.execute(text(
+        "SELECT o.id, o.date, c.name, o.total FROM orders o LEFT JOIN clients c ON c.id = o.client_id WHERE o.id = :id"
+    ), {"id": order_id}).first()
+    lines = session.execute(text(
+        "SELECT menu_name, quantity, unit_price, subtotal FROM order_details WHERE order_id = :id"
+    ), {"id": order_id}).all()
+    return (*head, [tuple(line) for line in lines])
+
+
+def menus_raw(session):
+    rows = session.execute(text("""
+        SELECT m.id, m.name, i.name, i.quantity, r.required_quantity
+        FROM menu_items m LEFT JOIN recipes r ON r.menu_item_id = m.id LEFT JOIN ingredients i ON i.id = r.ingredient_id
+        ORDER BY m.id
+    """)).all()
+    menus = {}
+    for menu_id, name, ing_name, ing_qty, required in rows:
+        lines = menus.setdefault(menu_id, (name, []))[1]
+        if ing_name is not None:
+            lines.append((ing_name, ing_qty, required))
+    return list(menus.values())
+
+
+def build_cases(client_id, order_id):
+    """{lectura: [(estrategia, fn(session))]}. 'CRUD actual' usa el método tal como está en el repo."""
+    return {
+        "OrderCRUD.get_all (página)": [
+            ("CRUD actual", lambda s: consume_history(OrderCRUD.get_all(s, 0, PAGE_SIZE))),
+            ("joinedload + joinedload", lambda s: consume_history(history_query(s, None, joinedload, joinedload))),
+            ("joinedload + selectinload", lambda s: consume_history(history_query(s, None, joinedload, selectinload))),
+            ("selectinload + selectinload", lambda s: consume_history(history_query(s, None, selectinload, selectinload))),
+            ("SQL directo", lambda s: history_raw(s, None)),
+            ("OrderCRUD.get_history_rows", lambda s: OrderCRUD.get_history_rows(s, None, 0, PAGE_SIZE)),
+        ],
+        "OrderCRUD.get_orders_by_client": [
+            ("CRUD actual", lambda s: consume_history(OrderCRUD.get_orders_by_client(s, client_id, 0, PAGE_SIZE))),
+            ("joinedload + joinedload", lambda s: consume_history(history_query(s, client_id, joinedload, joinedload))),
+            ("joinedload + selectinload", lambda s: consume_history(history_query(s, client_id, joinedload, selectinload))),
+            ("selectinload + selectinload", lambda s: consume_history(history_query(s, client_id, selectinload, selectinload))),
+            ("SQL directo", lambda s: history_raw(s, client_id)),
+            ("OrderCRUD.get_history_rows", lambda s: OrderCRUD.get_history_rows(s, client_id, 0, PAGE_SIZE)),
+        ],
+        "OrderCRUD.get_by_id (boleta)": [
+            ("CRUD actual", lambda s: consume_receipt(OrderCRUD.get_by_id(s, order_id))),
+            ("perezosa (sin opciones)", lambda s: consume_receipt(s.get(OrderModel, order_id))),
+            ("joinedload + joinedload", lambda s: consume_receipt(s.get(
+                OrderModel, order_id, options=[joinedload(OrderModel.client), joinedload(OrderModel.details)]))),
+            ("joinedload + selectinload", lambda s: consume_receipt(s.get(
+                OrderModel, order_id, options=[joinedload(OrderModel.client), selectinload(OrderModel.details)]))),
+            ("SQL directo", lambda s: receipt_raw(s, order_id)),
+        ],
+        "MenuCRUD.get_all (con receta)": [
+            ("CRUD actual", lambda s: consume_menus(MenuCRUD.get_all(s))),
+            ("joinedload.joinedload", lambda s: consume_menus(s.query(MenuItemModel).options(
+                joinedload(MenuItemModel.recipe_links).joinedload(RecipeModel.ingredient)).all())),
+            ("selectinload.joinedload", lambda s: consume_menus(s.query(MenuItemModel).options(
+                selectinload(MenuItemModel.recipe_links).joinedload(RecipeModel.ingredient)).all())),
+            ("selectinload.selectinload", lambda s: consume_menus(s.query(MenuItemModel).options(
+                selectinload(MenuItemModel.recipe_links).selectinload(RecipeModel.ingredient)).all())),
+            ("SQL directo", menus_raw),
+        ],
+    }
+
+
+def rows_returned(engine, statement, parameters) -> int:
+    """Cuenta las filas que produjo una sentencia SELECT re-ejecutándola dentro de COUNT(*)."""
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM ({statement})", parameters)
+        return cursor.fetchone()[0]
+    finally:
+        raw.close()
+
+
+def explain(engine, statement, parameters) -> list:
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in cursor.fetchall()]
+    finally:
+        raw.close()
+
+
+def run_case(manager, recorder, fn, runs):
+    session = manager._session_factory()
+    try:
+        fn(session)  # Calentamiento (compilación y caché de sentencias)
+        session.expunge_all()
+
+        statements = recorder.capture(lambda: fn(session))
+        session.expunge_all()
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            fn(session)
+            session.expunge_all()
+        elapsed = (time.perf_counter() - start) * 1000 / runs
+    finally:
+        session.close()
+
+    rows = cells = 0
+    for statement, parameters, columns in statements:
+        count = rows_returned(manager._engine, statement, parameters)
+        rows += count
+        cells += count * columns
+    return elapsed, statements, rows, cells
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estrategias de carga de las lecturas CRUD")
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--plans", action="store_true", help="Imprime EXPLAIN QUERY PLAN por sentencia")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_plans_"), "bench.db")
+    manager = create_database(path)
+    print(f"Datos: {generate(manager, clients=args.clients, orders=args.orders)}")
+    recorder = StatementRecorder(manager._engine)
+
+    with manager._engine.connect() as connection:
+        client_id = connection.execute(text(
+            "SELECT client_id FROM orders GROUP BY client_id ORDER BY COUNT(*) DESC LIMIT 1")).scalar()
+        order_id = connection.execute(text("SELECT MAX(id) FROM orders")).scalar()
+
+    for read_name, variants in build_cases(client_id, order_id).items():
+        print(f"\n=== {read_name} ===")
+        print(f"{'Estrategia':<30} {'ms':>8} {'SQL':>5} {'filas':>7} {'celdas':>8}")
+        results = []
+        for strategy, fn in variants:
+            elapsed, statements, rows, cells = run_case(manager, recorder, fn, args.runs)
+            results.append((elapsed, strategy))
+            print(f"{strategy:<30} {elapsed:>8.2f} {len(statements):>5} {rows:>7} {cells:>8}")
+            if args.plans:
+                seen = set()
+                for statement, parameters, _ in statements:
+                    if statement in seen:
+                        continue
+                    seen.add(statement)
+                    first_line = " ".join(statement.split())[:90]
+                    print(f"    SQL: {first_line}...")
+                    for step in explain(manager._engine, statement, parameters):
+                        print(f"      - {step}")
+        print(f"Más rápida: {min(results)[1]}")
+
+    manager._engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
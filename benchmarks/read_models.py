@@ -0,0 +1,89 @@
+"""
+Benchmark de lectura: entidades ORM vs modelos de solo lectura (proyecciones a NamedTuple).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.read_models [--rows 10000] [--runs 5]
+
+Crea una BD temporal con N clientes e ingredientes y mide, por camino de lectura,
+el tiempo de la consulta y la memoria retenida por el resultado (tracemalloc).
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import text
+
+from src.config.database import DatabaseManager
+from src.crud.client_crud import ClientCRUD
+from src.crud.ingredient_crud import IngredientCRUD
+
+
+def seed(manager: DatabaseManager, rows: int):
+    with manager._engine.begin() as connection:
+        connection.execute(text("DELETE FROM recipes"))
+        connection.execute(text("DELETE FROM ingredients"))
+        connection.execute(
+            text("INSERT INTO clients (name, email) VALUES (:name, :email)"),
+            [{"name": f"Cliente {i}", "email": f"cliente{i}@correo.cl"} for i in range(rows)]
+        )
+        connection.execute(
+            text("INSERT INTO ingredients (name, unit, quantity) VALUES (:name, 'kg', :qty)"),
+            [{"name": f"Ingrediente {i}", "qty": i * 0.5} for i in range(rows)]
+        )
+
+
+def measure(manager: DatabaseManager, fn, runs: int):
+    """Retorna (ms promedio, KiB retenidos por el resultado, filas)."""
+    session = manager._session_factory()
+    try:
+        fn(session)  # Calentamiento (compilación de la consulta)
+        session.expunge_all()
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            result = fn(session)
+            session.expunge_all()
+        elapsed = (time.perf_counter() - start) * 1000 / runs
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        result = fn(session)
+        session.close()  # Igual que los servicios: el resultado sobrevive a la sesión
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        retained = sum(stat.size_diff for stat in after.compare_to(before, "filename")) / 1024
+        return elapsed, retained, len(result)
+    finally:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ORM vs modelos de solo lectura")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_read_")
+    manager = DatabaseManager(os.path.join(tmp_dir, "bench.db"))
+    manager.create_tables()
+    seed(manager, args.rows)
+
+    cases = [
+        ("Clientes ORM", ClientCRUD.get_all),
+        ("Clientes ClientRow", ClientCRUD.get_all_rows),
+        ("Ingredientes ORM", IngredientCRUD.get_all),
+        ("Ingredientes IngredientRow", IngredientCRUD.get_all_rows),
+    ]
+
+    print(f"\n{'Camino':<28} {'Filas':>7} {'ms/consulta':>12} {'KiB retenidos':>14} {'µs/fila':>9}")
+    for name, fn in cases:
+        ms, kib, count = measure(manager, fn, args.runs)
+        print(f"{name:<28} {count:>7} {ms:>12.1f} {kib:>14.0f} {ms * 1000 / max(count, 1):>9.2f}")
+
+    manager._engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
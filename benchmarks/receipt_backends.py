@@ -0,0 +1,75 @@
+"""
+Benchmark de los backends de boleta: PDF (reportlab) vs texto de ancho fijo vs ESC/POS.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.receipt_backends [--runs 200] [--lines 8]
+
+No requiere base de datos: construye un pedido en memoria con la misma forma que OrderModel.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace as sn
+
+from src.utils.receipt import Receipt
+
+
+def build_fake_order(n_lines: int):
+    menus = ["Completo", "Hamburguesa", "Papas Fritas", "Pollo Frito", "Panqueques", "Ensalada Mixta", "Pepsi"]
+    details = []
+    for i in range(n_lines):
+        price = 1000 + 250 * i
+        qty = 1 + i % 3
+        details.append(sn(menu_name=menus[i % len(menus)], unit_price=price, quantity=qty, subtotal=price * qty))
+
+    return sn(
+        id=1234,
+        date=datetime.now(),
+        client=sn(name="Cliente Benchmark"),
+        details=details,
+        total=sum(d.subtotal for d in details),
+    )
+
+
+def time_backend(fn, runs: int) -> float:
+    """Retorna el tiempo promedio por boleta en milisegundos."""
+    fn()  # Calentamiento (imports, cachés de fuentes, etc.)
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) * 1000 / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de backends de boleta")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=8, help="Líneas de detalle por boleta")
+    args = parser.parse_args()
+
+    order = build_fake_order(args.lines)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        receipt = Receipt(order)
+        receipt.filepath = os.path.join(tmp, "boleta.pdf")
+        txt_path = os.path.join(tmp, "boleta.txt")
+        bin_path = os.path.join(tmp, "boleta.bin")
+
+        results = [
+            ("pdf (archivo)", time_backend(receipt.generate_pdf, max(1, args.runs // 10))),
+            ("text (render)", time_backend(receipt.render_text, args.runs)),
+            ("text (archivo)", time_backend(lambda: receipt.generate_text(txt_path), args.runs)),
+            ("escpos (render)", time_backend(receipt.render_escpos, args.runs)),
+            ("escpos (archivo)", time_backend(lambda: receipt.generate_escpos(bin_path), args.runs)),
+        ]
+
+    pdf_ms = results[0][1]
+    print(f"Boleta de {args.lines} líneas, {args.runs} repeticiones")
+    print(f"{'Backend':<18} {'ms/boleta':>10} {'vs PDF':>8}")
+    for name, ms in results:
+        print(f"{name:<18} {ms:>10.3f} {pdf_ms / ms:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Suite de benchmarks de los servicios públicos sobre una BD sintética.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.services [--preset small] [--db /tmp/bench_small.db] [--runs 20]
+                                  [--baseline archivo.json] [--threshold 0.2]
+
+- Genera la BD con benchmarks.datagen (o reutiliza --db si ya existe) y apunta la instancia
+  global 'db' a ella, así se miden los servicios reales sin tocar restaurante.db.
+- Mide cada método público de IngredientService, MenuService, OrderService, ClientService y
+  StatisticsService (min / mediana / media en ms) y guarda el resultado como JSON en
+  benchmarks/results/.
+- Compara con --baseline o, si no se indica, con la corrida anterior del mismo preset.
+  Marca como regresión una mediana que empeora más que --threshold (y más de 0,2 ms).
+  Con regresiones el proceso termina con código 1 (útil en CI).
+"""
+import argparse
+import glob
+import inspect
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.datagen import PRESETS, create_database, generate_preset
+from src.config.database import db
+from src.services.client_service import ClientService
+from src.services.ingredient_service import IngredientService
+from src.services.menu_service import MenuService
+from src.services.order_service import OrderService
+from src.services.statistics_service import StatisticsService
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+MIN_DELTA_MS = 0.2
+
+
+class Case:
+    """
+    Un método medido. prepare(n) retorna la lista de argumentos para cada una de las n
+    ejecuciones (ej. ids recién creados para los métodos que borran); no se cronometra.
+    """
+    def __init__(self, name, fn, prepare=None, runs=None):
+        self.name = name
+        self.fn = fn
+        self.prepare = prepare or (lambda n: [()] * n)
+        self.runs = runs
+
+
+def build_cases(services, work_dir):
+    ingredients, menus, orders, clients, stats = services
+    counter = iter(range(10**9))
+
+    sample_menu = menus.get_all_menus()[0]
+    menu_row, recipe = menus.get_menu(sample_menu.name)
+    sample_ingredient = ingredients.get_all_ingredients()[0]
+    client_id = clients.search_clients("Cliente", 1)[0].id
+    cart = [{"menu_name": menu_row.name, "quantity": 1, "price": menu_row.price}]
+    recipe_list = [{"name": sample_ingredient.name, "qty": 1}]
+    total_orders = orders.count_orders()
+    # Menú propio para update_recipe: cambiar la receta del menú de muestra alteraría los demás casos
+    recipe_menu = f"Menú receta {next(counter)}"
+    menus.create_custom_menu(recipe_menu, 1000, "", recipe_list)
+
+    csv_path = os.path.join(work_dir, "ingredientes.csv")
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write("nombre,unidad,cantidad\n")
+        for i in range(200):
+            f.write(f"Ingrediente csv {i},kg,{i + 1}\n")
+    _, csv_rows, _ = ingredients.process_csv(csv_path)
+
+    def new_ingredients(n):
+        names = [f"Temporal {next(counter)}" for _ in range(n)]
+        for name in names:
+            ingredients.add_ingredient(name, "kg", 1)
+        return [(name.capitalize(),) for name in names]
+
+    def new_menus(n):
+        names = [f"Menú temporal {next(counter)}" for _ in range(n)]
+        for name in names:
+            menus.create_custom_menu(name, 1000, "", recipe_list)
+        return [(name,) for name in names]
+
+    def new_clients(n):
+        emails = [f"temporal{next(counter)}@bench.cl" for _ in range(n)]
+        for email in emails:
+            clients.register_client("Temporal", email)
+        return [(c.id,) for c in clients.search_clients("temporal", 10**6) if c.email in emails]
+
+    def new_orders(n):
+        before = orders.count_orders()
+        for _ in range(n):
+            orders.process_order(client_id, cart)
+        return [(row["id"],) for row in orders.get_formatted_orders(0, 0, orders.count_orders() - before)]
+
+    return [
+        Case("IngredientService.get_all_ingredients", ingredients.get_all_ingredients),
+        Case("IngredientService.add_ingredient", lambda: ingredients.add_ingredient(sample_ingredient.name, "kg", 0)),
+        Case("IngredientService.delete_ingredient", ingredients.delete_ingredient, new_ingredients),
+        Case("IngredientService.process_csv", lambda: ingredients.process_csv(csv_path)),
+        Case("IngredientService.save_bulk_ingredients", lambda: ingredients.save_bulk_ingredients(csv_rows), runs=5),
+        # Libro de movimientos: el ajuste alterna el conteo para registrar siempre una diferencia
+        Case("IngredientService.adjust_stock", lambda: ingredients.adjust_stock(sample_ingredient.name, 1000 + next(counter) % 2)),
+        Case("IngredientService.register_waste", lambda: ingredients.register_waste(sample_ingredient.name, 0.001)),
+        Case("IngredientService.get_movements", lambda: ingredients.get_movements(sample_ingredient.name, 100)),
+        Case("IngredientService.get_stock_at", lambda: ingredients.get_stock_at(datetime.now() - timedelta(days=1)), runs=5),
+        Case("IngredientService.take_stock_snapshot", ingredients.take_stock_snapshot),
+
+        Case("MenuService.get_all_menus", menus.get_all_menus),
+        Case("MenuService.get_menu_status", menus.get_menu_status),
+        Case("MenuService.check_availability", lambda: menus.check_availability(sample_menu)),
+        Case("MenuService.get_menu", lambda: menus.get_menu(sample_menu.name)),
+        Case("MenuService.create_custom_menu",
+             lambda: menus.create_custom_menu(f"Menú nuevo {next(counter)}", 1000, "", recipe_list)),
+        Case("MenuService.update_recipe",
+             lambda: menus.update_recipe(recipe_menu, [{"name": sample_ingredient.name, "qty": 1 + next(counter) % 2}])),
+        Case("MenuService.delete_menu", menus.delete_menu, new_menus),
+        Case("MenuService.initialize_default_menus", menus.initialize_default_menus, runs=5),
+
+        Case("OrderService.process_order", lambda: orders.process_order(client_id, cart)),
+        Case("OrderService.validate_stock", lambda: orders.validate_stock(menu_row.name, 1, recipe)),
+        Case("OrderService.count_orders", orders.count_orders),
+        Case("OrderService.get_formatted_orders", lambda: orders.get_formatted_orders(0, 0, 50)),
+        Case("OrderService.get_formatted_orders (página profunda)",
+             lambda: orders.get_formatted_orders(0, max(total_orders - 50, 0), 50), runs=5),
+        Case("OrderService.delete_order", orders.delete_order, new_orders),
+        Case("OrderService.generate_receipt", lambda: orders.generate_receipt(1, "text", os.path.join(work_dir, "boleta.txt"))),
+        Case("OrderService.generate_receipt_pdf", lambda: orders.generate_receipt_pdf(1), runs=5),
+
+        Case("ClientService.get_all_clients", clients.get_all_clients, runs=5),
+        Case("ClientService.search_clients", lambda: clients.search_clients("Cliente 12", 20)),
+        Case("ClientService.client_exists", lambda: clients.client_exists(client_id)),
+        Case("ClientService.register_client", lambda: clients.register_client("Nuevo", f"nuevo{next(counter)}@bench.cl")),
+        Case("ClientService.delete_client", clients.delete_client, new_clients),
+
+        Case("StatisticsService.get_sales_data", stats.get_sales_data, runs=3),
+        Case("StatisticsService.get_popular_menus_data", stats.get_popular_menus_data, runs=3),
+        Case("StatisticsService.get_ingredient_usage_data", stats.get_ingredient_usage_data, runs=3),
+        # Con un solo local registrado miden el costo del reparto y la unión de resultados
+        Case("StatisticsService.get_sales_data_all_locations", stats.get_sales_data_all_locations, runs=3),
+        Case("StatisticsService.get_popular_menus_data_all_locations", stats.get_popular_menus_data_all_locations, runs=3),
+        Case("StatisticsService.get_ingredient_usage_data_all_locations", stats.get_ingredient_usage_data_all_locations, runs=3),
+    ]
+
+
+def public_methods(services) -> set:
+    names = set()
+    for service in services:
+        for name, member in inspect.getmembers(type(service), inspect.isfunction):
+            if not name.startswith("_"):
+                names.add(f"{type(service).__name__}.{name}")
+    return names
+
+
+def run_case(case: Case, runs: int) -> dict:
+    runs = min(runs, case.runs) if case.runs else runs
+    args_list = case.prepare(runs + 1)
+    case.fn(*args_list[0])  # Calentamiento
+    samples = []
+    for args in args_list[1:]:
+        start = time.perf_counter()
+        case.fn(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "runs": len(samples),
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "mean_ms": round(statistics.mean(samples), 3),
+    }
+
+
+def find_baseline(preset: str, exclude: str = None):
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, f"services_{preset}_*.json")))
+    files = [f for f in files if f != exclude]
+    return files[-1] if files else None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        delta = result["median_ms"] - before["median_ms"]
+        if result["median_ms"] > before["median_ms"] * (1 + threshold) and delta > MIN_DELTA_MS:
+            regressions.append((name, before["median_ms"], result["median_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de los servicios")
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--db", help="BD a usar; si no existe se genera con el preset")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--baseline", help="JSON de una corrida anterior (por defecto la última del preset)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Empeoramiento relativo tolerado (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_services_")
+    db_path = os.path.abspath(args.db or os.path.join(work_dir, f"{args.preset}.db"))
+    if not os.path.exists(db_path):
+        print(f"Generando BD '{args.preset}' en {db_path}...")
+        generate_preset(create_database(db_path), args.preset)
+
+    db.configure(db_path)
+    db.create_tables()
+    os.chdir(work_dir)  # Boletas y PDFs de prueba quedan en el directorio temporal
+
+    services = (IngredientService(), MenuService(), OrderService(), ClientService(), StatisticsService())
+    cases = build_cases(services, work_dir)
+
+    uncovered = public_methods(services) - {case.name.split(" (")[0] for case in cases}
+    if uncovered:
+        print(f"Aviso: métodos públicos sin caso de benchmark: {', '.join(sorted(uncovered))}")
+
+    current = {
+        "meta": {
+            "preset": args.preset, "db": db_path, "runs": args.runs,
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0], "platform": platform.platform(),
+        },
+        "results": {},
+    }
+    print(f"\n{'Método':<58} {'mín':>9} {'mediana':>9} {'media':>9}")
+    for case in cases:
+        result = run_case(case, args.runs)
+        current["results"][case.name] = result
+        print(f"{case.name:<58} {result['min_ms']:>9.2f} {result['median_ms']:>9.2f} {result['mean_ms']:>9.2f}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"services_{args.preset}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    baseline_path = args.baseline or find_baseline(args.preset, exclude=out_path)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {out_path}")
+
+    if not baseline_path:
+        print("Sin corrida anterior para comparar.")
+        return 0
+
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.threshold)
+    print(f"Comparación con {baseline_path}:")
+    if not regressions:
+        print(f"  Sin regresiones (umbral {args.threshold:.0%}).")
+        return 0
+    for name, before, after in regressions:
+        print(f"  REGRESIÓN {name}: {before:.2f} ms -> {after:.2f} ms ({after / before - 1:+.0%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Prueba de resistencia de memoria: repite el trabajo de un turno contra una BD sintética con
+el diagnóstico de memoria activo y falla si la memoria crece más que el presupuesto.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.soak [--iterations 1000] [--warmup 100] [--budget-kb 1024]
+                              [--db /tmp/bench.db] [--detail] [--frames 1]
+
+- Cada iteración: carta y disponibilidad, receta, un pedido, historial, búsqueda de
+  clientes, stock, boleta de texto y miniaturas de la caché. Cada --chart-every
+  iteraciones arma un gráfico estadístico (backend Agg, sin ventana).
+- Después del calentamiento se toma la línea base; al final se compara: memoria trazada
+  (tracemalloc) y objetos vivos (sesiones, figuras, entidades ORM e imágenes no deben crecer).
+- Con sobrepresupuesto imprime los sitios de asignación que más crecieron y termina con código 1.
+
+La interfaz Tk queda fuera (necesita pantalla): los widgets se revisan con POS_MEMORY_WATCH=1
+en la aplicación.
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.datagen import create_database, generate_preset
+from src.config.consts import BASE_DIR
+from src.config.database import db
+from src.services.client_service import ClientService
+from src.services.ingredient_service import IngredientService
+from src.services.menu_service import MenuService
+from src.services.order_service import OrderService
+from src.services.statistics_service import StatisticsService
+from src.utils.image_cache import image_cache
+from src.utils.memory_watchdog import memory_watchdog
+
+# Objetos vivos que no deben aumentar entre la línea base y el final
+OBJECT_BUDGET = {"sesiones": 0, "figuras": 0, "entidades ORM": 0, "imágenes": 0}
+
+CHART_TYPES = ["Ventas Diarias", "Ventas Mensuales", "Menús Más Vendidos", "Uso de Ingredientes"]
+
+
+def build_workload(work_dir: str):
+    menus, orders, clients = MenuService(), OrderService(), ClientService()
+    ingredients, stats = IngredientService(), StatisticsService()
+    catalog = menus.get_all_menus()
+    client_id = clients.search_clients("", 1)[0].id
+    images = sorted(glob.glob(os.path.join(BASE_DIR, "images", "*.png")))[:8]
+    receipt_path = os.path.join(work_dir, "boleta.txt")
+
+    def iteration(i: int):
+        menu = catalog[i % len(catalog)]
+        menus.get_all_menus()
+        menus.get_menu_status()
+        _, recipe = menus.get_menu(menu.name)
+        orders.validate_stock(menu.name, 1, recipe)
+        orders.process_order(client_id, [{"menu_name": menu.name, "quantity": 1, "price": menu.price}])
+        orders.get_formatted_orders(0, 0, 50)
+        orders.count_orders()
+        orders.generate_receipt(1, "text", receipt_path)
+        clients.search_clients(f"Cliente {i % 100}", 20)
+        ingredients.get_all_ingredients()
+        for path in images:
+            image_cache.get(path, (80, 80))
+
+    def chart(i: int):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from src.utils.charts import build_chart
+
+        chart_type = CHART_TYPES[i % len(CHART_TYPES)]
+        if "Ventas" in chart_type:
+            result = stats.get_sales_data()
+        elif chart_type == "Menús Más Vendidos":
+            result = stats.get_popular_menus_data()
+        else:
+            result = stats.get_ingredient_usage_data()
+        fig, _ = build_chart(chart_type, *result)
+        if fig is not None:
+            FigureCanvasAgg(fig).draw()
+
+    return iteration, chart
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de resistencia de memoria")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=100, help="Iteraciones antes de la línea base")
+    parser.add_argument("--budget-kb", type=float, default=1024, help="Crecimiento tolerado de memoria trazada")
+    parser.add_argument("--chart-every", type=int, default=100)
+    parser.add_argument("--db", help="BD a usar (por defecto se genera una 'tiny' temporal)")
+    parser.add_argument("--detail", action="store_true", help="Snapshots por acción (mucho más lento)")
+    parser.add_argument("--frames", type=int, default=1, help="Marcos de pila por asignación (tracemalloc)")
+    args = parser.parse_args()
+
+    import matplotlib
+    matplotlib.use("Agg")
+
+    work_dir = tempfile.mkdtemp(prefix="bench_soak_")
+    db_path = os.path.abspath(args.db or os.path.join(work_dir, "soak.db"))
+    if not os.path.exists(db_path):
+        generate_preset(create_database(db_path), "tiny")
+    db.configure(db_path)
+    db.create_tables()
+
+    memory_watchdog.detailed = args.detail
+    memory_watchdog.frames = args.frames
+    memory_watchdog.check_every = 0   # Los puntos los registra este script
+    memory_watchdog.enable()
+    iteration, chart = build_workload(work_dir)
+
+    started = time.perf_counter()
+    checkpoint = max(1, args.iterations // 10)
+    for i in range(args.warmup + args.iterations):
+        iteration(i)
+        if args.chart_every and i % args.chart_every == 0:
+            chart(i)
+        if i + 1 == args.warmup:
+            memory_watchdog.reset_baseline()
+            print(f"Línea base tomada tras {args.warmup} iteraciones de calentamiento")
+        elif i >= args.warmup and (i + 1 - args.warmup) % checkpoint == 0:
+            memory_watchdog.check()
+            print(f"  {i + 1 - args.warmup:>6} iteraciones | {time.perf_counter() - started:6.1f} s | "
+                  f"crecimiento {memory_watchdog.growth() / 1024:+8.1f} KiB")
+
+    print()
+    print(memory_watchdog.report())
+    reasons = memory_watchdog.over_budget(int(args.budget_kb * 1024), OBJECT_BUDGET)
+    if reasons:
+        print("\nFALLA: " + "; ".join(reasons))
+        return 1
+    print(f"\nOK: dentro del presupuesto ({args.budget_kb:.0f} KiB, sin objetos acumulados)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
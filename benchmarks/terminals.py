@@ -0,0 +1,212 @@
+"""
+Simulador de carga: N terminales vendiendo a la vez contra el mismo archivo SQLite.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.terminals [--terminals 8] [--rate 2] [--duration 30] [--mode process]
+                                   [--db /tmp/bench.db] [--stock 1000]
+
+Cada terminal (proceso o hilo) arma carritos con el catálogo de menús y llama a
+OrderService.process_order con llegadas de Poisson a --rate pedidos/s por terminal
+(carga de lazo abierto: si el sistema se atrasa, la latencia incluye la espera).
+
+Al final reporta rendimiento, latencias p50/p95/p99, errores de bloqueo ("database is
+locked"), rollbacks y verifica la consistencia del stock: stock final = stock inicial
+- lo descontado por los pedidos que el servicio reportó como exitosos.
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import text
+
+from benchmarks.datagen import CURRENT_STOCK_SQL, create_database, generate_preset, set_stock
+
+STOCK_MESSAGE = "Stock insuficiente"
+LOCK_MESSAGE = "database is locked"
+
+
+def classify(success: bool, message: str) -> str:
+    if success:
+        return "ok"
+    if STOCK_MESSAGE in message:
+        return "sin_stock"      # Rechazo de negocio (rollback esperado)
+    if LOCK_MESSAGE in message:
+        return "bloqueo"        # Espera de bloqueo agotada (rollback)
+    return "error"
+
+
+def run_terminal(terminal: int, db_path: str, rate: float, duration: float, start_at: float, results, seed: int):
+    """Cuerpo de una terminal. Sirve tanto para procesos como para hilos."""
+    # Importación tardía: cada proceso configura su propia instancia global 'db'
+    from src.config.database import db
+    from src.services.menu_service import MenuService
+    from src.services.order_service import OrderService
+    from src.services.client_service import ClientService
+
+    if db._db_path != db_path:
+        db.configure(db_path)
+    rng = random.Random(seed + terminal)
+    catalog = MenuService().get_all_menus()
+    client_ids = [c.id for c in ClientService().search_clients("", 200)]
+    service = OrderService()
+
+    # Todas las terminales arrancan juntas
+    time.sleep(max(0.0, start_at - time.time()))
+    next_arrival = time.perf_counter()
+    end = next_arrival + duration
+
+    while True:
+        next_arrival += rng.expovariate(rate)
+        if next_arrival >= end:
+            break
+        time.sleep(max(0.0, next_arrival - time.perf_counter()))
+
+        cart = [
+            {"menu_name": menu.name, "quantity": rng.randint(1, 2), "price": menu.price}
+            for menu in rng.sample(catalog, k=min(len(catalog), rng.randint(1, 3)))
+        ]
+        service_start = time.perf_counter()
+        success, message, _ = service.process_order(rng.choice(client_ids), cart)
+        done = time.perf_counter()
+        results.put((terminal, classify(success, message), (done - next_arrival) * 1000,
+                     (done - service_start) * 1000, cart if success else None, message, time.time()))
+
+
+def snapshot_stock(engine) -> dict:
+    with engine.connect() as connection:
+        return dict(connection.execute(text(CURRENT_STOCK_SQL)).all())
+
+
+def expected_deductions(engine, sold_carts: list) -> dict:
+    """
+    Descuento esperado por ingrediente según las recetas y los carritos vendidos.
+    Las sub-recetas se expanden aquí recorriendo el árbol (independiente de la caché de la app).
+    """
+    with engine.connect() as connection:
+        recipes = {}
+        for menu_id, ingredient_id, component_id, required in connection.execute(text("""
+            SELECT menu_item_id, ingredient_id, component_menu_id, required_quantity FROM recipes
+        """)):
+            recipes.setdefault(menu_id, []).append((ingredient_id, component_id, required))
+        menu_ids = dict(connection.execute(text("SELECT name, id FROM menu_items")).all())
+
+    def expand(menu_id, factor, into):
+        for ingredient_id, component_id, required in recipes.get(menu_id, []):
+            if component_id is not None:
+                expand(component_id, factor * required, into)
+            else:
+                into[ingredient_id] += factor * required
+
+    deductions = Counter()
+    for cart in sold_carts:
+        for item in cart:
+            expand(menu_ids.get(item["menu_name"]), item["quantity"], deductions)
+    return deductions
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador de terminales concurrentes")
+    parser.add_argument("--terminals", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=2.0, help="Pedidos por segundo por terminal")
+    parser.add_argument("--duration", type=float, default=20.0, help="Segundos de simulación")
+    parser.add_argument("--mode", choices=["process", "thread"], default="process")
+    parser.add_argument("--db", help="BD existente (por defecto se genera una 'tiny' temporal)")
+    parser.add_argument("--stock", type=float, help="Stock inicial de cada ingrediente (bajo = más rechazos)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from src.config.database import DatabaseManager
+
+    if args.db:
+        manager = DatabaseManager(os.path.abspath(args.db))
+        manager.create_tables()
+    else:
+        manager = create_database(os.path.join(tempfile.mkdtemp(prefix="bench_terminals_"), "terminals.db"))
+        generate_preset(manager, "tiny")
+    db_path = manager._db_path
+
+    if args.stock is not None:
+        with manager._engine.begin() as connection:
+            set_stock(connection, args.stock)
+
+    initial_stock = snapshot_stock(manager._engine)
+    with manager._engine.connect() as connection:
+        initial_orders = connection.execute(text("SELECT COUNT(*) FROM orders")).scalar()
+
+    start_at = time.time() + 1.0
+    worker_args = lambda i: (i, db_path, args.rate, args.duration, start_at)
+    if args.mode == "process":
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        workers = [context.Process(target=run_terminal, args=(*worker_args(i), results, args.seed)) for i in range(args.terminals)]
+    else:
+        results = queue.Queue()
+        workers = [threading.Thread(target=run_terminal, args=(*worker_args(i), results, args.seed)) for i in range(args.terminals)]
+
+    print(f"{args.terminals} terminales ({args.mode}) x {args.rate} pedidos/s durante {args.duration:.0f} s sobre {db_path}")
+    for worker in workers:
+        worker.start()
+
+    records = []
+    while any(worker.is_alive() for worker in workers) or not results.empty():
+        try:
+            records.append(results.get(timeout=0.2))
+        except queue.Empty:
+            pass
+    for worker in workers:
+        worker.join()
+
+    # --- Reporte ---
+    outcomes = Counter(record[1] for record in records)
+    latencies = [record[2] for record in records if record[1] == "ok"]
+    service_times = [record[3] for record in records]
+    sold_carts = [record[4] for record in records if record[1] == "ok"]
+    # Tiempo real hasta el último pedido (si el sistema se saturó, supera --duration)
+    elapsed = max([args.duration] + [record[6] - start_at for record in records])
+
+    print(f"\nPedidos: {len(records)} | ok {outcomes['ok']} | sin stock {outcomes['sin_stock']} | "
+          f"bloqueo {outcomes['bloqueo']} | otros errores {outcomes['error']}")
+    print(f"Rollbacks: {len(records) - outcomes['ok']} | Rendimiento: {outcomes['ok'] / elapsed:.1f} pedidos/s "
+          f"(ofrecido {args.terminals * args.rate:.1f}) en {elapsed:.1f} s")
+    if latencies:
+        print(f"Latencia desde la llegada (ms): p50 {percentile(latencies, 50):.1f} | p95 {percentile(latencies, 95):.1f} | "
+              f"p99 {percentile(latencies, 99):.1f} | máx {max(latencies):.1f}")
+        print(f"Tiempo de servicio (ms): p50 {percentile(service_times, 50):.1f} | p95 {percentile(service_times, 95):.1f}")
+    for message, count in Counter(r[5] for r in records if r[1] == "error").most_common(3):
+        print(f"  error x{count}: {message[:120]}")
+
+    # --- Consistencia ---
+    final_stock = snapshot_stock(manager._engine)
+    deductions = expected_deductions(manager._engine, sold_carts)
+    mismatches = [
+        (ingredient_id, initial_stock[ingredient_id] - deductions.get(ingredient_id, 0.0), final_stock.get(ingredient_id))
+        for ingredient_id in initial_stock
+        if abs(initial_stock[ingredient_id] - deductions.get(ingredient_id, 0.0) - final_stock.get(ingredient_id, 0.0)) > 1e-6
+    ]
+    negatives = [i for i, qty in final_stock.items() if qty < -1e-9]
+    with manager._engine.connect() as connection:
+        new_orders = connection.execute(text("SELECT COUNT(*) FROM orders")).scalar() - initial_orders
+
+    print("\nConsistencia:")
+    print(f"  Pedidos nuevos en BD: {new_orders} (esperados {outcomes['ok']})")
+    print(f"  Ingredientes con stock distinto al esperado: {len(mismatches)}")
+    for ingredient_id, expected, actual in mismatches[:5]:
+        print(f"    id {ingredient_id}: esperado {expected:.3f}, real {actual:.3f}")
+    print(f"  Ingredientes con stock negativo: {len(negatives)}")
+    consistent = not mismatches and not negatives and new_orders == outcomes["ok"]
+    print("  OK" if consistent else "  INCONSISTENTE")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,107 @@
-from src.restaurant import RestaurantApp
+import sys
+import time
+
+_start = time.perf_counter()
+
 # Importamos la instancia de la clase DatabaseManager
 from src.config.database import db
 
+def _arg_value(flag, default):
+    """Valor de una opción '--flag valor' en la línea de comandos."""
+    if flag in sys.argv:
+        index = sys.argv.index(flag)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return default
+
+def _run_backup_command() -> int:
+    """--backup [--vacuum] | --list-backups | --restore <respaldo>: sobre la BD del local de la terminal."""
+    import sqlite3
+    from src.config.database import locations
+
+    manager = locations.get()
+    if "--list-backups" in sys.argv:
+        for path in manager.list_backups():
+            print(path)
+        return 0
+
+    if "--restore" in sys.argv:
+        snapshot = _arg_value("--restore", "")
+        try:
+            safety = manager.restore(snapshot)
+        except sqlite3.Error as e:
+            print(f"No se restauró: {e}")
+            return 1
+        print(f"BD restaurada desde {snapshot}" + (f" (estado anterior guardado en {safety})" if safety else ""))
+        return 0
+
+    try:
+        result = manager.backup(method="vacuum" if "--vacuum" in sys.argv else "steps")
+    except sqlite3.Error as e:
+        print(f"Respaldo fallido: {e}")
+        return 1
+    print(f"Respaldo verificado: {result.path} ({result.pages} páginas, {result.steps} pasos, "
+          f"{result.restarts} reinicios, {result.seconds:.2f} s, método {result.method})")
+    return 0
+
+def _run_offline_command() -> int:
+    """--sync-offline: pasa a la BD las ventas tomadas sin conexión y lista los conflictos."""
+    from src.config.database import locations
+
+    manager = locations.get()
+    manager.create_tables()
+    manager.start_offline(True)
+    queue = manager.offline
+    synced, pending, conflicts = queue.sync(), queue.backlog(), queue.conflicts()
+    manager.stop_offline()
+
+    print(f"Ventas sin conexión procesadas: {synced}; pendientes: {pending}")
+    for created_at, client_id, total, status, message, order_id in conflicts:
+        print(f"  {created_at} cliente {client_id} ${total:,.0f} [{status}] pedido {order_id or '-'}: {message}")
+    return 1 if pending else 0
+
 if __name__ == '__main__':
+    # Respaldos en caliente: se pueden correr con la aplicación o el servidor abiertos (salvo --restore)
+    if {"--backup", "--list-backups", "--restore"} & set(sys.argv):
+        sys.exit(_run_backup_command())
+
+    # Sincronización manual de la cola de ventas sin conexión de esta terminal
+    if "--sync-offline" in sys.argv:
+        sys.exit(_run_offline_command())
+
+    # --server: modo sin interfaz, expone los servicios como API HTTP/JSON para las terminales
+    if "--server" in sys.argv:
+        from src.config.consts import SERVER_HOST, SERVER_PORT
+        from src.server import run_server
+
+        print("--- Sistema de Gestión de Restaurante (modo servidor) ---")
+        db.create_tables()
+        run_server(_arg_value("--host", SERVER_HOST), int(_arg_value("--port", SERVER_PORT)))
+        sys.exit(0)
+
+    from src.restaurant import RestaurantApp
+    from src.utils.startup import StartupTimer, import_time_report
+
     print("--- Sistema de Gestión de Restaurante (POO + SQLAlchemy) ---")
-    
+
+    # --startup-report: desglose de tiempos de arranque (por fase y por importación)
+    startup_report = "--startup-report" in sys.argv
+    timer = StartupTimer(start=_start)
+    timer.mark("Importaciones")
+
     # Llamamos al método de la instancia de clase para crear tablas
     db.create_tables()
     print("Infraestructura de base de datos lista.")
+    timer.mark("Base de datos")
 
     app = RestaurantApp()
-    app.mainloop()
\ No newline at end of file
+    timer.mark("Construcción de ventana")
+
+    if startup_report:
+        def _print_report():
+            timer.mark("Primer ciclo idle")
+            print(timer.report())
+            print(import_time_report())
+        app.after_idle(_print_report)
+
+    app.mainloop()
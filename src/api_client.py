@@ -0,0 +1,103 @@
+"""
+Cliente de la API del modo servidor (src/server.py) para terminales y scripts.
+Mantiene una conexión keep-alive; cada instancia es para un solo hilo.
+"""
+import http.client
+import json
+from urllib.parse import quote, urlencode
+
+from src.config.consts import SERVER_HOST, SERVER_PORT
+
+class ApiClient:
+    def __init__(self, host: str = SERVER_HOST, port: int = SERVER_PORT, terminal: str = "caja-1", timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.terminal = terminal
+        self.timeout = timeout
+        self._conn = None
+
+    def request(self, method: str, path: str, body: dict = None, **query) -> dict:
+        """Envía la petición y retorna el JSON de respuesta (siempre trae 'ok' y normalmente 'message')."""
+        query = {key: value for key, value in query.items() if value is not None}
+        if query:
+            path = f"{path}?{urlencode(query)}"
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if data else {}
+
+        # Un reintento si el servidor cerró la conexión keep-alive
+        for attempt in (1, 2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self._conn.request(method, path, body=data, headers=headers)
+                response = self._conn.getresponse()
+                payload = response.read()
+                break
+            except (ConnectionError, http.client.HTTPException):
+                self.close()
+                if attempt == 2:
+                    raise
+        return json.loads(payload)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # --- Catálogo y stock ---
+    def get_menus(self) -> dict:
+        return self.request("GET", "/menus")
+
+    def get_ingredients(self) -> list:
+        return self.request("GET", "/ingredients")["ingredients"]
+
+    def add_ingredient(self, name: str, unit: str, quantity: float) -> dict:
+        return self.request("POST", "/ingredients", {"name": name, "unit": unit, "quantity": quantity})
+
+    def delete_ingredient(self, name: str) -> dict:
+        return self.request("DELETE", f"/ingredients/{quote(name, safe='')}")
+
+    # --- Clientes ---
+    def search_clients(self, prefix: str = "", limit: int = None) -> list:
+        return self.request("GET", "/clients", q=prefix, limit=limit)["clients"]
+
+    def register_client(self, name: str, email: str) -> dict:
+        return self.request("POST", "/clients", {"name": name, "email": email})
+
+    def delete_client(self, client_id: int) -> dict:
+        return self.request("DELETE", f"/clients/{client_id}")
+
+    # --- Pedidos ---
+    def get_orders(self, client_id: int = 0, offset: int = 0, limit: int = None) -> list:
+        return self.request("GET", "/orders", client_id=client_id, offset=offset, limit=limit)["orders"]
+
+    def count_orders(self, client_id: int = 0) -> int:
+        return self.request("GET", "/orders/count", client_id=client_id)["count"]
+
+    def create_order(self, client_id: int, items: list) -> dict:
+        return self.request("POST", "/orders", {"client_id": client_id, "items": items})
+
+    def delete_order(self, order_id: int) -> dict:
+        return self.request("DELETE", f"/orders/{order_id}")
+
+    def generate_receipt(self, order_id: int, backend: str = None) -> dict:
+        return self.request("POST", f"/orders/{order_id}/receipt", {"backend": backend})
+
+    # --- Carrito de esta terminal ---
+    def _cart_path(self, suffix: str = "") -> str:
+        return f"/carts/{quote(self.terminal, safe='')}{suffix}"
+
+    def get_cart(self) -> dict:
+        return self.request("GET", self._cart_path())
+
+    def clear_cart(self) -> dict:
+        return self.request("DELETE", self._cart_path())
+
+    def add_to_cart(self, menu_name: str, quantity: int = 1) -> dict:
+        return self.request("POST", self._cart_path("/items"), {"menu_name": menu_name, "quantity": quantity})
+
+    def remove_from_cart(self, menu_name: str) -> dict:
+        return self.request("DELETE", self._cart_path(f"/items/{quote(menu_name, safe='')}"))
+
+    def checkout(self, client_id: int) -> dict:
+        return self.request("POST", self._cart_path("/checkout"), {"client_id": client_id})
@@ -1,3 +1,5 @@
+import os
+
 GLOBAL_FONTS = {
     "h1": {"size": 18, "weight": "bold"},
     "h2": {"size": 14, "weight": "bold"},
@@ -9,18 +11,150 @@ GLOBAL_FONTS = {
     "label_important": {"size": 14, "weight": "bold"},
 }
 
-MENU_IMAGES = {
-    "Papas Fritas": "./images/papas_fritas.png",
-    "Completo": "./images/completo.png", 
-    "Hamburguesa": "./images/hamburguesa.png",
-    "Pepsi": "./images/pepsi.png", 
-    "Panqueques": "./images/panqueques.png", 
-    "Pollo Frito": "./images/pollo_frito.png", 
-    "Ensalada Mixta": "./images/ensalada_mixta.png"
+# Raíz del proyecto: las rutas de imágenes guardadas en BD son relativas a ella
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Miniaturas pre-escaladas de las imágenes de menú (clave: hash del archivo + tamaño)
+THUMBNAIL_CACHE_DIR = os.path.join(BASE_DIR, ".cache", "thumbnails")
+
+# --- Datos semilla (se cargan una sola vez, ver src/config/migrations.py) ---
+DEFAULT_MENUS = [
+    {"name": "Papas Fritas", "price": 500, "image": "images/papas_fritas.png", "recipe": [("Papas", 5)]},
+    {"name": "Completo", "price": 1800, "image": "images/completo.png", "recipe": [("Vienesa", 1), ("Pan de completo", 1), ("Tomate", 1), ("Palta", 1)]},
+    {"name": "Hamburguesa", "price": 3500, "image": "images/hamburguesa.png", "recipe": [("Pan de hamburguesa", 1), ("Lamina de queso", 1), ("Churrasco de carne", 1)]},
+    {"name": "Pollo Frito", "price": 2500, "image": "images/pollo_frito.png", "recipe": [("Presa de pollo", 1), ("Porcion de harina", 1), ("Porcion de aceite", 1)]},
+    {"name": "Panqueques", "price": 2000, "image": "images/panqueques.png", "recipe": [("Panqueques", 2), ("Manjar", 1), ("Azucar flor", 1)]},
+    {"name": "Ensalada Mixta", "price": 1500, "image": "images/ensalada_mixta.png", "recipe": [("Lechuga", 1), ("Tomate", 1), ("Zanahoria rallada", 1)]},
+    {"name": "Pepsi", "price": 1100, "image": "images/pepsi.png", "recipe": [("Pepsi", 1)]}
+]
+
+DEFAULT_INGREDIENT_UNITS = {
+    'Papas': 'kg',
+    'Vienesa': 'unid',
+    'Pan de completo': 'unid',
+    'Tomate': 'kg',
+    'Palta': 'kg',
+    'Pan de hamburguesa': 'unid',
+    'Lamina de queso': 'unid',
+    'Churrasco de carne': 'unid',
+    'Presa de pollo': 'unid',
+    'Porcion de harina': 'kg',
+    'Porcion de aceite': 'unid',
+    'Panqueques': 'unid',
+    'Manjar': 'kg',
+    'Azucar flor': 'kg',
+    'Lechuga': 'kg',
+    'Zanahoria rallada': 'kg',
+    'Pepsi': 'unid',
 }
 
+# --- Sub-recetas (un menú usado como componente de otro, ver src/utils/bom.py) ---
+# Niveles máximos de anidación; una receta más profunda se trata como circular
+MAX_RECIPE_DEPTH = 8
+# Prefijo de los menús en el selector del constructor de recetas
+SUBRECIPE_PREFIX = "Menú: "
+
+# --- Libro de movimientos de stock (ver IngredientCRUD) ---
+# Tipos de movimiento: entregas y ajustes suman o restan, ventas y mermas restan
+MOVEMENT_KINDS = ("entrega", "venta", "ajuste", "merma")
+# Cada cuántos minutos se materializa la foto del stock (0 = solo a pedido)
+STOCK_SNAPSHOT_MINUTES = float(os.environ.get("POS_STOCK_SNAPSHOT_MINUTES", "10"))
+
 MENU_COLUMNS = ['nombre', 'precio']
 
 STOCK_COLUMNS = ["nombre", "unidad", "cantidad"]
 
-ORDER_COLUMNS = ["Nombre del Menu", "Cantidad", "Precio Unitario", "Subtotal"]
\ No newline at end of file
+ORDER_COLUMNS = ["Nombre del Menu", "Cantidad", "Precio Unitario", "Subtotal"]
+
+# Coincidencias mostradas por los selectores de cliente con búsqueda incremental
+CLIENT_SEARCH_LIMIT = 20
+
+# --- Boletas ---
+# Backend de impresión por terminal: 'pdf', 'text' (ancho fijo) o 'escpos' (impresora térmica)
+RECEIPT_BACKEND = os.environ.get("RECEIPT_BACKEND", "pdf")
+# Archivo o dispositivo de salida para 'text'/'escpos' (ej. /dev/usb/lp0). Vacío = boleta_{id}.txt/.bin
+RECEIPT_OUTPUT = os.environ.get("RECEIPT_OUTPUT", "")
+# Columnas por línea en papel de 80mm (Fuente A)
+RECEIPT_WIDTH = 48
+
+# --- Locales (una BD SQLite por local, ver LocationRegistry en src/config/database.py) ---
+# El local por defecto usa restaurante.db (o RESTAURANT_DB)
+DEFAULT_LOCATION = "principal"
+# Local de esta terminal: los servicios creados sin 'location' operan sobre su BD
+LOCATION = os.environ.get("POS_LOCATION", DEFAULT_LOCATION)
+# Otros locales: "norte,sur" (archivos restaurante_norte.db, ...) o "norte=/ruta/norte.db,sur=sur.db"
+LOCATIONS = os.environ.get("POS_LOCATIONS", "")
+
+# --- Respaldos en caliente (src/utils/backup.py) ---
+BACKUP_DIR = os.environ.get("POS_BACKUP_DIR", os.path.join(BASE_DIR, "backups"))
+# Respaldos que se conservan por BD (los más antiguos se borran)
+BACKUP_KEEP = int(os.environ.get("POS_BACKUP_KEEP", "7"))
+# Respaldo automático en segundo plano cada N minutos (0 = desactivado)
+BACKUP_INTERVAL_MINUTES = float(os.environ.get("POS_BACKUP_MINUTES", "0"))
+# Páginas copiadas por paso y pausa entre pasos: las escrituras de la caja entran entre medio
+BACKUP_STEP_PAGES = 64
+BACKUP_PAUSE_MS = 5
+
+# --- Diario de pedidos (src/utils/order_journal.py) ---
+# POS_ORDER_JOURNAL=1: la venta se confirma al quedar sincronizada en el diario y un hilo la aplica a la BD
+ORDER_JOURNAL = os.environ.get("POS_ORDER_JOURNAL", "") == "1"
+# Espera máxima (ms) para juntar varias ventas en un mismo fsync
+JOURNAL_GROUP_MS = float(os.environ.get("POS_JOURNAL_GROUP_MS", "2"))
+# Cada cuánto (ms) el aplicador pasa lo pendiente a la BD y cuántos pedidos por transacción
+JOURNAL_APPLY_MS = 50
+JOURNAL_APPLY_BATCH = 500
+# Tamaño del diario a partir del cual se compacta (se reescribe solo lo no aplicado)
+JOURNAL_COMPACT_BYTES = 4 * 1024 * 1024
+
+# --- Modo sin conexión (src/utils/offline_queue.py) ---
+# POS_OFFLINE=1: si la BD compartida no responde (bloqueada o inaccesible) la caja sigue vendiendo
+# contra una copia local de la carta y el stock, y sincroniza los pedidos al volver la BD
+OFFLINE_MODE = os.environ.get("POS_OFFLINE", "") == "1"
+# Carpeta local (no compartida) del archivo con la cola y la copia de la carta
+OFFLINE_DIR = os.environ.get("POS_OFFLINE_DIR", os.path.join(BASE_DIR, ".cache", "offline"))
+# Cada cuántos segundos se reintenta sincronizar y se refresca la copia local en línea
+OFFLINE_RETRY_SECONDS = float(os.environ.get("POS_OFFLINE_RETRY_SECONDS", "5"))
+OFFLINE_REFRESH_SECONDS = float(os.environ.get("POS_OFFLINE_REFRESH_SECONDS", "60"))
+# Pedidos por transacción al sincronizar
+OFFLINE_SYNC_BATCH = int(os.environ.get("POS_OFFLINE_SYNC_BATCH", "200"))
+# Venta sin conexión que al sincronizar ya no tiene stock: 'registrar' (se graba igual, el stock
+# queda negativo y se marca en conflicto) o 'rechazar' (no se graba, queda para revisión)
+OFFLINE_OVERSELL = os.environ.get("POS_OFFLINE_OVERSELL", "registrar")
+
+# --- Modo servidor (python main.py --server) ---
+SERVER_HOST = os.environ.get("POS_SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.environ.get("POS_SERVER_PORT", "8765"))
+
+# --- Perfil SQL (src/utils/sql_profiler.py) ---
+# POS_SQL_PROFILE=1 atribuye sentencias y tiempo SQL a cada acción y lo resume al cerrar
+SQL_PROFILE = os.environ.get("POS_SQL_PROFILE", "") == "1"
+# Sentencias más lentas que esto (ms) se informan por consola
+SQL_SLOW_MS = float(os.environ.get("POS_SQL_SLOW_MS", "50"))
+# Más repeticiones de la misma forma de sentencia en una acción = posible N+1
+SQL_REPEAT_LIMIT = int(os.environ.get("POS_SQL_REPEAT_LIMIT", "10"))
+# Si se indica, el resumen por acción se exporta a este CSV al cerrar
+SQL_PROFILE_CSV = os.environ.get("POS_SQL_PROFILE_CSV", "")
+
+# --- Telemetría (src/utils/telemetry.py) ---
+# POS_TELEMETRY=1 mide llamadas, latencias y errores de servicios, CRUD y SQL
+TELEMETRY = os.environ.get("POS_TELEMETRY", "") == "1"
+# Métricas en formato de texto de Prometheus (se reescribe cada TELEMETRY_EXPORT_SECONDS)
+TELEMETRY_METRICS_FILE = os.environ.get("POS_TELEMETRY_METRICS", "metrics.prom")
+# Trazas: un span JSON por línea. Vacío = sin archivo de trazas
+TELEMETRY_TRACE_FILE = os.environ.get("POS_TELEMETRY_TRACE", "")
+TELEMETRY_EXPORT_SECONDS = float(os.environ.get("POS_TELEMETRY_EXPORT_SECONDS", "15"))
+
+# --- Latencia de la interfaz (src/utils/ui_profiler.py) ---
+# POS_UI_PROFILE=1 mide cada botón desde el clic hasta que Tk vuelve a estar ocioso
+UI_PROFILE = os.environ.get("POS_UI_PROFILE", "") == "1"
+# Interacciones más lentas que esto (ms) guardan un perfil de cProfile
+UI_PROFILE_SLOW_MS = float(os.environ.get("POS_UI_PROFILE_MS", "100"))
+UI_PROFILE_DIR = os.path.join(BASE_DIR, ".cache", "ui_profiles")
+
+# --- Diagnóstico de memoria (src/utils/memory_watchdog.py) ---
+# POS_MEMORY_WATCH=1 traza asignaciones por acción; =detail además toma snapshots por acción (lento)
+MEMORY_WATCH = os.environ.get("POS_MEMORY_WATCH", "")
+# Marcos de pila por asignación: 1 alcanza para agrupar por línea y es bastante más barato
+MEMORY_WATCH_FRAMES = int(os.environ.get("POS_MEMORY_WATCH_FRAMES", "1"))
+# Cada cuántas acciones se registra un punto (memoria trazada + objetos vivos)
+MEMORY_WATCH_CHECK_EVERY = int(os.environ.get("POS_MEMORY_WATCH_CHECK_EVERY", "200"))
@@ -1,6 +1,12 @@
 import os
+import threading
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from src.config.consts import (BACKUP_DIR, BACKUP_INTERVAL_MINUTES, BACKUP_KEEP, DEFAULT_LOCATION, LOCATION, LOCATIONS,
+                               OFFLINE_DIR, OFFLINE_MODE, ORDER_JOURNAL, STOCK_SNAPSHOT_MINUTES)
+from src.utils import backup as db_backup
+from src.utils.sql_profiler import sql_profiler
+from src.utils.telemetry import telemetry
 
 # Definimos Base a nivel de módulo para que los modelos puedan heredar de ella
 # sin necesitar una instancia de la clase DatabaseManager (necesario por cómo funciona SQLAlchemy)
@@ -8,21 +14,49 @@ Base = declarative_base()
 
 class DatabaseManager:
     def __init__(self, db_name="restaurante.db"):
-        self._db_name = db_name
         self._base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self._engine = None
+        self._backups = None
+        # Diario de pedidos (src/utils/order_journal.py); None = los pedidos se graban directo
+        self.journal = None
+        # Modo sin conexión (src/utils/offline_queue.py); None = un error de BD corta la venta
+        self.offline = None
+        self._stock_snapshots = None
+        self.configure(db_name)
+
+    def configure(self, db_name: str):
+        """
+        Apunta esta instancia a otro archivo de BD (relativo a la raíz del proyecto o absoluto).
+        Como los servicios comparten la instancia global 'db', sirve para que benchmarks y
+        pruebas de carga usen una BD generada sin tocar restaurante.db.
+        """
+        if self._engine is not None:
+            self._engine.dispose()
+        self._db_name = db_name
         self._db_path = os.path.join(self._base_dir, self._db_name)
         self._database_url = f"sqlite:///{self._db_path}"
         
         # Encapsulamiento del motor y la sesión
         self._engine = create_engine(self._database_url, echo=False)
         self._session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self._engine)
+        # Perfil SQL por acción (solo escucha eventos si POS_SQL_PROFILE=1 o sql_profiler.enable())
+        sql_profiler.attach(self._engine)
+        # Métricas y trazas (solo si POS_TELEMETRY=1 o telemetry.enable())
+        telemetry.attach(self._engine)
 
     def create_tables(self):
-        """Método público para inicializar la estructura de la BD."""
+        """
+        Método público para inicializar la estructura de la BD.
+        Crea/actualiza el esquema y carga los datos semilla mediante migraciones versionadas:
+        si la BD ya está al día, solo cuesta una consulta de versión.
+        """
         # Importación local para registrar los modelos en Base.metadata antes de crear
         import src.models 
+        from src.config.migrations import run_migrations
         print(f"Inicializando Base de Datos POO en: {self._database_url}")
-        Base.metadata.create_all(bind=self._engine)
+        applied = run_migrations(self._engine)
+        if applied:
+            print(f"Migraciones aplicadas: {', '.join(applied)}")
 
     def get_session(self):
         """
@@ -38,5 +72,167 @@ class DatabaseManager:
         finally:
             session.close()
 
+    @staticmethod
+    def begin_write(session):
+        """
+        Abre la transacción de la sesión con BEGIN IMMEDIATE: toma el candado de escritura de
+        SQLite antes de la primera lectura. pysqlite difiere el BEGIN hasta el primer INSERT o
+        UPDATE, así que sin esto otra caja puede escribir entre leer el stock y descontarlo.
+        Debe ser la primera sentencia de la sesión.
+        """
+        session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+
+    # --- Respaldos en caliente (src/utils/backup.py) ---
+    def backup(self, directory: str = BACKUP_DIR, method: str = "steps", keep: int = BACKUP_KEEP) -> db_backup.BackupResult:
+        """
+        Respalda la BD sin detener la aplicación, la verifica y rota los antiguos.
+        method: 'steps' (API de respaldo por pasos, no bloquea los pedidos) o 'vacuum'
+        (VACUUM INTO: copia compacta, bloquea escrituras mientras dura).
+        """
+        dest = db_backup.snapshot_path(self._db_path, directory)
+        if method == "vacuum":
+            result = db_backup.vacuum_backup(self._db_path, dest)
+        else:
+            result = db_backup.online_backup(self._db_path, dest)
+        db_backup.rotate(self._db_path, directory, keep)
+        return result
+
+    def list_backups(self, directory: str = BACKUP_DIR) -> list:
+        return db_backup.list_backups(self._db_path, directory)
+
+    def restore(self, snapshot: str, directory: str = BACKUP_DIR) -> str:
+        """
+        Restaura un respaldo sobre esta BD (con la aplicación detenida). Cierra antes las
+        conexiones del pool y retorna la ruta del respaldo del estado anterior.
+        """
+        self._engine.dispose()
+        return db_backup.restore(snapshot, self._db_path, directory)
+
+    def start_backups(self, interval_minutes: float = BACKUP_INTERVAL_MINUTES):
+        """Respaldo periódico en un hilo de fondo (no hace nada con intervalo 0)."""
+        if interval_minutes <= 0 or self._backups is not None:
+            return
+        self._backups = db_backup.BackupScheduler(lambda: self._db_path, interval_minutes * 60)
+        self._backups.start()
+
+    def stop_backups(self):
+        if self._backups is not None:
+            self._backups.stop()
+            self._backups = None
+
+    # --- Diario de pedidos (src/utils/order_journal.py) ---
+    def start_journal(self, enabled: bool = ORDER_JOURNAL, **options) -> int:
+        """
+        Activa el diario de pedidos de esta BD (no hace nada si enabled es False). Antes de
+        aceptar ventas aplica lo que haya quedado pendiente de una ejecución anterior y
+        retorna cuántos pedidos recuperó. El diario vive junto a la BD (restaurante.journal).
+        """
+        if not enabled or self.journal is not None:
+            return 0
+        from src.utils.order_journal import OrderJournal
+        self.journal = OrderJournal(self, os.path.splitext(self._db_path)[0] + ".journal", **options)
+        return self.journal.start()
+
+    def stop_journal(self):
+        """Aplica lo pendiente y cierra el diario (al cerrar la aplicación o el servidor)."""
+        if self.journal is not None:
+            self.journal.stop()
+            self.journal = None
+
+    # --- Modo sin conexión (src/utils/offline_queue.py) ---
+    def start_offline(self, enabled: bool = OFFLINE_MODE, **options):
+        """
+        Activa la cola local de ventas sin conexión (no hace nada si enabled es False). El
+        archivo local va en OFFLINE_DIR, fuera de la carpeta compartida de la BD.
+        """
+        if not enabled or self.offline is not None:
+            return
+        from src.utils.offline_queue import OfflineQueue
+        stem = os.path.splitext(os.path.basename(self._db_path))[0]
+        self.offline = OfflineQueue(self, os.path.join(OFFLINE_DIR, f"{stem}.offline.db"), **options)
+        self.offline.start()
+
+    def stop_offline(self):
+        """Intenta sincronizar lo pendiente y cierra la cola local (lo no sincronizado queda en ella)."""
+        if self.offline is not None:
+            self.offline.stop()
+            self.offline = None
+
+    # --- Foto periódica del stock (src/utils/stock_snapshots.py) ---
+    def start_stock_snapshots(self, interval_minutes: float = STOCK_SNAPSHOT_MINUTES):
+        """Materializa la foto del stock en un hilo de fondo (no hace nada con intervalo 0)."""
+        if interval_minutes <= 0 or self._stock_snapshots is not None:
+            return
+        from src.utils.stock_snapshots import StockSnapshotScheduler
+        self._stock_snapshots = StockSnapshotScheduler(self, interval_minutes * 60)
+        self._stock_snapshots.start()
+
+    def stop_stock_snapshots(self):
+        if self._stock_snapshots is not None:
+            self._stock_snapshots.stop()
+            self._stock_snapshots = None
+
 # Instancia global (Singleton implícito) para ser usada en el resto de la app
-db = DatabaseManager()
\ No newline at end of file
+# RESTAURANT_DB permite usar otro archivo (ej. una BD de prueba) sin cambiar código
+db = DatabaseManager(os.environ.get("RESTAURANT_DB", "restaurante.db"))
+
+
+def parse_locations(spec: str) -> dict:
+    """'norte,sur=/ruta/sur.db' -> {'norte': 'restaurante_norte.db', 'sur': '/ruta/sur.db'}"""
+    shards = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, db_name = entry.partition("=")
+        shards[name.strip()] = db_name.strip() or f"restaurante_{name.strip()}.db"
+    return shards
+
+class LocationRegistry:
+    """
+    Registro de locales: cada uno tiene su propia BD SQLite (shard) y su DatabaseManager.
+
+    - El local por defecto es la instancia global 'db' (benchmarks y pruebas que la
+      reconfiguran siguen funcionando igual).
+    - Los demás se declaran en POS_LOCATIONS o con register(); su BD se crea y migra la
+      primera vez que se usa.
+    - get(None) retorna el local de esta terminal (POS_LOCATION): los servicios creados sin
+      'location' operan sobre él.
+    """
+
+    def __init__(self, default: DatabaseManager, default_name: str, current: str, shards: dict):
+        self._default = default
+        self.default_name = default_name
+        self.current = current
+        self._shards = {name: db_name for name, db_name in shards.items() if name != default_name}
+        if current != default_name:
+            # El local de la terminal no necesita repetirse en POS_LOCATIONS
+            self._shards.setdefault(current, f"restaurante_{current}.db")
+        self._managers = {}
+        self._lock = threading.Lock()
+
+    def names(self) -> list:
+        """Locales registrados (el por defecto primero)."""
+        return [self.default_name] + list(self._shards)
+
+    def register(self, name: str, db_name: str = None):
+        """Agrega (o re-apunta) un local en tiempo de ejecución, ej. en benchmarks."""
+        with self._lock:
+            self._shards[name] = db_name or f"restaurante_{name}.db"
+            previous = self._managers.pop(name, None)
+        if previous is not None:
+            previous._engine.dispose()
+
+    def get(self, name: str = None) -> DatabaseManager:
+        name = name or self.current
+        if name == self.default_name:
+            return self._default
+        with self._lock:
+            manager = self._managers.get(name)
+            if manager is None:
+                if name not in self._shards:
+                    raise ValueError(f"Local '{name}' no registrado (ver POS_LOCATIONS).")
+                manager = DatabaseManager(self._shards[name])
+                manager.create_tables()
+                self._managers[name] = manager
+        return manager
+
+# Un shard por local; POS_LOCATION elige el de esta terminal
+locations = LocationRegistry(db, DEFAULT_LOCATION, LOCATION, parse_locations(LOCATIONS))
@@ -0,0 +1,344 @@
+"""
+Migraciones versionadas del esquema y de los datos semilla.
+
+Cada migración se aplica UNA sola vez por base de datos y queda registrada en la tabla
+schema_version. Un arranque normal solo ejecuta 'SELECT MAX(version)'.
+
+Para cambiar el esquema de una BD existente (columnas, índices, datos), agregar una función
+al final de MIGRATIONS con el siguiente número de versión. Las migraciones deben ser
+idempotentes: una BD anterior a este sistema pasa por todas ellas desde la versión 0.
+"""
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from src.config.consts import DEFAULT_MENUS, DEFAULT_INGREDIENT_UNITS
+
+def _columns(connection, table: str) -> set:
+    return {row[1] for row in connection.execute(text(f"PRAGMA table_info({table})"))}
+
+def _table_exists(connection, table: str) -> bool:
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table}
+    ).scalar() is not None
+
+def _rebuild_table(connection, table, columns: str):
+    """
+    Reconstruye 'table' (un Table del modelo) copiando 'columns' desde la versión anterior,
+    renombrada a <tabla>_old. Si una ejecución previa se cortó a medias (antes de que las
+    migraciones fueran transaccionales) retoma desde la <tabla>_old que haya quedado.
+    """
+    old = f"{table.name}_old"
+    if not _table_exists(connection, old):
+        # Los índices se mueven con la tabla renombrada: se borran para recrearlos con la nueva
+        indexes = [name for (name,) in connection.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :name AND sql IS NOT NULL"
+        ), {"name": table.name})]
+        for name in indexes:
+            connection.execute(text(f"DROP INDEX {name}"))
+        connection.execute(text(f"ALTER TABLE {table.name} RENAME TO {old}"))
+    table.create(bind=connection, checkfirst=True)
+    for index in table.indexes:
+        index.create(bind=connection, checkfirst=True)
+    # OR IGNORE: las filas que alcanzó a copiar la ejecución cortada ya están
+    connection.execute(text(f"INSERT OR IGNORE INTO {table.name} ({columns}) SELECT {columns} FROM {old}"))
+    connection.execute(text(f"DROP TABLE {old}"))
+
+def create_schema(connection):
+    """Tablas del modelo ORM (create_all no toca las que ya existen)."""
+    from src.config.database import Base
+    Base.metadata.create_all(bind=connection)
+
+def add_order_detail_snapshots(connection):
+    """
+    Agrega nombre y precio unitario a order_details y los rellena en pedidos antiguos.
+    El precio se deriva de subtotal / cantidad (lo realmente cobrado), no del precio actual del menú.
+    """
+    columns = _columns(connection, "order_details")
+    if "menu_name" not in columns:
+        connection.execute(text("ALTER TABLE order_details ADD COLUMN menu_name VARCHAR"))
+    if "unit_price" not in columns:
+        connection.execute(text("ALTER TABLE order_details ADD COLUMN unit_price FLOAT"))
+
+    connection.execute(text("""
+        UPDATE order_details
+        SET menu_name = COALESCE((SELECT m.name FROM menu_items m WHERE m.id = order_details.menu_item_id), 'Menú eliminado')
+        WHERE menu_name IS NULL
+    """))
+    connection.execute(text("""
+        UPDATE order_details
+        SET unit_price = subtotal / quantity
+        WHERE unit_price IS NULL AND quantity > 0
+    """))
+
+def add_menu_image_paths(connection):
+    """
+    Agrega la imagen como metadato de cada menú (antes era la constante MENU_IMAGES)
+    y la rellena para los menús por defecto ya creados.
+    """
+    if "image_path" not in _columns(connection, "menu_items"):
+        connection.execute(text("ALTER TABLE menu_items ADD COLUMN image_path VARCHAR"))
+
+    legacy_images = {
+        "Papas Fritas": "images/papas_fritas.png",
+        "Completo": "images/completo.png",
+        "Hamburguesa": "images/hamburguesa.png",
+        "Pepsi": "images/pepsi.png",
+        "Panqueques": "images/panqueques.png",
+        "Pollo Frito": "images/pollo_frito.png",
+        "Ensalada Mixta": "images/ensalada_mixta.png",
+    }
+    connection.execute(
+        text("UPDATE menu_items SET image_path = :path WHERE name = :name AND image_path IS NULL"),
+        [{"name": name, "path": path} for name, path in legacy_images.items()]
+    )
+
+def seed_default_menus(connection) -> int:
+    """
+    Crea en bloque los menús por defecto que falten, con sus ingredientes (stock 0) y recetas.
+    Son pocas consultas en total, sin importar cuántos menús/ingredientes haya.
+    Retorna la cantidad de menús creados.
+    """
+    from src.models import MenuItemModel, IngredientModel, RecipeModel
+    from src.utils.bom import new_recipe_version
+
+    existing_menus = {name for (name,) in connection.execute(text("SELECT name FROM menu_items"))}
+    pending = [menu for menu in DEFAULT_MENUS if menu["name"] not in existing_menus]
+    if not pending:
+        return 0
+
+    # Ingredientes: comparación sin distinguir mayúsculas (igual que IngredientCRUD.get_by_name)
+    def load_ingredients():
+        return {name.lower(): ing_id for ing_id, name in connection.execute(text("SELECT id, name FROM ingredients"))}
+
+    ingredient_ids = load_ingredients()
+    missing = []
+    for menu in pending:
+        for ing_name, _ in menu["recipe"]:
+            if ing_name.lower() not in ingredient_ids and ing_name not in missing:
+                missing.append(ing_name)
+
+    if missing:
+        connection.execute(IngredientModel.__table__.insert(), [
+            {"name": name, "unit": DEFAULT_INGREDIENT_UNITS.get(name, "unid"), "quantity": 0.0} for name in missing
+        ])
+        ingredient_ids = load_ingredients()
+
+    rows = [{"name": menu["name"], "price": menu["price"], "description": "", "image_path": menu["image"]} for menu in pending]
+    # En una BD anterior a la migración 'sub_recipes' la columna todavía no existe
+    if "recipe_version" in _columns(connection, "menu_items"):
+        version = new_recipe_version()
+        for row in rows:
+            row["recipe_version"] = version
+    connection.execute(MenuItemModel.__table__.insert(), rows)
+    menu_ids = {name: menu_id for menu_id, name in connection.execute(text("SELECT id, name FROM menu_items"))}
+
+    connection.execute(RecipeModel.__table__.insert(), [
+        {"menu_item_id": menu_ids[menu["name"]], "ingredient_id": ingredient_ids[ing_name.lower()], "required_quantity": qty}
+        for menu in pending for ing_name, qty in menu["recipe"]
+    ])
+
+    print(f"Menús por defecto creados: {', '.join(menu['name'] for menu in pending)}")
+    return len(pending)
+
+def add_history_indexes(connection):
+    """Índices para el historial paginado y los JOIN de recetas/detalles en BDs existentes."""
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_orders_date ON orders (date)",
+        "CREATE INDEX IF NOT EXISTS ix_orders_client_date ON orders (client_id, date)",
+        "CREATE INDEX IF NOT EXISTS ix_order_details_order_id ON order_details (order_id)",
+        "CREATE INDEX IF NOT EXISTS ix_recipes_menu_item_id ON recipes (menu_item_id)",
+        "CREATE INDEX IF NOT EXISTS ix_recipes_ingredient_id ON recipes (ingredient_id)",
+    ]:
+        connection.execute(text(statement))
+
+def add_client_search_indexes(connection):
+    """Índices NOCASE para la búsqueda por prefijo de clientes (ClientCRUD.search_prefix)."""
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_clients_name_nocase ON clients (name COLLATE NOCASE)"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_clients_email_nocase ON clients (email COLLATE NOCASE)"))
+
+def add_sub_recipes(connection):
+    """
+    Sub-recetas: una línea de receta puede apuntar a otro menú (component_menu_id) en vez de
+    a un ingrediente, y cada menú tiene recipe_version para la caché de listas de materiales.
+    SQLite no permite quitar el NOT NULL de ingredient_id con ALTER: la tabla se reconstruye
+    conservando los ids. Una recipes_old que quedó de una ejecución cortada se termina de copiar.
+    """
+    from src.models import RecipeModel
+
+    if "recipe_version" not in _columns(connection, "menu_items"):
+        connection.execute(text("ALTER TABLE menu_items ADD COLUMN recipe_version INTEGER NOT NULL DEFAULT 0"))
+
+    if "component_menu_id" in _columns(connection, "recipes") and not _table_exists(connection, "recipes_old"):
+        return
+    _rebuild_table(connection, RecipeModel.__table__, "id, menu_item_id, ingredient_id, required_quantity")
+
+def add_order_journal_seq(connection):
+    """
+    Número de secuencia del diario de pedidos en cada pedido aplicado desde él: al recuperar
+    tras una caída se saltan los ya aplicados (índice único, solo para los que lo tienen).
+    """
+    if "journal_seq" not in _columns(connection, "orders"):
+        connection.execute(text("ALTER TABLE orders ADD COLUMN journal_seq INTEGER"))
+    connection.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_orders_journal_seq ON orders (journal_seq) WHERE journal_seq IS NOT NULL"
+    ))
+
+def add_stock_ledger(connection):
+    """
+    Libro de movimientos de stock y fotos periódicas. El stock que había pasa a ser un
+    movimiento 'ajuste' de saldo inicial por ingrediente y ingredients.quantity queda en 0
+    como foto vacía: stock actual = foto + movimientos posteriores.
+    """
+    from datetime import datetime
+    from src.models import IngredientMovementModel, IngredientSnapshotModel
+
+    IngredientMovementModel.__table__.create(bind=connection, checkfirst=True)
+    IngredientSnapshotModel.__table__.create(bind=connection, checkfirst=True)
+    if "snapshot_movement_id" in _columns(connection, "ingredients"):
+        return
+    connection.execute(text("ALTER TABLE ingredients ADD COLUMN snapshot_movement_id INTEGER NOT NULL DEFAULT 0"))
+    connection.execute(text("""
+        INSERT INTO ingredient_movements (ingredient_id, kind, quantity, date, note)
+        SELECT id, 'ajuste', quantity, :now, 'Saldo inicial' FROM ingredients WHERE quantity <> 0
+    """), {"now": datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")})   # Formato de DateTime de SQLAlchemy
+    connection.execute(text("UPDATE ingredients SET quantity = 0"))
+
+def add_order_offline_id(connection):
+    """
+    Id de la venta tomada sin conexión en cada pedido sincronizado desde la cola local de una
+    terminal: si la sincronización se corta después del commit, al reintentar no se duplica.
+    """
+    if "offline_id" not in _columns(connection, "orders"):
+        connection.execute(text("ALTER TABLE orders ADD COLUMN offline_id VARCHAR"))
+    connection.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_orders_offline_id ON orders (offline_id) WHERE offline_id IS NOT NULL"
+    ))
+
+def add_movements_autoincrement(connection):
+    """
+    Reconstruye ingredient_movements con AUTOINCREMENT. Sin él, SQLite reutiliza los ids más
+    altos borrados junto con un ingrediente y los movimientos nuevos quedan por debajo de la
+    marca (snapshot_movement_id) de otros ingredientes: el stock actual no los suma.
+    La secuencia parte de la mayor marca usada, aunque ese id ya no exista. Una
+    ingredient_movements_old que quedó de una ejecución cortada se termina de copiar.
+    """
+    from src.models import IngredientMovementModel
+
+    sql = connection.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'ingredient_movements'"
+    )).scalar()
+    leftover = _table_exists(connection, "ingredient_movements_old")
+    if not leftover and (sql is None or "AUTOINCREMENT" in sql.upper()):
+        return
+    _rebuild_table(connection, IngredientMovementModel.__table__, "id, ingredient_id, kind, quantity, date, order_id, note")
+
+    watermark = connection.execute(text("""
+        SELECT MAX(COALESCE((SELECT MAX(id) FROM ingredient_movements), 0),
+                   COALESCE((SELECT MAX(snapshot_movement_id) FROM ingredients), 0),
+                   COALESCE((SELECT MAX(movement_id) FROM ingredient_snapshots), 0))
+    """)).scalar()
+    connection.execute(text("DELETE FROM sqlite_sequence WHERE name = 'ingredient_movements'"))
+    connection.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('ingredient_movements', :seq)"), {"seq": watermark})
+
+def add_journal_state(connection):
+    """
+    Marca durable de la última secuencia aplicada del diario de pedidos. Antes se derivaba de
+    MAX(orders.journal_seq): al borrar el último pedido, la recuperación lo volvía a aplicar
+    (y a descontar su stock) desde el diario sin compactar.
+    """
+    from src.models import JournalStateModel
+
+    JournalStateModel.__table__.create(bind=connection, checkfirst=True)
+    connection.execute(text("""
+        INSERT OR IGNORE INTO journal_state (id, applied_seq)
+        SELECT 1, COALESCE(MAX(journal_seq), 0) FROM orders
+    """))
+
+def backfill_order_detail_snapshots(connection):
+    """
+    Completa lo que 'order_detail_snapshots' dejó en NULL: su relleno salta las líneas con
+    cantidad 0 (no hay precio unitario que derivar), que quedan con el subtotal como precio.
+    """
+    connection.execute(text("""
+        UPDATE order_details
+        SET menu_name = COALESCE((SELECT m.name FROM menu_items m WHERE m.id = order_details.menu_item_id), 'Menú eliminado')
+        WHERE menu_name IS NULL
+    """))
+    connection.execute(text("""
+        UPDATE order_details
+        SET unit_price = CASE WHEN quantity > 0 THEN subtotal / quantity ELSE COALESCE(subtotal, 0) END
+        WHERE unit_price IS NULL
+    """))
+
+# (versión, nombre, función). Nunca reordenar ni renumerar: solo agregar al final.
+MIGRATIONS = [
+    (1, "create_schema", create_schema),
+    (2, "order_detail_snapshots", add_order_detail_snapshots),
+    (3, "menu_image_paths", add_menu_image_paths),
+    (4, "seed_default_menus", seed_default_menus),
+    (5, "history_indexes", add_history_indexes),
+    (6, "client_search_indexes", add_client_search_indexes),
+    (7, "sub_recipes", add_sub_recipes),
+    (8, "order_journal_seq", add_order_journal_seq),
+    (9, "stock_ledger", add_stock_ledger),
+    (10, "order_offline_id", add_order_offline_id),
+    (11, "movements_autoincrement", add_movements_autoincrement),
+    (12, "journal_state", add_journal_state),
+    (13, "order_detail_backfill", backfill_order_detail_snapshots),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(connection) -> int:
+    try:
+        return connection.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+    except OperationalError:
+        # BD nueva o anterior al sistema de migraciones
+        return 0
+
+def run_migrations(engine) -> list:
+    """
+    Aplica las migraciones pendientes en una sola transacción.
+    Retorna los nombres de las migraciones aplicadas (lista vacía si la BD ya estaba al día).
+
+    pysqlite solo envía BEGIN antes de un INSERT/UPDATE/DELETE: un ALTER o CREATE dentro de
+    engine.begin() se confirma solo y un error dejaría el esquema a medias. Por eso la conexión
+    desactiva la transacción implícita (isolation_level=None) y abre con BEGIN IMMEDIATE, como
+    DatabaseManager.begin_write: el DDL entra en la transacción y el candado de escritura se
+    toma antes de releer la versión, así dos terminales que arrancan juntas no migran dos veces.
+    """
+    with engine.connect() as connection:
+        if get_schema_version(connection) >= LATEST_VERSION:
+            return []
+
+    applied = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            connection.execute(text("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR NOT NULL,
+                    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """))
+            # Se relee con el candado tomado: otra terminal pudo migrar mientras tanto
+            current = get_schema_version(connection)
+
+            for version, name, migration in MIGRATIONS:
+                if version <= current:
+                    continue
+                migration(connection)
+                connection.execute(
+                    text("INSERT OR IGNORE INTO schema_version (version, name) VALUES (:version, :name)"),
+                    {"version": version, "name": name}
+                )
+                applied.append(name)
+        except BaseException:
+            # SQLite ya deshace solo algunos errores (ej. disco lleno): entonces no hay transacción
+            if connection.connection.driver_connection.in_transaction:
+                connection.exec_driver_sql("ROLLBACK")
+            raise
+        connection.exec_driver_sql("COMMIT")
+
+    return applied
@@ -1,12 +1,21 @@
 from sqlalchemy.orm import Session
 from src.models import ClientModel
+from src.read_models import ClientRow
+from src.utils.telemetry import instrument_crud
 from typing import List, Optional
 
+@instrument_crud
 class ClientCRUD:
     @staticmethod
     def get_all(session: Session) -> List[ClientModel]:
         return session.query(ClientModel).all()
 
+    @staticmethod
+    def get_all_rows(session: Session) -> List[ClientRow]:
+        """Proyección de solo lectura (sin entidades ORM)."""
+        query = session.query(ClientModel.id, ClientModel.name, ClientModel.email)
+        return [ClientRow._make(row) for row in query.order_by(ClientModel.id)]
+
     @staticmethod
     def get_by_email(session: Session, email: str) -> Optional[ClientModel]:
         return session.query(ClientModel).filter(ClientModel.email == email).first()
@@ -16,6 +25,24 @@ class ClientCRUD:
     def get_by_id(session: Session, client_id: int) -> Optional[ClientModel]:
         return session.query(ClientModel).filter(ClientModel.id == client_id).first()
     # --------------------
+
+    @staticmethod
+    def search_prefix(session: Session, prefix: str, limit: int = 20) -> List[ClientRow]:
+        """
+        Clientes cuyo nombre o email comienza con 'prefix' (sin distinguir mayúsculas).
+        Se usa un rango [prefix, prefix + U+10FFFF) con COLLATE NOCASE en vez de LIKE, así SQLite
+        recorre solo el tramo de los índices ix_clients_name_nocase / ix_clients_email_nocase.
+        """
+        upper = prefix + "\U0010ffff"
+        found = {}
+        for column in (ClientModel.name, ClientModel.email):
+            key = column.collate("NOCASE")
+            rows = session.query(ClientModel.id, ClientModel.name, ClientModel.email).filter(
+                key >= prefix, key < upper
+            ).order_by(key).limit(limit)
+            for row in rows:
+                found.setdefault(row.id, ClientRow._make(row))
+        return sorted(found.values(), key=lambda c: (c.name.lower(), c.id))[:limit]
     
     @staticmethod
     def create(session: Session, name: str, email: str) -> ClientModel:
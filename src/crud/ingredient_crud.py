@@ -1,17 +1,58 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func # <-- IMPORTANTE
-from src.models import IngredientModel
+from datetime import datetime
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, update, insert, delete, select, literal, bindparam # <-- IMPORTANTE
+from src.models import IngredientModel, IngredientMovementModel, IngredientSnapshotModel
+from src.read_models import IngredientRow, MovementRow
+from src.utils.telemetry import instrument_crud
 from typing import List, Optional
 
+@instrument_crud
 class IngredientCRUD:
     """
     Clase responsable de las operaciones CRUD directas en la base de datos para Ingredientes.
+
+    El stock no se modifica en el lugar: cada entrega, venta, ajuste o merma agrega una fila a
+    ingredient_movements. ingredients.quantity es la última foto materializada (take_snapshot)
+    y el stock actual es esa foto más los movimientos posteriores (stock_column).
     """
 
+    @staticmethod
+    def stock_column():
+        """Expresión SQL del stock actual de IngredientModel (usable dentro de otras consultas)."""
+        delta = select(func.coalesce(func.sum(IngredientMovementModel.quantity), 0.0)).where(
+            IngredientMovementModel.ingredient_id == IngredientModel.id,
+            IngredientMovementModel.id > IngredientModel.snapshot_movement_id,
+        ).scalar_subquery()
+        return IngredientModel.quantity + delta
+
     @staticmethod
     def get_all(session: Session) -> List[IngredientModel]:
         return session.query(IngredientModel).all()
 
+    @staticmethod
+    def get_all_rows(session: Session) -> List[IngredientRow]:
+        """Proyección de solo lectura (sin entidades ORM) con el stock actual."""
+        query = session.query(IngredientModel.id, IngredientModel.name, IngredientModel.unit, IngredientCRUD.stock_column())
+        return [IngredientRow._make(row) for row in query.order_by(IngredientModel.id)]
+
+    @staticmethod
+    def get_by_id(session: Session, ingredient_id: int) -> Optional[IngredientModel]:
+        return session.get(IngredientModel, ingredient_id)
+
+    @staticmethod
+    def get_stock_rows(session: Session, ingredient_ids: list) -> dict:
+        """{id: IngredientRow} con el stock actual de varios ingredientes en una sola consulta."""
+        query = session.query(
+            IngredientModel.id, IngredientModel.name, IngredientModel.unit, IngredientCRUD.stock_column()
+        ).filter(IngredientModel.id.in_(ingredient_ids))
+        return {row[0]: IngredientRow._make(row) for row in query}
+
+    @staticmethod
+    def get_quantities(session: Session, ingredient_ids: list) -> dict:
+        """Stock actual {id: cantidad} de varios ingredientes en una sola consulta."""
+        query = session.query(IngredientModel.id, IngredientCRUD.stock_column()).filter(IngredientModel.id.in_(ingredient_ids))
+        return dict(query.all())
+
     @staticmethod
     def get_by_name(session: Session, name: str) -> Optional[IngredientModel]:
         # CAMBIO: Usamos func.lower para que 'Vienesa' sea igual a 'vienesa'
@@ -19,15 +60,92 @@ class IngredientCRUD:
 
     @staticmethod
     def create(session: Session, name: str, unit: str, quantity: float) -> IngredientModel:
-        new_ing = IngredientModel(name=name, unit=unit, quantity=quantity)
+        # Foto en 0: el stock inicial entra como movimiento 'entrega'
+        new_ing = IngredientModel(name=name, unit=unit, quantity=0.0)
         session.add(new_ing)
+        if quantity:
+            session.flush()
+            IngredientCRUD.add_movement(session, new_ing.id, "entrega", quantity)
         return new_ing
 
     @staticmethod
-    def update_quantity(session: Session, ingredient: IngredientModel, amount: float):
-        ingredient.quantity += amount
-        session.add(ingredient)
-    
+    def add_movement(session: Session, ingredient_id: int, kind: str, quantity: float,
+                     order_id: Optional[int] = None, note: Optional[str] = None):
+        """Agrega un movimiento con signo (positivo entra, negativo sale)."""
+        IngredientCRUD.add_movements(session, [{
+            "ingredient_id": ingredient_id, "kind": kind, "quantity": quantity, "order_id": order_id, "note": note,
+        }])
+
+    @staticmethod
+    def add_movements(session: Session, movements: list):
+        """Varios movimientos en un solo executemany (dicts con las columnas de IngredientMovementModel)."""
+        if movements:
+            session.execute(insert(IngredientMovementModel), movements)
+
+    @staticmethod
+    def get_movements(session: Session, ingredient_id: int, limit: Optional[int] = None) -> List[MovementRow]:
+        """Movimientos de un ingrediente, del más reciente al más antiguo."""
+        query = select(
+            IngredientMovementModel.id, IngredientMovementModel.date, IngredientMovementModel.kind,
+            IngredientMovementModel.quantity, IngredientMovementModel.order_id, IngredientMovementModel.note
+        ).where(IngredientMovementModel.ingredient_id == ingredient_id).order_by(IngredientMovementModel.id.desc()).limit(limit)
+        return [MovementRow._make(row) for row in session.execute(query)]
+
+    @staticmethod
+    def take_snapshot(session: Session, taken_at: Optional[datetime] = None) -> int:
+        """
+        Materializa la foto del stock: suma a ingredients.quantity los movimientos hasta el
+        último id y guarda una fila en ingredient_snapshots por ingrediente que cambió.
+        Los movimientos que se agreguen mientras tanto quedan para la próxima foto.
+        Retorna la cantidad de ingredientes actualizados.
+        """
+        movement = IngredientMovementModel
+        watermark = session.query(func.max(movement.id)).scalar() or 0
+        deltas = session.execute(
+            select(movement.ingredient_id, func.sum(movement.quantity))
+            .join(IngredientModel, IngredientModel.id == movement.ingredient_id)
+            .where(movement.id > IngredientModel.snapshot_movement_id, movement.id <= watermark)
+            .group_by(movement.ingredient_id)
+        ).all()
+        if not deltas:
+            return 0
+
+        table = IngredientModel.__table__
+        session.execute(
+            update(table).where(table.c.id == bindparam("ing_id"))
+            .values(quantity=table.c.quantity + bindparam("delta"), snapshot_movement_id=watermark),
+            [{"ing_id": ingredient_id, "delta": delta} for ingredient_id, delta in deltas]
+        )
+        session.execute(insert(IngredientSnapshotModel).from_select(
+            ["ingredient_id", "movement_id", "quantity", "taken_at"],
+            select(table.c.id, literal(watermark), table.c.quantity, literal(taken_at or datetime.now(), IngredientSnapshotModel.taken_at.type))
+            .where(table.c.id.in_([ingredient_id for ingredient_id, _ in deltas]))
+        ))
+        return len(deltas)
+
+    @staticmethod
+    def get_stock_at(session: Session, when: datetime) -> List[IngredientRow]:
+        """
+        Stock de cada ingrediente a una fecha: la última foto tomada hasta entonces más los
+        movimientos posteriores a ella con fecha <= when (sin recorrer el historial completo).
+        """
+        snapshot, latest = aliased(IngredientSnapshotModel), aliased(IngredientSnapshotModel)
+        last_snapshot = select(latest.id).where(
+            latest.ingredient_id == IngredientModel.id, latest.taken_at <= when
+        ).order_by(latest.taken_at.desc(), latest.id.desc()).limit(1).correlate(IngredientModel).scalar_subquery()
+        delta = select(func.coalesce(func.sum(IngredientMovementModel.quantity), 0.0)).where(
+            IngredientMovementModel.ingredient_id == IngredientModel.id,
+            IngredientMovementModel.id > func.coalesce(snapshot.movement_id, 0),
+            IngredientMovementModel.date <= when,
+        ).correlate(IngredientModel, snapshot).scalar_subquery()
+        query = select(
+            IngredientModel.id, IngredientModel.name, IngredientModel.unit, func.coalesce(snapshot.quantity, 0.0) + delta
+        ).outerjoin(snapshot, snapshot.id == last_snapshot)
+        return [IngredientRow._make(row) for row in session.execute(query.order_by(IngredientModel.id))]
+
     @staticmethod
     def delete(session: Session, ingredient: IngredientModel):
-        session.delete(ingredient)
\ No newline at end of file
+        # Sus movimientos y fotos se van con él (SQLite puede reutilizar el id)
+        session.execute(delete(IngredientMovementModel).where(IngredientMovementModel.ingredient_id == ingredient.id))
+        session.execute(delete(IngredientSnapshotModel).where(IngredientSnapshotModel.ingredient_id == ingredient.id))
+        session.delete(ingredient)
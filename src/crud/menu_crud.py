@@ -1,7 +1,13 @@
+from sqlalchemy import and_, case, exists, func, literal, null, or_, select, update
 from sqlalchemy.orm import Session, joinedload
+from src.config.consts import MAX_RECIPE_DEPTH
 from src.models import MenuItemModel, RecipeModel, IngredientModel
+from src.read_models import MenuRow, RecipeLine
+from src.crud.ingredient_crud import IngredientCRUD
+from src.utils.telemetry import instrument_crud
 from typing import List, Optional
 
+@instrument_crud
 class MenuCRUD:
     """
     Operaciones de Base de Datos para Menús y Recetas.
@@ -10,7 +16,9 @@ class MenuCRUD:
 
     @staticmethod
     def get_all(session: Session) -> List[MenuItemModel]:
-        # joinedload permite traer la receta y el ingrediente en la misma consulta (Eager Loading)
+        # joinedload permite traer la receta y el ingrediente en la misma consulta (Eager Loading).
+        # Con pocos menús es la estrategia ORM más rápida (benchmarks/query_plans.py); las lecturas
+        # de la interfaz usan get_all_rows.
         return session.query(MenuItemModel).options(
             joinedload(MenuItemModel.recipe_links).joinedload(RecipeModel.ingredient)
         ).all()
@@ -20,8 +28,147 @@ class MenuCRUD:
         return session.query(MenuItemModel).filter(MenuItemModel.name == name).first()
 
     @staticmethod
-    def create_menu(session: Session, name: str, price: float, description: str = "") -> MenuItemModel:
-        new_menu = MenuItemModel(name=name, price=price, description=description)
+    def _availability_column():
+        """
+        Disponible = tiene receta y ningún ingrediente con stock (foto + movimientos) menor al requerido.
+        Se evalúa en SQLite por menú (subconsultas EXISTS indexadas por menu_item_id).
+        Los menús con sub-recetas quedan en None: los resuelve BomCache.resolve_availability
+        con la lista de materiales aplanada (un ingrediente puede repetirse en varios niveles).
+        """
+        has_recipe = exists().where(RecipeModel.menu_item_id == MenuItemModel.id)
+        has_component = exists().where(and_(
+            RecipeModel.menu_item_id == MenuItemModel.id, RecipeModel.component_menu_id.is_not(None)
+        ))
+        missing_stock = exists().where(and_(
+            RecipeModel.menu_item_id == MenuItemModel.id,
+            IngredientModel.id == RecipeModel.ingredient_id,
+            IngredientCRUD.stock_column() < RecipeModel.required_quantity
+        ))
+        return case(
+            (missing_stock, False), (~has_recipe, False), (has_component, null()), else_=True
+        ).label("available")
+
+    @staticmethod
+    def _row_query():
+        return select(
+            MenuItemModel.id, MenuItemModel.name, MenuItemModel.price, MenuItemModel.description,
+            MenuItemModel.image_path, MenuCRUD._availability_column(), MenuItemModel.recipe_version
+        )
+
+    @staticmethod
+    def _make_row(row) -> MenuRow:
+        return MenuRow(*row[:5], None if row[5] is None else bool(row[5]), row[6])
+
+    @staticmethod
+    def get_all_rows(session: Session) -> List[MenuRow]:
+        """Menús con disponibilidad ya calculada, en una sola consulta y sin entidades ORM."""
+        result = session.execute(MenuCRUD._row_query().order_by(MenuItemModel.id))
+        return [MenuCRUD._make_row(row) for row in result]
+
+    @staticmethod
+    def get_row_by_name(session: Session, name: str) -> Optional[MenuRow]:
+        row = session.execute(MenuCRUD._row_query().where(MenuItemModel.name == name)).first()
+        return MenuCRUD._make_row(row) if row else None
+
+    @staticmethod
+    def get_rows_by_names(session: Session, names: list) -> dict:
+        """{nombre: MenuRow} de varios menús en una sola consulta."""
+        result = session.execute(MenuCRUD._row_query().where(MenuItemModel.name.in_(names)))
+        return {row[1]: MenuCRUD._make_row(row) for row in result}
+
+    @staticmethod
+    def flatten_recipe(session: Session, menu_id: int) -> dict:
+        """
+        Lista de materiales aplanada: {ingredient_id: cantidad por unidad del menú}, expandiendo
+        las sub-recetas con una CTE recursiva (una sola consulta para todo el árbol).
+        Lanza ValueError si la receta es circular (supera MAX_RECIPE_DEPTH niveles).
+        No usar directamente en cada venta: BomCache la memoriza por versión de receta.
+        """
+        tree = select(
+            RecipeModel.ingredient_id, RecipeModel.component_menu_id,
+            RecipeModel.required_quantity.label("quantity"), literal(1).label("depth")
+        ).where(RecipeModel.menu_item_id == menu_id).cte("bom", recursive=True)
+        tree = tree.union_all(
+            select(RecipeModel.ingredient_id, RecipeModel.component_menu_id,
+                   tree.c.quantity * RecipeModel.required_quantity, tree.c.depth + 1)
+            .join(tree, RecipeModel.menu_item_id == tree.c.component_menu_id)
+            .where(tree.c.depth <= MAX_RECIPE_DEPTH)
+        )
+        result = session.execute(
+            select(tree.c.ingredient_id, func.sum(tree.c.quantity), func.max(tree.c.depth))
+            .group_by(tree.c.ingredient_id).order_by(func.min(tree.c.depth), tree.c.ingredient_id)
+        )
+        bom = {}
+        for ingredient_id, quantity, depth in result:
+            if depth > MAX_RECIPE_DEPTH:
+                raise ValueError(f"La receta del menú {menu_id} es circular o tiene más de {MAX_RECIPE_DEPTH} niveles.")
+            if ingredient_id is not None:
+                bom[ingredient_id] = quantity
+        return bom
+
+    @staticmethod
+    def get_ingredient_lines(session: Session, requirements: dict) -> List[RecipeLine]:
+        """[RecipeLine] de una lista de materiales aplanada ({ingredient_id: cantidad}) con el stock actual."""
+        result = session.execute(
+            select(IngredientModel.id, IngredientModel.name, IngredientCRUD.stock_column())
+            .where(IngredientModel.id.in_(list(requirements)))
+        )
+        rows = {row[0]: row for row in result}
+        return [RecipeLine(ingredient_id, rows[ingredient_id][1], quantity, rows[ingredient_id][2])
+                for ingredient_id, quantity in requirements.items() if ingredient_id in rows]
+
+    @staticmethod
+    def _ancestors(menu_ids: list):
+        """CTE con los ids de los menús que contienen (a cualquier nivel) a alguno de menu_ids."""
+        tree = select(RecipeModel.menu_item_id.label("menu_id"), literal(1).label("depth")).where(
+            RecipeModel.component_menu_id.in_(menu_ids)
+        ).cte("ancestors", recursive=True)
+        return tree.union_all(
+            select(RecipeModel.menu_item_id, tree.c.depth + 1)
+            .join(tree, RecipeModel.component_menu_id == tree.c.menu_id)
+            .where(tree.c.depth <= MAX_RECIPE_DEPTH)
+        )
+
+    @staticmethod
+    def get_menu_names_using(session: Session, ingredient_id: int) -> List[str]:
+        """Menús que usan el ingrediente, directamente o a través de una sub-receta."""
+        direct = select(RecipeModel.menu_item_id).where(RecipeModel.ingredient_id == ingredient_id)
+        ancestors = MenuCRUD._ancestors(direct)
+        result = session.execute(
+            select(MenuItemModel.name).where(or_(
+                MenuItemModel.id.in_(direct), MenuItemModel.id.in_(select(ancestors.c.menu_id))
+            )).order_by(MenuItemModel.id)
+        )
+        return list(result.scalars())
+
+    @staticmethod
+    def get_ancestor_ids(session: Session, menu_id: int) -> set:
+        """Ids de los menús que usan este menú como sub-receta, a cualquier nivel."""
+        ancestors = MenuCRUD._ancestors([menu_id])
+        return set(session.execute(select(ancestors.c.menu_id).distinct()).scalars())
+
+    @staticmethod
+    def get_names_using_component(session: Session, menu_id: int) -> List[str]:
+        """Menús que usan directamente este menú como sub-receta."""
+        result = session.execute(
+            select(MenuItemModel.name).join(RecipeModel, RecipeModel.menu_item_id == MenuItemModel.id)
+            .where(RecipeModel.component_menu_id == menu_id)
+        )
+        return list(result.scalars())
+
+    @staticmethod
+    def touch_recipes(session: Session, menu_ids: set, version: int):
+        """Nueva versión de receta para los menús indicados (invalida su lista de materiales en caché)."""
+        if menu_ids:
+            session.execute(
+                update(MenuItemModel).where(MenuItemModel.id.in_(menu_ids)).values(recipe_version=version)
+            )
+
+    @staticmethod
+    def create_menu(session: Session, name: str, price: float, description: str = "", image_path: str = None,
+                    recipe_version: int = 0) -> MenuItemModel:
+        new_menu = MenuItemModel(name=name, price=price, description=description, image_path=image_path,
+                                 recipe_version=recipe_version)
         session.add(new_menu)
         return new_menu
 
@@ -30,6 +177,18 @@ class MenuCRUD:
         """Crea el vínculo entre un menú y un ingrediente con su cantidad requerida."""
         recipe_item = RecipeModel(menu_item=menu, ingredient=ingredient, required_quantity=qty)
         session.add(recipe_item)
+
+    @staticmethod
+    def add_recipe_component(session: Session, menu: MenuItemModel, component: MenuItemModel, qty: float):
+        """Usa otro menú (sub-receta) como componente, con la cantidad requerida por unidad."""
+        recipe_item = RecipeModel(menu_item=menu, component=component, required_quantity=qty)
+        session.add(recipe_item)
+
+    @staticmethod
+    def clear_recipe(session: Session, menu: MenuItemModel):
+        """Quita todas las líneas de la receta (para reemplazarla)."""
+        menu.recipe_links.clear()
+        session.flush()
     
     @staticmethod
     def delete_menu(session: Session, menu: MenuItemModel):
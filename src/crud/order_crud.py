@@ -1,43 +1,125 @@
-from sqlalchemy.orm import Session, joinedload
-from src.models import OrderModel, OrderDetailModel, ClientModel
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session, joinedload, selectinload
+from src.models import OrderModel, OrderDetailModel, ClientModel, JournalStateModel
+from src.read_models import OrderHistoryRow
+from src.utils.telemetry import instrument_crud
 from typing import List, Optional
 
+@instrument_crud
 class OrderCRUD:
     @staticmethod
-    def create_order(session: Session, client_id: int, total: float) -> OrderModel:
-        order = OrderModel(client_id=client_id, total=total)
+    def create_order(session: Session, client_id: int, total: float, date=None, journal_seq: Optional[int] = None,
+                     offline_id: Optional[str] = None) -> OrderModel:
+        # date/journal_seq/offline_id: pedidos que llegan desde el diario o desde la cola sin
+        # conexión conservan la hora de la venta
+        order = OrderModel(client_id=client_id, total=total, journal_seq=journal_seq, offline_id=offline_id)
+        if date is not None:
+            order.date = date
         session.add(order)
         return order
 
     @staticmethod
-    def add_detail(session: Session, order_id: int, menu_item_id: int, quantity: int, subtotal: float):
+    def get_last_journal_seq(session: Session) -> int:
+        """Secuencia del último pedido aplicado desde el diario (0 si ninguno)."""
+        state = session.get(JournalStateModel, 1)
+        return state.applied_seq if state is not None else 0
+
+    @staticmethod
+    def set_last_journal_seq(session: Session, seq: int):
+        """Registra la última secuencia aplicada (en la misma transacción que aplica el lote)."""
+        session.merge(JournalStateModel(id=1, applied_seq=seq))
+
+    @staticmethod
+    def get_offline_orders(session: Session, offline_ids: list) -> dict:
+        """{offline_id: id del pedido} de las ventas sin conexión que ya están en la BD."""
+        query = select(OrderModel.offline_id, OrderModel.id).where(OrderModel.offline_id.in_(offline_ids))
+        return dict(session.execute(query).all())
+
+    @staticmethod
+    def add_detail(session: Session, order_id: int, menu_item_id: int, quantity: int, subtotal: float,
+                   menu_name: str, unit_price: float):
         detail = OrderDetailModel(
             order_id=order_id,
             menu_item_id=menu_item_id,
             quantity=quantity,
-            subtotal=subtotal
+            subtotal=subtotal,
+            menu_name=menu_name,
+            unit_price=unit_price
         )
         session.add(detail)
+
+    @staticmethod
+    def add_details(session: Session, details: list):
+        """
+        Inserta varias líneas en un solo executemany (dicts con las columnas de OrderDetailModel).
+        Con session.add() cada línea sería un INSERT ... RETURNING aparte en SQLite.
+        """
+        if details:
+            session.execute(insert(OrderDetailModel), details)
     
     # --- NUEVOS MÉTODOS ---
+    # offset/limit permiten paginar el historial (tabla virtual): solo se leen las filas visibles.
+    # Orden estable (fecha, id) para que las páginas no se solapen entre consultas.
+    # Estrategias elegidas con benchmarks/query_plans.py: el cliente (uno por pedido) va con
+    # joinedload; los detalles (varios por pedido) con selectinload, que evita multiplicar las
+    # columnas del pedido por cada línea y envolver el LIMIT en una subconsulta.
     @staticmethod
-    def get_all(session: Session) -> List[OrderModel]:
-        # joinedload trae los datos relacionados en una sola consulta (Eager Loading)
+    def get_all(session: Session, offset: int = 0, limit: Optional[int] = None) -> List[OrderModel]:
         return session.query(OrderModel).options(
             joinedload(OrderModel.client),
-            joinedload(OrderModel.details).joinedload(OrderDetailModel.menu_item)
-        ).order_by(OrderModel.date.desc()).all()
+            selectinload(OrderModel.details)
+        ).filter(OrderModel.client_id.isnot(None)).order_by(
+            OrderModel.date.desc(), OrderModel.id.desc()
+        ).offset(offset).limit(limit).all()
 
     @staticmethod
-    def get_orders_by_client(session: Session, client_id: int) -> List[OrderModel]:
+    def get_orders_by_client(session: Session, client_id: int, offset: int = 0, limit: Optional[int] = None) -> List[OrderModel]:
         return session.query(OrderModel).options(
             joinedload(OrderModel.client),
-            joinedload(OrderModel.details).joinedload(OrderDetailModel.menu_item)
-        ).filter(OrderModel.client_id == client_id).order_by(OrderModel.date.desc()).all()
+            selectinload(OrderModel.details)
+        ).filter(OrderModel.client_id == client_id).order_by(
+            OrderModel.date.desc(), OrderModel.id.desc()
+        ).offset(offset).limit(limit).all()
+
+    @staticmethod
+    def get_history_rows(session: Session, client_id: Optional[int] = None, offset: int = 0,
+                         limit: Optional[int] = None) -> List[OrderHistoryRow]:
+        """
+        Página del historial como proyección (la estrategia más rápida del benchmark):
+        una consulta para pedidos + nombre del cliente y otra para las líneas de esa página.
+        """
+        query = select(OrderModel.id, OrderModel.date, ClientModel.name, OrderModel.total).join(
+            ClientModel, ClientModel.id == OrderModel.client_id
+        )
+        if client_id:
+            query = query.where(OrderModel.client_id == client_id)
+        query = query.order_by(OrderModel.date.desc(), OrderModel.id.desc()).offset(offset).limit(limit)
+        orders = session.execute(query).all()
+
+        lines = {}
+        if orders:
+            rows = session.execute(
+                select(OrderDetailModel.order_id, OrderDetailModel.quantity, OrderDetailModel.menu_name)
+                .where(OrderDetailModel.order_id.in_([order.id for order in orders]))
+            )
+            for order_id, quantity, menu_name in rows:
+                lines.setdefault(order_id, []).append((quantity, menu_name))
+
+        return [OrderHistoryRow(*order, lines.get(order.id, [])) for order in orders]
+
+    @staticmethod
+    def count(session: Session, client_id: Optional[int] = None) -> int:
+        query = session.query(func.count(OrderModel.id))
+        if client_id:
+            query = query.filter(OrderModel.client_id == client_id)
+        else:
+            query = query.filter(OrderModel.client_id.isnot(None))
+        return query.scalar()
 
     @staticmethod
     def get_by_id(session: Session, order_id: int) -> Optional[OrderModel]:
-        return session.query(OrderModel).filter(OrderModel.id == order_id).first()
+        # La boleta lee cliente y detalles: cargarlos aquí evita 2 consultas perezosas extra
+        return session.get(OrderModel, order_id, options=[joinedload(OrderModel.client), joinedload(OrderModel.details)])
 
     @staticmethod
     def delete(session: Session, order: OrderModel):
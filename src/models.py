@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index, CheckConstraint, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from src.config.database import Base
@@ -6,18 +6,26 @@ from src.config.database import Base
 # --- Entidad: Receta (Tabla intermedia con atributos) ---
 class RecipeModel(Base):
     __tablename__ = "recipes"
+    # Cada línea es un ingrediente O una sub-receta (ver migración 'sub_recipes')
+    __table_args__ = (
+        CheckConstraint("(ingredient_id IS NULL) <> (component_menu_id IS NULL)", name="ck_recipes_component"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    menu_item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False)
-    ingredient_id = Column(Integer, ForeignKey("ingredients.id"), nullable=False)
+    menu_item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False, index=True)
+    ingredient_id = Column(Integer, ForeignKey("ingredients.id"), nullable=True, index=True)
+    # Sub-receta: otro menú (ej. una salsa o masa) usado como componente
+    component_menu_id = Column(Integer, ForeignKey("menu_items.id"), nullable=True, index=True)
     required_quantity = Column(Float, nullable=False)
 
     # Relaciones Bidireccionales
-    menu_item = relationship("MenuItemModel", back_populates="recipe_links")
+    menu_item = relationship("MenuItemModel", back_populates="recipe_links", foreign_keys=[menu_item_id])
     ingredient = relationship("IngredientModel", back_populates="recipe_links")
+    component = relationship("MenuItemModel", foreign_keys=[component_menu_id])
 
     def __repr__(self):
-        return f"<RecipeModel(menu={self.menu_item_id}, ing={self.ingredient_id}, qty={self.required_quantity})>"
+        return (f"<RecipeModel(menu={self.menu_item_id}, ing={self.ingredient_id}, "
+                f"sub={self.component_menu_id}, qty={self.required_quantity})>")
 
 # --- Entidad: Ingrediente ---
 class IngredientModel(Base):
@@ -26,7 +34,10 @@ class IngredientModel(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True, nullable=False)
     unit = Column(String, nullable=False)  # 'kg', 'unid'
+    # Stock materializado en la última foto; el actual suma los movimientos posteriores a
+    # snapshot_movement_id (IngredientCRUD.stock_column). Solo lo modifica take_snapshot
     quantity = Column(Float, default=0.0, nullable=False)
+    snapshot_movement_id = Column(Integer, nullable=False, server_default="0")
 
     # Relación inversa
     recipe_links = relationship("RecipeModel", back_populates="ingredient")
@@ -34,6 +45,43 @@ class IngredientModel(Base):
     def __repr__(self):
         return f"<IngredientModel(name='{self.name}', quantity={self.quantity})>"
 
+# --- Libro de movimientos de stock (solo se agregan filas, ver migración 'stock_ledger') ---
+class IngredientMovementModel(Base):
+    __tablename__ = "ingredient_movements"
+    __table_args__ = (
+        # Delta desde la última foto (id > snapshot_movement_id) y stock a una fecha
+        Index("ix_movements_ingredient_id", "ingredient_id", "id"),
+        Index("ix_movements_ingredient_date", "ingredient_id", "date"),
+        # AUTOINCREMENT: un id borrado (ingrediente eliminado) no se reutiliza por debajo de las
+        # marcas de las fotos; si no, ese movimiento nunca se sumaría al stock
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    ingredient_id = Column(Integer, ForeignKey("ingredients.id"), nullable=False)
+    kind = Column(String, nullable=False)  # MOVEMENT_KINDS: 'entrega', 'venta', 'ajuste', 'merma'
+    quantity = Column(Float, nullable=False)  # Con signo: positivo entra, negativo sale
+    date = Column(DateTime, default=datetime.now, nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=True)  # Solo en ventas
+    note = Column(String, nullable=True)
+
+    def __repr__(self):
+        return f"<IngredientMovementModel(ing={self.ingredient_id}, kind='{self.kind}', qty={self.quantity})>"
+
+# --- Foto periódica del stock (IngredientCRUD.take_snapshot) ---
+class IngredientSnapshotModel(Base):
+    __tablename__ = "ingredient_snapshots"
+    __table_args__ = (Index("ix_snapshots_ingredient_taken", "ingredient_id", "taken_at"),)
+
+    id = Column(Integer, primary_key=True)
+    ingredient_id = Column(Integer, ForeignKey("ingredients.id"), nullable=False)
+    movement_id = Column(Integer, nullable=False)  # Último movimiento incluido en 'quantity'
+    quantity = Column(Float, nullable=False)
+    taken_at = Column(DateTime, default=datetime.now, nullable=False)
+
+    def __repr__(self):
+        return f"<IngredientSnapshotModel(ing={self.ingredient_id}, qty={self.quantity}, hasta={self.movement_id})>"
+
 # --- Entidad: Menú (Plato) ---
 class MenuItemModel(Base):
     __tablename__ = "menu_items"
@@ -42,9 +90,14 @@ class MenuItemModel(Base):
     name = Column(String, unique=True, index=True, nullable=False)
     price = Column(Float, nullable=False)
     description = Column(String, nullable=True)
+    image_path = Column(String, nullable=True)  # Relativa a la raíz del proyecto (ej. images/pepsi.png)
+    # Cambia con cada edición de la receta (propia o de una sub-receta): clave de la caché de
+    # listas de materiales. Es una marca de tiempo en µs para no repetirse si SQLite reutiliza el id.
+    recipe_version = Column(Integer, nullable=False, server_default="0")
     
     # Relación uno a muchos (Receta)
-    recipe_links = relationship("RecipeModel", back_populates="menu_item", cascade="all, delete-orphan")
+    recipe_links = relationship("RecipeModel", back_populates="menu_item", cascade="all, delete-orphan",
+                                foreign_keys="RecipeModel.menu_item_id")
     order_details = relationship("OrderDetailModel", back_populates="menu_item")
 
     def __repr__(self):
@@ -66,11 +119,21 @@ class ClientModel(Base):
 # --- Entidad: Pedido (Cabecera) ---
 class OrderModel(Base):
     __tablename__ = "orders"
+    # Historial por cliente ordenado por fecha (ver migración 'history_indexes')
+    __table_args__ = (
+        Index("ix_orders_client_date", "client_id", "date"),
+        Index("ux_orders_journal_seq", "journal_seq", unique=True, sqlite_where=text("journal_seq IS NOT NULL")),
+        Index("ux_orders_offline_id", "offline_id", unique=True, sqlite_where=text("offline_id IS NOT NULL")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     client_id = Column(Integer, ForeignKey("clients.id"), nullable=True)
-    date = Column(DateTime, default=datetime.now)
+    date = Column(DateTime, default=datetime.now, index=True)
     total = Column(Float, default=0.0)
+    # Secuencia del diario de pedidos (src/utils/order_journal.py); NULL si se grabó directo
+    journal_seq = Column(Integer, nullable=True)
+    # Id de la venta tomada sin conexión (src/utils/offline_queue.py); NULL si se grabó en línea
+    offline_id = Column(String, nullable=True)
 
     client = relationship("ClientModel", back_populates="orders")
     details = relationship("OrderDetailModel", back_populates="order", cascade="all, delete-orphan")
@@ -83,13 +146,27 @@ class OrderDetailModel(Base):
     __tablename__ = "order_details"
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     menu_item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
     subtotal = Column(Float, nullable=False)
+    # Snapshot al momento de la venta: el historial no cambia si luego se edita el menú
+    menu_name = Column(String, nullable=True)
+    unit_price = Column(Float, nullable=True)
 
     order = relationship("OrderModel", back_populates="details")
     menu_item = relationship("MenuItemModel", back_populates="order_details")
 
     def __repr__(self):
-        return f"<OrderDetailModel(order={self.order_id}, item={self.menu_item_id})>"
\ No newline at end of file
+        return f"<OrderDetailModel(order={self.order_id}, item={self.menu_item_id})>"
+
+# --- Estado del diario de pedidos (src/utils/order_journal.py) ---
+class JournalStateModel(Base):
+    __tablename__ = "journal_state"
+
+    id = Column(Integer, primary_key=True)   # Una sola fila (id = 1)
+    # Última secuencia aplicada; no se deriva de orders.journal_seq porque un pedido se puede borrar
+    applied_seq = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<JournalStateModel(applied_seq={self.applied_seq})>"
@@ -0,0 +1,51 @@
+"""
+Modelos de solo lectura para las consultas de la interfaz y la API.
+
+Son tuplas con nombre (sin __dict__, sin estado de sesión) construidas desde consultas que
+proyectan solo las columnas necesarias. A diferencia de las entidades ORM, no tienen
+relaciones perezosas: no pueden lanzar DetachedInstanceError después de cerrar la sesión.
+Para modificar datos se siguen usando los modelos de src/models.py.
+"""
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+class IngredientRow(NamedTuple):
+    id: int
+    name: str
+    unit: str
+    quantity: float
+
+class MovementRow(NamedTuple):
+    id: int
+    date: datetime
+    kind: str  # 'entrega', 'venta', 'ajuste' o 'merma'
+    quantity: float  # Con signo
+    order_id: Optional[int]
+    note: Optional[str]
+
+class ClientRow(NamedTuple):
+    id: int
+    name: str
+    email: str
+
+class MenuRow(NamedTuple):
+    id: int
+    name: str
+    price: float
+    description: Optional[str]
+    image_path: Optional[str]
+    available: bool  # Calculado en SQL contra el stock al momento de la consulta
+    recipe_version: int = 0  # Clave de la lista de materiales en caché (src/utils/bom.py)
+
+class OrderHistoryRow(NamedTuple):
+    id: int
+    date: datetime
+    client_name: str
+    total: float
+    lines: list  # [(cantidad, nombre del menú)]
+
+class RecipeLine(NamedTuple):
+    ingredient_id: int
+    ingredient_name: str
+    required_quantity: float
+    stock: float
@@ -6,21 +6,25 @@ from tkinter import filedialog, END
 from types import SimpleNamespace as sn
 
 from src.utils.tools import *
+from src.utils.tasks import TaskRunner
+from src.utils.refresh import RefreshScheduler
+from src.utils.sql_profiler import sql_profiler
+from src.utils.telemetry import telemetry
+from src.utils.ui_profiler import ui_profiler
+from src.utils.memory_watchdog import memory_watchdog
 from src.services.ingredient_service import IngredientService
-from src.core.ingredient import Ingredient
 from src.services.menu_service import MenuService
-from src.core.order import Order
 from src.utils.menupdf import generate_menu_pdf
 from src.utils.receipt import Receipt
 from src.config.consts import *
+from src.config.database import locations
 
 from src.services.client_service import ClientService # <-- NUEVO
 from src.services.order_service import OrderService   # <-- NUEVO
-
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from src.services.statistics_service import StatisticsService # <-- NUEVO
 
+# matplotlib, pandas y reportlab se importan recién al usar su funcionalidad (arranque rápido)
+
 class RestaurantApp(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -35,9 +39,45 @@ class RestaurantApp(ctk.CTk):
         self.client_service = ClientService() # <-- NUEVO
         self.order_service = OrderService()   # <-- NUEVO
         self.stats_service = StatisticsService()
+        # Con varios locales (POS_LOCATIONS) la ventana indica el de esta terminal
+        if len(locations.names()) > 1:
+            self.title(f'Gestor de Restaurante - {self.order_service.location}')
+
+        # Las llamadas lentas a servicios corren en segundo plano; los resultados vuelven por after()
+        self.tasks = TaskRunner(self)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        # Con POS_TELEMETRY=1 exporta métricas periódicamente (no hace nada si está desactivada)
+        telemetry.start_exporter()
+        # Con POS_BACKUP_MINUTES respalda la BD del local en segundo plano (ver src/utils/backup.py)
+        locations.get().start_backups()
+        # Con POS_ORDER_JOURNAL=1 las ventas se confirman al quedar en el diario (src/utils/order_journal.py)
+        locations.get().start_journal()
+        # Foto periódica del stock: las ventas y entregas solo agregan movimientos al libro
+        locations.get().start_stock_snapshots()
+        # Con POS_OFFLINE=1 la caja sigue vendiendo contra una copia local si la BD no responde
+        locations.get().start_offline()
+        # Con POS_UI_PROFILE=1 los botones se miden del clic al ocioso (F12: ranking en pantalla)
+        ui_profiler.install(self)
+        # Con POS_MEMORY_WATCH la línea base se toma cuando la ventana ya está construida
+        if memory_watchdog.enabled:
+            self.after_idle(memory_watchdog.reset_baseline)
+
+        # Las acciones marcan vistas "sucias"; se refrescan una sola vez en tiempo ocioso.
+        # El orden de registro es el orden de refresco dentro de una pasada.
+        self.refresh = RefreshScheduler(self)
+        self.refresh.register('stock', self._update_stock_treeview)
+        self.refresh.register('ingredients', self._refresh_ingredients_combo)
+        self.refresh.register('menu', lambda: self._generate_menu_action(notify=False))
+        self.refresh.register('menu_buttons', self._refresh_menu_buttons)
+        self.refresh.register('order_buttons', self._update_order_buttons)
+        self.refresh.register('cart', self._refresh_cart_display)
+        self.refresh.register('clients', self._update_client_list)
+        self.refresh.register('client_selector', self._update_client_selector)
+        self.refresh.register('history_clients', self._update_history_client_selector)
+        self.refresh.register('history', self._update_history_treeview)
+
+        # Los menús por defecto se cargan una sola vez como migración (db.create_tables)
 
-        self.menu_service.initialize_default_menus()
-        
         self.temp_csv_ingredients = [] # Para almacenar la carga temporal del CSV antes de guardar
         self.temp_recipe_builder = []
 
@@ -45,9 +85,10 @@ class RestaurantApp(ctk.CTk):
         # Key: Menu Name, Value: {quantity, price, obj}
         self.shopping_cart = {}
 
-        tabview = TABView(self)
-        tabview.pack(padx=10, pady=10, fill="both", expand=True)
-        tabview.add_tabs([
+        # lazy=True: cada pestaña se construye la primera vez que se selecciona
+        self.tabview = TABView(self, lazy=True)
+        self.tabview.pack(padx=10, pady=10, fill="both", expand=True)
+        self.tabview.add_tabs([
             sn(key='load', title='Carga de Ingredientes', content=self._setup_load_tab),
             sn(key='stock', title='Stock', content=self._setup_stock_tab),
             sn(key='menu', title='Carta Restaurante', content=self._setup_menu_tab),
@@ -58,13 +99,35 @@ class RestaurantApp(ctk.CTk):
             sn(key='stats', title='Gráficos Estadísticos', content=self._setup_stats_tab),
         ])
 
-        self._generate_menu_action()
-        self._update_order_buttons()
-
     def _show_msg(self, title, msg):
         MsgBox(self, title, msg)
+
+    def _on_close(self):
+        if sql_profiler.enabled:
+            print(sql_profiler.report())
+            if SQL_PROFILE_CSV:
+                sql_profiler.export_csv(SQL_PROFILE_CSV)
+        telemetry.shutdown()
+        locations.get().stop_offline()
+        locations.get().stop_journal()
+        locations.get().stop_stock_snapshots()
+        locations.get().stop_backups()
+        if ui_profiler.enabled:
+            print(ui_profiler.report())
+            print(self.refresh.report())
+        if memory_watchdog.enabled:
+            print(memory_watchdog.report())
+        self.tasks.shutdown()
+        self.destroy()
+
+    def _show_task_error(self, title):
+        """Callback on_error estándar para tareas en segundo plano."""
+        return lambda error: self._show_msg(title, f"Error inesperado: {error}")
     
     def _update_stock_treeview(self):
+        # Si la pestaña Stock aún no se construye, se cargará al abrirla
+        if not hasattr(self, 'stock_tree_manager'):
+            return
         # Llama al servicio que consulta la BD
         ingredients = self.ingredient_service.get_all_ingredients()
         # Mapea los objetos ORM a lista de listas para la UI
@@ -86,31 +149,39 @@ class RestaurantApp(ctk.CTk):
       filepath = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
       if not filepath: return
       
-      # Llamamos al servicio para procesar (map/filter) sin guardar aún
-      success, data_list, message = self.ingredient_service.process_csv(filepath)
-      self._show_msg("Carga CSV", message)
-      
-      if success:
-        self.temp_csv_ingredients = data_list # Guardamos en memoria temporal de la UI
-        # Preparamos datos visuales
-        visual_data = [[d['name'], d['unit'], f"{d['quantity']:,.2f}"] for d in data_list]
-        self.load_tree_manager.load_data(visual_data)
+      def on_done(result):
+        success, data_list, message = result
+        self._show_msg("Carga CSV", message)
+
+        if success:
+          self.temp_csv_ingredients = data_list # Guardamos en memoria temporal de la UI
+          # Preparamos datos visuales
+          visual_data = [[d['name'], d['unit'], f"{d['quantity']:,.2f}"] for d in data_list]
+          self.load_tree_manager.load_data(visual_data)
+
+      # Llamamos al servicio para procesar (map/filter) sin guardar aún, fuera del hilo de Tk
+      self.tasks.submit(self.ingredient_service.process_csv, filepath, on_success=on_done,
+                        on_error=self._show_task_error("Carga CSV"), widget=self.btn_load_csv, key="csv")
 
     def _add_stock_action(self):
       if not self.temp_csv_ingredients:
           self._show_msg("Error", "No hay ingredientes cargados para agregar.")
           return
 
+      def on_done(result):
+          success, msg = result
+          self._show_msg("Stock Actualizado", msg)
+
+          if success:
+              self.load_tree_manager.clear_data()
+              self.temp_csv_ingredients = [] # Limpiar temporal
+              # Tabla principal, combo de ingredientes y menú disponible (y botones de pedido)
+              self.refresh.mark_dirty('stock', 'ingredients', 'menu')
+
       # Guardamos la lista temporal en la BD real
-      success, msg = self.ingredient_service.save_bulk_ingredients(self.temp_csv_ingredients)
-      self._show_msg("Stock Actualizado", msg)
-      
-      if success:
-          self.load_tree_manager.clear_data()
-          self.temp_csv_ingredients = [] # Limpiar temporal
-          self._update_stock_treeview() # Refrescar tabla principal desde BD
-          self.btn_container and self._update_order_buttons() # Refrescar botones de pedido
-          self._generate_menu_action() # Refrescar menú disponible
+      self.tasks.submit(self.ingredient_service.save_bulk_ingredients, list(self.temp_csv_ingredients),
+                        on_success=on_done, on_error=self._show_task_error("Stock Actualizado"),
+                        widget=self.btn_add_stock)
 
     def _add_single_ingredient_action(self):
         name = self.entry_nombre.get()
@@ -128,10 +199,9 @@ class RestaurantApp(ctk.CTk):
             
             if success:
                 print(f'Item agregado/actualizado en BD: {name}')
-                self._update_stock_treeview()
                 self.entry_nombre.delete(0, END)
                 self.entry_cantidad.delete(0, END)
-                self._refresh_ingredients_combo()
+                self.refresh.mark_dirty('stock', 'ingredients', 'menu')
             else:
                 self._show_msg("Error", msg)
                 
@@ -150,25 +220,26 @@ class RestaurantApp(ctk.CTk):
       print(f"Intento eliminación: {name} -> {success}")
       
       if success:
-          self._update_stock_treeview()
+          self.refresh.mark_dirty('stock', 'ingredients', 'menu')
       else:
           self._show_msg("Error", msg)
 
-    def _generate_menu_action(self):
+    def _generate_menu_action(self, notify=True):
       # Usamos el servicio para obtener el estado (Disponible / No Disponible)
         status = self.menu_service.get_menu_status()
         
         available_items = status["available"]
         unavailable_items = status["unavailable"]
 
-        if not unavailable_items:
-            msg = "¡Todos los menús están disponibles!"
-        else:
-            # Uso de map/join para formatear mensaje
-            unavailable_names = ", ".join(map(lambda item: item.name, unavailable_items))
-            msg = f"Menú actualizado. Faltan ingredientes para: {unavailable_names}."
-      
-        self._show_msg("Disponibilidad de Menú", msg)
+        if notify:
+            if not unavailable_items:
+                msg = "¡Todos los menús están disponibles!"
+            else:
+                # Uso de map/join para formatear mensaje
+                unavailable_names = ", ".join(map(lambda item: item.name, unavailable_items))
+                msg = f"Menú actualizado. Faltan ingredientes para: {unavailable_names}."
+          
+            self._show_msg("Disponibilidad de Menú", msg)
       
         # Actualizar la tabla visual
         if hasattr(self, 'menu_tree_manager'):
@@ -177,48 +248,42 @@ class RestaurantApp(ctk.CTk):
             self.menu_tree_manager.load_data(table_data)
 
         # Actualizar botones de pedido (si existen en la UI)
-        if hasattr(self, 'btn_container'):
-            self._update_order_buttons()
+        self.refresh.mark_dirty('order_buttons')
 
     def _generate_menu_pdf_action(self):
-        status = self.menu_service.get_menu_status()
-        available_items = status["available"]
-        
-        success, filepath = generate_menu_pdf(available_items)
-        
-        if success:
-            self._show_msg("PDF Generado", f"Carta guardada exitosamente en:\n{filepath}")
-            
-            import os, webbrowser
-            if os.path.exists(filepath):
-                webbrowser.open(f'file:///{os.path.abspath(filepath)}')
-        else:
-            self._show_msg("Error", filepath)
+        def build():
+            status = self.menu_service.get_menu_status()
+            return generate_menu_pdf(status["available"])
+
+        def on_done(result):
+            success, filepath = result
+            if success:
+                self._show_msg("PDF Generado", f"Carta guardada exitosamente en:\n{filepath}")
+                
+                if os.path.exists(filepath):
+                    webbrowser.open(f'file:///{os.path.abspath(filepath)}')
+            else:
+                self._show_msg("Error", filepath)
+
+        self.tasks.submit(build, on_success=on_done, on_error=self._show_task_error("Error"),
+                          widget=self.btn_menu_pdf, key="menu_pdf")
 
     def _update_order_buttons(self, unavailable_menus:list = None):
-        # Necesitamos refrescar la lista completa para verificar estado uno por uno
-        # Nota: Esto podría optimizarse, pero para EV3 está bien llamar al servicio
-        for item_name, btn in self.menu_buttons.items():
-
-            if unavailable_menus is not None:
-              for menu_name in unavailable_menus:
-                if item_name == menu_name:
-                  btn.configure(state="disabled")
-                  break
-              continue
-            # Buscar el objeto menú en la BD (podríamos cachearlo, pero lo pedimos al servicio)
-            # Como get_menu_status devuelve objetos, podemos usar lógica de servicio
-            
-            # Forma rápida: Traer todos y buscar localmente
-            all_menus = self.menu_service.get_all_menus()
-            # Filter para encontrar el item específico
-            found_items = list(filter(lambda x: x.name == item_name, all_menus))
-            
-            if found_items:
-                item = found_items[0]
-                is_available = self.menu_service.check_availability(item)
-                state = "normal" if is_available else "disabled"
-                btn.configure(state=state)
+        # Sin botones todavía si la pestaña Pedido no se ha abierto
+        menu_buttons = getattr(self, 'menu_buttons', {})
+        if not menu_buttons:
+            return
+
+        if unavailable_menus is not None:
+            for menu_name in unavailable_menus:
+                if menu_name in menu_buttons:
+                    menu_buttons[menu_name].configure(state="disabled")
+            return
+
+        # Una sola consulta de disponibilidad para todos los botones
+        available_names = {item.name for item in self.menu_service.get_menu_status()["available"]}
+        for item_name, btn in menu_buttons.items():
+            btn.configure(state="normal" if item_name in available_names else "disabled")
 
     def _add_to_order_action(self, menu_item_name):
         item_to_add = self.menu.get_item(menu_item_name)
@@ -245,8 +310,7 @@ class RestaurantApp(ctk.CTk):
             del self.shopping_cart[menu_name]
             
             # 3. Refrescar la vista y el total
-            self._refresh_cart_display()
-            self._update_order_buttons()
+            self.refresh.mark_dirty('cart', 'order_buttons')
             print(f"Ítem '{menu_name}' eliminado del carrito.") # Log opcional
         else:
             self._show_msg("Error", "El ítem seleccionado no se encuentra en el carrito.")
@@ -294,25 +358,29 @@ class RestaurantApp(ctk.CTk):
             # Limpiar campos y actualizar tabla
             self.entry_client_name.delete(0, END)
             self.entry_client_email.delete(0, END)
-            self._update_client_list()
-            self._update_client_selector()
-
-            # --- NUEVA LÍNEA ---
-            if hasattr(self, 'history_client_selector'):
-                self._update_history_client_selector() # Actualiza pestaña Historial
+            # Tabla, selector de Pedido y filtro de la pestaña Historial
+            self.refresh.mark_dirty('clients', 'client_selector', 'history_clients')
 
     def _update_client_list(self):
+        if not hasattr(self, 'client_tree'):
+            return
         clients = self.client_service.get_all_clients()
         data = [[c.id, c.name, c.email] for c in clients]
         self.client_tree.load_data(data)
 
+    def _search_client_options(self, prefix):
+        """Opciones (etiqueta, id) para los selectores de cliente: búsqueda indexada por prefijo."""
+        clients = self.client_service.search_clients(prefix, CLIENT_SEARCH_LIMIT)
+        return [(f"{c.name} ({c.email})", c.id) for c in clients]
+
     def _update_client_selector(self):
-        clients = self.client_service.get_all_clients()
-        # Guardamos referencia de ID por nombre/email para recuperarlo luego
-        self.client_map = {f"{c.name} ({c.email})": c.id for c in clients}
-        self.client_selector.configure(values=list(self.client_map.keys()))
-        if self.client_map:
-            self.client_selector.set(list(self.client_map.keys())[0])
+        if not hasattr(self, 'client_selector'):
+            return
+        # Repite la última búsqueda (ej. para incluir un cliente recién registrado)
+        self.client_selector.refresh()
+        options = self.client_selector.cget("values")
+        if self.client_selector.get_value() is None and options:
+            self.client_selector.set(options[0])
 
     
     def _add_to_cart_action(self, menu_name):
@@ -335,9 +403,12 @@ class RestaurantApp(ctk.CTk):
         else:
             self.shopping_cart[menu_name] = {'quantity': 1, 'price': menu.price}
         
-        self._refresh_cart_display()
+        # Ráfagas de escaneo/clics: el carrito se redibuja una vez por pasada
+        self.refresh.mark_dirty('cart')
 
     def _refresh_cart_display(self):
+        if not hasattr(self, 'order_tree_manager'):
+            return
         data = []
         total = 0
         for name, info in self.shopping_cart.items():
@@ -349,37 +420,45 @@ class RestaurantApp(ctk.CTk):
         self.lbl_total.configure(text=f"TOTAL: ${total:,.0f}")
 
     def _finalize_order_action(self):
-        selected_client_str = self.client_selector.get()
-        if not selected_client_str or selected_client_str not in self.client_map:
+        client_id = self.client_selector.get_value()
+        if client_id is None:
             self._show_msg("Error", "Seleccione un cliente válido.")
             return
-
-        client_id = self.client_map[selected_client_str]
         
         # Transformar carrito de dict a lista para el servicio
         cart_list = [{'menu_name': k, 'quantity': v['quantity'], 'price': v['price']} for k, v in self.shopping_cart.items()]
         
-        success, msg, pdf_path = self.order_service.process_order(client_id, cart_list)
-        
-        if success:
-            self._show_msg("Éxito", msg)
-            self.shopping_cart.clear()
-            self._refresh_cart_display()
-            self._generate_menu_action() # Actualizar disponibilidad visual
-            self._update_stock_treeview()
-            # Aquí podrías llamar al PDF generator real si quisieras
-        else:
-            self._show_msg("Error en Pedido", msg)
+        def on_done(result):
+            success, msg, pdf_path = result
+            if success:
+                self._show_msg("Éxito", msg)
+                # Descontar solo lo vendido: el carrito pudo cambiar mientras se procesaba
+                for item in cart_list:
+                    line = self.shopping_cart.get(item['menu_name'])
+                    if line:
+                        line['quantity'] -= item['quantity']
+                        if line['quantity'] <= 0:
+                            del self.shopping_cart[item['menu_name']]
+                # Carrito, disponibilidad visual, stock e historial
+                self.refresh.mark_dirty('cart', 'menu', 'stock', 'history')
+                # Aquí podrías llamar al PDF generator real si quisieras
+            else:
+                self._show_msg("Error en Pedido", msg)
+
+        self.tasks.submit(self.order_service.process_order, client_id, cart_list, on_success=on_done,
+                          on_error=self._show_task_error("Error en Pedido"), widget=self.btn_finalize_order)
             
     def _setup_load_tab(self, master):
         frame = Frame(master, pack=sn(fill='both', expand=True, padx=20, pady=20))
         Label(frame, 'CARGA DE ARCHIVO CSV DE INGREDIENTES', font=Fonts.get('h1')).pack(pady=(10, 30))
         content_frame = Frame(frame, pack=sn(fill="both", expand=True, padx=10, pady=10))
-        Button(content_frame, '📂 Cargar CSV', self._load_csv_action, height=40, font=Fonts.get('btn_primary'), fg_color="#3B82F6", hover_color="#2563EB").pack(pady=10, padx=20)
+        self.btn_load_csv = Button(content_frame, '📂 Cargar CSV', self._load_csv_action, height=40, font=Fonts.get('btn_primary'), fg_color="#3B82F6", hover_color="#2563EB")
+        self.btn_load_csv.pack(pady=10, padx=20)
         stock_columns_config = {col: {'text': col.capitalize(), 'width': 150, 'anchor': 'center'} for col in STOCK_COLUMNS}
         self.load_tree_manager = TreeViewManager(content_frame, columns=stock_columns_config)
         self.load_tree_manager.pack(fill="x", padx=20, pady=(20, 10))
-        Button(content_frame, '✅ Agregar al Stock', self._add_stock_action, height=40, font=Fonts.get('btn_primary'), fg_color="#4CAF50", hover_color="#45A049").pack(pady=20, padx=20)
+        self.btn_add_stock = Button(content_frame, '✅ Agregar al Stock', self._add_stock_action, height=40, font=Fonts.get('btn_primary'), fg_color="#4CAF50", hover_color="#45A049")
+        self.btn_add_stock.pack(pady=20, padx=20)
 
     def _setup_stock_tab(self, master):
         stock_main_frame = Frame(master, pack=sn(fill="both", expand=True, padx=20, pady=20))
@@ -387,7 +466,7 @@ class RestaurantApp(ctk.CTk):
         stock_table_frame = Frame(stock_main_frame, pack=sn(fill="x", padx=10, pady=(10, 10)))
         Label(stock_table_frame, "Stock Actual", font=Fonts.get('h2')).pack(pady=5)
         stock_columns_config = {col: {'text': col.capitalize(), 'width': 150, 'anchor': 'center'} for col in STOCK_COLUMNS}
-        self.stock_tree_manager = TreeViewManager(stock_table_frame, columns=stock_columns_config)
+        self.stock_tree_manager = TreeViewManager(stock_table_frame, columns=stock_columns_config, key=0)
         self.stock_tree_manager.pack(fill="x", expand=True)
         self.stock_tree = self.stock_tree_manager.tree
         control_frame = Frame(stock_main_frame, pack=sn(fill="x", padx=10, pady=10))
@@ -421,11 +500,13 @@ class RestaurantApp(ctk.CTk):
     def _setup_menu_tab(self, master):
         frame = Frame(master, pack=sn(fill="both", expand=True, padx=20, pady=20))
         Label(frame, "CARTA RESTAURANTE", font=Fonts.get('h1')).pack(pady=(10, 20))
-        Button(frame, "📄 Generar Carta (PDF)", self._generate_menu_pdf_action, height=40, font=Fonts.get('btn_primary'), fg_color="#FBC02D", hover_color="#F9A825", text_color="black").pack(pady=10)
+        self.btn_menu_pdf = Button(frame, "📄 Generar Carta (PDF)", self._generate_menu_pdf_action, height=40, font=Fonts.get('btn_primary'), fg_color="#FBC02D", hover_color="#F9A825", text_color="black")
+        self.btn_menu_pdf.pack(pady=10)
         Label(frame, "Menús Disponibles para Venta (según stock):", font=Fonts.get('label_normal')).pack(pady=(20, 10))
         menu_columns_config = {col: {'text': col.capitalize(), 'width': 200, 'anchor': 'center'} for col in MENU_COLUMNS}
-        self.menu_tree_manager = TreeViewManager(frame, columns=menu_columns_config)
+        self.menu_tree_manager = TreeViewManager(frame, columns=menu_columns_config, key=0)
         self.menu_tree_manager.pack(fill="x", expand=True)
+        self._generate_menu_action(notify=False)
     
     def _setup_client_tab(self, master):
         frame = Frame(master, pack=sn(fill='both', expand=True, padx=20, pady=20))
@@ -451,7 +532,7 @@ class RestaurantApp(ctk.CTk):
         # Tabla de Clientes
         # Definimos columnas: ID oculto o visible (útil para lógica)
         columns = {"id": {"text": "ID", "width": 50}, "name": {"text": "Nombre", "width": 200}, "email": {"text": "Email", "width": 250}}
-        self.client_tree = TreeViewManager(frame, columns=columns)
+        self.client_tree = TreeViewManager(frame, columns=columns, key=0)
         self.client_tree.pack(fill="both", expand=True, pady=10)
         
         self._update_client_list()
@@ -473,8 +554,7 @@ class RestaurantApp(ctk.CTk):
         self._show_msg("Gestión Clientes", msg)
         
         if success:
-            self._update_client_list()
-            self._update_client_selector()
+            self.refresh.mark_dirty('clients', 'client_selector', 'history_clients')
 
     def _setup_order_tab(self, master):
         Label(master, "CREACIÓN DE PEDIDO", font=Fonts.get('h1')).pack(pady=(10, 15))
@@ -482,7 +562,8 @@ class RestaurantApp(ctk.CTk):
         # --- Selector de Cliente ---
         client_frame = Frame(master, pack=sn(fill="x", padx=20, pady=5))
         Label(client_frame, "Cliente:").pack(side="left", padx=5)
-        self.client_selector = ctk.CTkComboBox(client_frame, values=[], width=250)
+        # Búsqueda incremental: escribir parte del nombre o email y elegir (Enter = primera coincidencia)
+        self.client_selector = SearchComboBox(client_frame, self._search_client_options, width=250)
         self.client_selector.pack(side="left", padx=5)
         self._update_client_selector()
 
@@ -500,13 +581,14 @@ class RestaurantApp(ctk.CTk):
         # --- Tabla de Pedido ---
         order_frame = Frame(master, pack=sn(fill="x", padx=20, pady=10))
         cols = {"menu": {"text": "Menú", "width": 150}, "qty": {"text": "Cant.", "width": 50}, "price": {"text": "Precio", "width": 100}, "sub": {"text": "Subtotal", "width": 100}}
-        self.order_tree_manager = TreeViewManager(order_frame, columns=cols)
+        self.order_tree_manager = TreeViewManager(order_frame, columns=cols, key=0)
         self.order_tree_manager.pack(fill="x", expand=True)
 
         # --- Acciones del Carrito ---
         actions_frame = Frame(master, pack=sn(fill="x", padx=20, pady=5))
         Button(actions_frame, "🗑️ Eliminar Seleccionado", self._remove_from_cart_action, fg_color="#D32F2F", hover_color="#C62828").pack(side="left", padx=5)
-        Button(actions_frame, "🧾 Finalizar Compra", self._finalize_order_action, fg_color="green").pack(side="right", padx=5)
+        self.btn_finalize_order = Button(actions_frame, "🧾 Finalizar Compra", self._finalize_order_action, fg_color="green")
+        self.btn_finalize_order.pack(side="right", padx=5)
         
         self.lbl_total = Label(master, "TOTAL: $0", font=Fonts.get('total_price'))
         self.lbl_total.pack(pady=10)
@@ -542,7 +624,14 @@ class RestaurantApp(ctk.CTk):
         self.chart_type_selector.set("Ventas Diarias")
         self.chart_type_selector.pack(side="left", padx=10)
         
-        Button(control_frame, "📊 Generar Gráfico", self._generate_chart_action).pack(side="left", padx=10)
+        self.btn_chart = Button(control_frame, "📊 Generar Gráfico", self._generate_chart_action)
+        self.btn_chart.pack(side="left", padx=10)
+
+        # Consolidado de todos los locales (consultas en paralelo, una por BD)
+        self.all_locations_check = None
+        if len(locations.names()) > 1:
+            self.all_locations_check = ctk.CTkCheckBox(control_frame, text="Todos los locales")
+            self.all_locations_check.pack(side="left", padx=10)
         
         # Área del Gráfico (Canvas)
         self.chart_frame = Frame(master, pack=sn(fill="both", expand=True, padx=20, pady=10))
@@ -550,106 +639,43 @@ class RestaurantApp(ctk.CTk):
 
     def _generate_chart_action(self):
         chart_type = self.chart_type_selector.get()
-        
-        # Limpiar gráfico anterior
-        if self.current_canvas_widget:
-            self.current_canvas_widget.destroy()
-            
-        # Configuración visual de Matplotlib (Tema Oscuro)
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=100)
-        fig.patch.set_facecolor('#2b2b2b') 
-        ax.set_facecolor('#2b2b2b')
-        ax.tick_params(axis='x', colors='white')
-        ax.tick_params(axis='y', colors='white')
-        for spine in ax.spines.values():
-            spine.set_color('white')
-        ax.set_title(chart_type, color='white', fontsize=14)
-
-        success = False
-        msg = ""
-
-        # Lógica de Gráficos de Ventas
-        if "Ventas" in chart_type:
-            success, data = self.stats_service.get_sales_data()
-            if success:
-                # Mapeo de lógica de agrupación
-                if chart_type == "Ventas Diarias":
-                    grouped = data.groupby(data['date'].dt.date)['total'].sum()
-                    xlabel = "Día"
-                elif chart_type == "Ventas Semanales":
-                    grouped = data.groupby(data['date'].dt.to_period('W').apply(lambda r: r.start_time))['total'].sum()
-                    xlabel = "Semana (Inicio)"
-                elif chart_type == "Ventas Mensuales":
-                    grouped = data.groupby(data['date'].dt.to_period('M').astype(str))['total'].sum()
-                    xlabel = "Mes"
-                elif chart_type == "Ventas Anuales":
-                    grouped = data.groupby(data['date'].dt.to_period('Y').astype(str))['total'].sum()
-                    xlabel = "Año"
-                
-                if not grouped.empty:
-                    # Definir tipo y color
-                    kind = 'line' if chart_type == "Ventas Diarias" else 'bar'
-                    color = '#4CAF50' if kind == 'line' else '#2196F3'
-                    
-                    # --- CORRECCIÓN AQUÍ ---
-                    # Preparamos los argumentos básicos
-                    plot_kwargs = {
-                        'kind': kind, 
-                        'ax': ax, 
-                        'color': color
-                    }
-                    # Solo agregamos 'marker' si es línea (evita error en barras)
-                    if kind == 'line':
-                        plot_kwargs['marker'] = 'o'
-                    
-                    # Desempaquetamos los argumentos con **
-                    grouped.plot(**plot_kwargs)
-                    # -----------------------
-
-                    ax.set_ylabel("Total ($)", color='white')
-                    ax.set_xlabel(xlabel, color='white')
-                    ax.grid(True, linestyle='--', alpha=0.3)
-                    
-                    plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
-                else:
-                    success = False
-                    msg = "No hay datos para el periodo seleccionado."
+        all_locations = bool(self.all_locations_check and self.all_locations_check.get())
 
-        # Menús Populares
-        elif chart_type == "Menús Más Vendidos":
-            success, data = self.stats_service.get_popular_menus_data()
-            if success:
-                top_5 = data.head(5)
-                # Pie chart no usa 'kind', usa función directa ax.pie
-                ax.pie(top_5['total_qty'], labels=top_5['name'], autopct='%1.1f%%', 
-                       startangle=90, textprops={'color':"white"})
-            else:
-                msg = data 
+        # La consulta (SQL + pandas) corre en segundo plano; el dibujo vuelve al hilo de Tk.
+        # key="chart": si el usuario pide otro gráfico antes de terminar, gana el último.
+        self.tasks.submit(self._load_chart_data, chart_type, all_locations,
+                          on_success=lambda result: self._render_chart(chart_type, *result),
+                          on_error=self._show_task_error("Gráficos"), widget=self.btn_chart, key="chart")
 
-        # Ingredientes
+    def _load_chart_data(self, chart_type, all_locations=False):
+        """Se ejecuta en un hilo del TaskRunner: solo consulta, no toca widgets."""
+        stats = self.stats_service
+        if "Ventas" in chart_type:
+            return stats.get_sales_data_all_locations() if all_locations else stats.get_sales_data()
+        elif chart_type == "Menús Más Vendidos":
+            return stats.get_popular_menus_data_all_locations() if all_locations else stats.get_popular_menus_data()
         elif chart_type == "Uso de Ingredientes":
-            success, data = self.stats_service.get_ingredient_usage_data()
-            if success:
-                top_10 = data.head(10)
-                y_pos = range(len(top_10))
-                ax.barh(y_pos, top_10['total_used'], color='#FF9800')
-                ax.set_yticks(y_pos)
-                ax.set_yticklabels(top_10['name'])
-                ax.invert_yaxis()
-                ax.set_xlabel("Cantidad (unid/kg)", color='white')
-            else:
-                msg = data
+            return stats.get_ingredient_usage_data_all_locations() if all_locations else stats.get_ingredient_usage_data()
+        return False, ""
+
+    def _render_chart(self, chart_type, success, data):
+        # Importación diferida: matplotlib solo se carga al generar el primer gráfico
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from src.utils.charts import build_chart
+
+        # Limpiar gráfico anterior (la figura se libera con su canvas: no pasa por pyplot)
+        if self.current_canvas_widget:
+            self.current_canvas_widget.destroy()
+
+        fig, msg = build_chart(chart_type, success, data)
 
         # Renderizado final
-        if success:
-            plt.tight_layout()
+        if fig is not None:
             canvas = FigureCanvasTkAgg(fig, master=self.chart_frame)
             canvas.draw()
             self.current_canvas_widget = canvas.get_tk_widget()
             self.current_canvas_widget.pack(fill="both", expand=True)
         else:
-            plt.close(fig)
-            if not msg: msg = "No hay datos disponibles para mostrar."
             self.current_canvas_widget = Label(self.chart_frame, f"⚠️ {msg}", font=Fonts.get('h2'))
             self.current_canvas_widget.pack(pady=50)
     
@@ -661,11 +687,12 @@ class RestaurantApp(ctk.CTk):
         filter_frame = Frame(frame, pack=sn(fill="x", pady=10))
         Label(filter_frame, "Filtrar por Cliente:").pack(side="left", padx=5)
         
-        self.history_client_selector = ctk.CTkComboBox(
-            filter_frame, 
-            values=["Todos"], 
+        self.history_client_selector = SearchComboBox(
+            filter_frame,
+            self._search_client_options,
+            fixed=[("Todos", 0)], # Opción especial
             width=250,
-            command=self._filter_history_action # Se activa al cambiar selección
+            on_select=self._filter_history_action # Se activa al cambiar selección
         )
         self.history_client_selector.set("Todos")
         self.history_client_selector.pack(side="left", padx=5)
@@ -673,7 +700,8 @@ class RestaurantApp(ctk.CTk):
         Button(filter_frame, "🔄 Actualizar", self._update_history_treeview).pack(side="left", padx=10)
        
         # --- BOTÓN NUEVO: VER BOLETA ---
-        Button(filter_frame, "📄 Ver Boleta", self._view_receipt_history_action, fg_color="#FF9800", hover_color="#F57C00").pack(side="left", padx=10)
+        self.btn_view_receipt = Button(filter_frame, "📄 Ver Boleta", self._view_receipt_history_action, fg_color="#FF9800", hover_color="#F57C00")
+        self.btn_view_receipt.pack(side="left", padx=10)
         # -------------------------------
        
         Button(filter_frame, "❌ Eliminar Pedido", self._delete_order_action, fg_color="#D32F2F", hover_color="#C62828").pack(side="right", padx=10)
@@ -688,7 +716,8 @@ class RestaurantApp(ctk.CTk):
             "qty": {"text": "Cant.", "width": 60, "anchor": "center"},
             "total": {"text": "Total", "width": 100, "anchor": "e"}
         }
-        self.history_tree = TreeViewManager(frame, columns=columns)
+        # Tabla virtual: solo se consultan a la BD las filas visibles. La selección se sigue por el id del pedido
+        self.history_tree = TreeViewManager(frame, columns=columns, key=0, virtual=True, height=15)
         self.history_tree.pack(fill="both", expand=True, pady=10)
         
         # Cargar datos iniciales y selectores
@@ -704,29 +733,27 @@ class RestaurantApp(ctk.CTk):
         # El ID es la primera columna (index 0)
         order_id = selected[0]
         
-        success, result = self.order_service.generate_receipt_pdf(order_id)
-        
-        if success:
-            # Abrir automáticamente el PDF
-            import os, webbrowser
-            if os.path.exists(result):
-                webbrowser.open(f'file:///{os.path.abspath(result)}')
+        def on_done(outcome):
+            success, result = outcome
+            if success:
+                # Abrir automáticamente el PDF
+                if result.endswith(".pdf") and os.path.exists(result):
+                    webbrowser.open(f'file:///{os.path.abspath(result)}')
+                else:
+                    self._show_msg("Éxito", f"Boleta generada: {result}")
             else:
-                self._show_msg("Éxito", f"Boleta generada: {result}")
-        else:
-            self._show_msg("Error", result)
+                self._show_msg("Error", result)
+
+        # La terminal decide el formato (PDF / texto / ESC-POS) según RECEIPT_BACKEND
+        self.tasks.submit(self.order_service.generate_receipt, order_id, on_success=on_done,
+                          on_error=self._show_task_error("Error"), widget=self.btn_view_receipt, key="receipt")
 
     def _update_history_client_selector(self):
         """Carga la lista de clientes en el filtro."""
-        clients = self.client_service.get_all_clients()
-        # Mapa para obtener ID desde el nombre seleccionado
-        self.history_client_map = {f"{c.name}": c.id for c in clients}
-        self.history_client_map["Todos"] = 0 # Opción especial
-        
-        values = ["Todos"] + list(self.history_client_map.keys())
-        if "Todos" in values: values.remove("Todos"); values.insert(0, "Todos") # Asegurar orden
-        
-        self.history_client_selector.configure(values=values)
+        if not hasattr(self, 'history_client_selector'):
+            return
+        # Solo las coincidencias de la última búsqueda, no el directorio completo
+        self.history_client_selector.refresh()
 
     def _filter_history_action(self, choice):
         """Callback al cambiar el combo de clientes."""
@@ -734,25 +761,19 @@ class RestaurantApp(ctk.CTk):
 
     def _update_history_treeview(self):
         """Consulta al servicio y llena la tabla."""
-        selected_name = self.history_client_selector.get()
-        client_id = self.history_client_map.get(selected_name, 0)
-        
-        # Llamada al servicio con el filtro (0 = todos)
-        orders = self.order_service.get_formatted_orders(client_id)
+        if not hasattr(self, 'history_tree'):
+            return
+        # 0 = todos (también si el texto escrito aún no corresponde a un cliente)
+        client_id = self.history_client_selector.get_value() or 0
         
-        # Convertir lista de dicts a lista de listas para el TreeView
-        data = []
-        for o in orders:
-            data.append([
-                o['id'], 
-                o['date'], 
-                o['client'], 
-                o['description'], 
-                o['item_count'], 
-                o['total']
-            ])
-        
-        self.history_tree.load_data(data)
+        def fetch_page(start, stop):
+            # Llamada al servicio con el filtro (0 = todos), solo la página visible
+            orders = self.order_service.get_formatted_orders(client_id, start, stop - start)
+            # Convertir lista de dicts a lista de listas para el TreeView
+            return [[o['id'], o['date'], o['client'], o['description'], o['item_count'], o['total']] for o in orders]
+
+        # Se conserva el scroll y la selección; solo se redibuja la ventana visible
+        self.history_tree.set_data_source(lambda: self.order_service.count_orders(client_id), fetch_page)
 
     def _delete_order_action(self):
         selected = self.history_tree.get_selected_item_values()
@@ -767,7 +788,7 @@ class RestaurantApp(ctk.CTk):
         
         if success:
             self._show_msg("Éxito", msg)
-            self._update_history_treeview()
+            self.refresh.mark_dirty('history')
             # También actualizamos las estadísticas si están abiertas, 
             # pero como es otra pestaña se refrescará sola al generar gráfico.
         else:
@@ -814,7 +835,7 @@ class RestaurantApp(ctk.CTk):
         # Tabla de ingredientes agregados
         Label(right_frame, "Ingredientes agregados:").pack(pady=(10,0))
         recipe_cols = {"name": {"text": "Ingrediente", "width": 150}, "qty": {"text": "Cant.", "width": 50}}
-        self.recipe_builder_tree = TreeViewManager(right_frame, columns=recipe_cols, show_scrollbar=False)
+        self.recipe_builder_tree = TreeViewManager(right_frame, columns=recipe_cols, show_scrollbar=False, key=0)
         self.recipe_builder_tree.pack(fill="both", expand=True, padx=10, pady=5)
         
         Button(right_frame, "❌ Quitar Ingrediente", self._remove_ingredient_from_recipe_action, fg_color="#D32F2F").pack(pady=5)
@@ -826,9 +847,11 @@ class RestaurantApp(ctk.CTk):
         self._refresh_ingredients_combo()
 
     def _refresh_ingredients_combo(self):
-        """Carga los ingredientes de la BD en el combo box."""
+        """Carga los ingredientes de la BD en el combo box, seguidos de los menús (sub-recetas)."""
+        if not hasattr(self, 'combo_ingredients_mgmt'):
+            return
         ings = self.ingredient_service.get_all_ingredients()
-        names = [i.name for i in ings]
+        names = [i.name for i in ings] + [SUBRECIPE_PREFIX + m.name for m in self.menu_service.get_all_menus()]
         if names:
             self.combo_ingredients_mgmt.configure(values=names)
             self.combo_ingredients_mgmt.set(names[0])
@@ -842,8 +865,9 @@ class RestaurantApp(ctk.CTk):
             return
 
         # 1. Limpiar botones anteriores visualmente
+        # (destroy_widget suelta las miniaturas compartidas de la caché, ver tools.py)
         for widget in self.btn_container.winfo_children():
-            widget.destroy()
+            destroy_widget(widget)
         
         self.menu_buttons = {} # Reiniciar diccionario de referencias
 
@@ -852,14 +876,11 @@ class RestaurantApp(ctk.CTk):
         
         # 3. Crear un botón por cada menú
         for item in all_menus:
-            # Intentar buscar imagen si existe en la configuración, sino usar None
-            image_path = MENU_IMAGES.get(item.name, None)
-            
-            # Si no tiene imagen (menú nuevo), podríamos usar una genérica si tuviéramos
-            # Por ahora, usaremos el mismo loader que maneja el error gracefully
+            # La imagen es metadato del menú; la miniatura sale de la caché (sin decodificar PNG)
+            # Si no tiene imagen (menú nuevo), el botón se crea solo con texto
             img = None
-            if image_path:
-                img = load_image_to_btn(image_path, size=(80, 80))
+            if item.image_path:
+                img = load_image_to_btn(item.image_path, size=(80, 80))
             
             # Crear Botón
             btn = Button(
@@ -867,6 +888,7 @@ class RestaurantApp(ctk.CTk):
                 text=f"{item.name}\n${item.price:,.0f}", 
                 image=img, 
                 command=lambda i=item.name: self._add_to_cart_action(i), 
+                action="_add_to_cart_action",
                 width=120, 
                 height=90, 
                 compound="top", 
@@ -878,12 +900,15 @@ class RestaurantApp(ctk.CTk):
             self.menu_buttons[item.name] = btn
             
         # 4. Actualizar estado (Habilitado/Deshabilitado) según stock actual
-        self._update_order_buttons()
+        self.refresh.mark_dirty('order_buttons')
 
     def _add_ingredient_to_recipe_action(self):
         """Agrega ingrediente a la lista temporal."""
-        name = self.combo_ingredients_mgmt.get()
+        label = self.combo_ingredients_mgmt.get()
         qty_str = self.entry_ing_qty_mgmt.get()
+        # Un menú elegido como componente es una sub-receta (se expande a sus ingredientes)
+        is_menu = label.startswith(SUBRECIPE_PREFIX)
+        name = label[len(SUBRECIPE_PREFIX):] if is_menu else label
         
         try:
             qty = float(qty_str)
@@ -891,11 +916,11 @@ class RestaurantApp(ctk.CTk):
             
             # Evitar duplicados en la lista visual
             for item in self.temp_recipe_builder:
-                if item['name'] == name:
+                if item['label'] == label:
                     self._show_msg("Error", "El ingrediente ya está en la lista. Bórrelo para modificar.")
                     return
 
-            self.temp_recipe_builder.append({'name': name, 'qty': qty})
+            self.temp_recipe_builder.append({'name': name, 'qty': qty, 'menu': is_menu, 'label': label})
             self._refresh_recipe_builder_tree()
             
         except ValueError:
@@ -905,13 +930,13 @@ class RestaurantApp(ctk.CTk):
         selected = self.recipe_builder_tree.get_selected_item_values()
         if not selected: return
         
-        name_to_remove = selected[0]
+        label_to_remove = selected[0]
         # Filter para remover
-        self.temp_recipe_builder = list(filter(lambda x: x['name'] != name_to_remove, self.temp_recipe_builder))
+        self.temp_recipe_builder = list(filter(lambda x: x['label'] != label_to_remove, self.temp_recipe_builder))
         self._refresh_recipe_builder_tree()
 
     def _refresh_recipe_builder_tree(self):
-        data = [[i['name'], i['qty']] for i in self.temp_recipe_builder]
+        data = [[i['label'], i['qty']] for i in self.temp_recipe_builder]
         self.recipe_builder_tree.load_data(data)
 
     def _save_new_menu_action(self):
@@ -934,7 +959,7 @@ class RestaurantApp(ctk.CTk):
                 self.entry_new_menu_price.delete(0, END)
                 self.temp_recipe_builder = []
                 self._refresh_recipe_builder_tree()
-                self._generate_menu_action() # Actualizar la otra pestaña
-                self._refresh_menu_buttons()
+                # Actualizar la carta, los botones de la pestaña Pedido y el selector de sub-recetas
+                self.refresh.mark_dirty('menu', 'menu_buttons', 'ingredients')
         except ValueError:
             self._show_msg("Error", "El precio debe ser un número válido.")
\ No newline at end of file
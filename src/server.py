@@ -0,0 +1,401 @@
+"""
+Modo servidor (sin interfaz): expone los servicios como API HTTP/JSON local para varias terminales.
+
+- Un solo hilo escritor: toda operación que modifica la BD pasa por él en orden de llegada,
+  así las terminales dejan de competir por el bloqueo de escritura del archivo SQLite.
+- Las lecturas corren en un pool de hilos aparte (SQLite admite lectores concurrentes).
+- Los carritos viven en el servidor, uno por terminal, y solo se modifican desde el event loop.
+
+Las respuestas siguen la convención de los servicios: {"ok": bool, "message": str, ...}.
+Un rechazo de negocio (stock insuficiente, email repetido) es HTTP 200 con ok=false;
+los códigos 4xx/5xx quedan para errores de protocolo o fallas inesperadas.
+
+Uso: python main.py --server [--host 127.0.0.1] [--port 8765]
+(por defecto POS_SERVER_HOST / POS_SERVER_PORT)
+"""
+import asyncio
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace as sn
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from src.config.consts import CLIENT_SEARCH_LIMIT, SERVER_HOST, SERVER_PORT
+from src.config.database import locations
+from src.services.client_service import ClientService
+from src.services.ingredient_service import IngredientService
+from src.services.menu_service import MenuService
+from src.services.order_service import OrderService
+from src.utils.telemetry import telemetry
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 500: "Internal Server Error"}
+
+class ApiError(Exception):
+    """Error de protocolo: se responde con el código HTTP indicado."""
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def _menu_to_dict(menu) -> dict:
+    return {"name": menu.name, "price": menu.price, "description": menu.description, "image_path": menu.image_path}
+
+def _ingredient_to_dict(ingredient) -> dict:
+    return {"name": ingredient.name, "unit": ingredient.unit, "quantity": ingredient.quantity}
+
+def _client_to_dict(client) -> dict:
+    return {"id": client.id, "name": client.name, "email": client.email}
+
+class PosServer:
+    def __init__(self, read_workers: int = 4):
+        self.ingredient_service = IngredientService()
+        self.menu_service = MenuService()
+        self.client_service = ClientService()
+        self.order_service = OrderService()
+
+        # Un único escritor serializa todas las transacciones de escritura
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pos-writer")
+        self._readers = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="pos-reader")
+
+        # Carritos por terminal: terminal -> {menu_name: {'quantity', 'price'}}
+        self.carts = {}
+        # Terminales con un checkout en curso (su carrito se retiró de self.carts mientras tanto)
+        self._checkouts = set()
+        self.stats = {"requests": 0, "errors": 0, "reads": 0, "writes": 0, "pending_writes": 0, "busy_seconds": 0.0}
+
+        self._routes = [
+            ("GET", r"/health", self.health),
+            ("GET", r"/metrics", self.metrics),
+            ("GET", r"/menus", self.list_menus),
+            ("GET", r"/ingredients", self.list_ingredients),
+            ("POST", r"/ingredients", self.add_ingredient),
+            ("DELETE", r"/ingredients/(?P<name>[^/]+)", self.delete_ingredient),
+            ("GET", r"/clients", self.search_clients),
+            ("POST", r"/clients", self.register_client),
+            ("DELETE", r"/clients/(?P<client_id>\d+)", self.delete_client),
+            ("GET", r"/orders", self.list_orders),
+            ("GET", r"/orders/count", self.count_orders),
+            ("POST", r"/orders", self.create_order),
+            ("DELETE", r"/orders/(?P<order_id>\d+)", self.delete_order),
+            ("POST", r"/orders/(?P<order_id>\d+)/receipt", self.generate_receipt),
+            ("GET", r"/carts/(?P<terminal>[^/]+)", self.get_cart),
+            ("DELETE", r"/carts/(?P<terminal>[^/]+)", self.clear_cart),
+            ("POST", r"/carts/(?P<terminal>[^/]+)/items", self.add_cart_item),
+            ("DELETE", r"/carts/(?P<terminal>[^/]+)/items/(?P<menu_name>[^/]+)", self.remove_cart_item),
+            ("POST", r"/carts/(?P<terminal>[^/]+)/checkout", self.checkout),
+        ]
+        self._routes = [(method, re.compile(pattern + "$"), handler) for method, pattern, handler in self._routes]
+
+    # --- Ejecución en hilos ---
+    async def _read(self, fn, *args):
+        self.stats["reads"] += 1
+        return await asyncio.get_running_loop().run_in_executor(self._readers, fn, *args)
+
+    async def _write(self, fn, *args):
+        self.stats["writes"] += 1
+        self.stats["pending_writes"] += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._writer, fn, *args)
+        finally:
+            self.stats["pending_writes"] -= 1
+
+    async def _client_id(self, value) -> int:
+        """client_id del cuerpo como entero de un cliente existente; si no, error 400."""
+        try:
+            client_id = int(value)
+        except (TypeError, ValueError):
+            raise ApiError(400, f"client_id inválido: {value!r}")
+        if isinstance(value, bool) or not await self._read(self.client_service.client_exists, client_id):
+            raise ApiError(400, f"Cliente {value!r} no encontrado.")
+        return client_id
+
+    # --- Endpoints generales ---
+    async def health(self, req):
+        return {"ok": True, "location": self.order_service.location,
+                "pending_writes": self.stats["pending_writes"], "carts": len(self.carts)}
+
+    async def metrics(self, req):
+        payload = {"ok": True, **self.stats}
+        if telemetry.enabled:
+            payload["telemetry"] = telemetry.summary()
+            payload["lock_errors"] = telemetry.lock_errors
+        return payload
+
+    async def list_menus(self, req):
+        def load():
+            status = self.menu_service.get_menu_status()
+            return {key: [_menu_to_dict(m) for m in menus] for key, menus in status.items()}
+        return {"ok": True, **await self._read(load)}
+
+    # --- Ingredientes ---
+    async def list_ingredients(self, req):
+        def load():
+            return [_ingredient_to_dict(i) for i in self.ingredient_service.get_all_ingredients()]
+        return {"ok": True, "ingredients": await self._read(load)}
+
+    async def add_ingredient(self, req):
+        name, unit, quantity = _require(req.body, "name", "unit", "quantity")
+        success, msg = await self._write(self.ingredient_service.add_ingredient, name, unit, float(quantity))
+        return {"ok": success, "message": msg}
+
+    async def delete_ingredient(self, req):
+        success, msg = await self._write(self.ingredient_service.delete_ingredient, req.params["name"])
+        return {"ok": success, "message": msg}
+
+    # --- Clientes ---
+    async def search_clients(self, req):
+        prefix = req.query.get("q", "")
+        limit = int(req.query.get("limit", CLIENT_SEARCH_LIMIT))
+        def load():
+            return [_client_to_dict(c) for c in self.client_service.search_clients(prefix, limit)]
+        return {"ok": True, "clients": await self._read(load)}
+
+    async def register_client(self, req):
+        name, email = _require(req.body, "name", "email")
+        success, msg = await self._write(self.client_service.register_client, name, email)
+        return {"ok": success, "message": msg}
+
+    async def delete_client(self, req):
+        success, msg = await self._write(self.client_service.delete_client, int(req.params["client_id"]))
+        return {"ok": success, "message": msg}
+
+    # --- Pedidos ---
+    async def list_orders(self, req):
+        client_id = int(req.query.get("client_id", 0))
+        offset = int(req.query.get("offset", 0))
+        limit = int(req.query["limit"]) if "limit" in req.query else None
+        orders = await self._read(self.order_service.get_formatted_orders, client_id, offset, limit)
+        return {"ok": True, "orders": orders}
+
+    async def count_orders(self, req):
+        client_id = int(req.query.get("client_id", 0))
+        return {"ok": True, "count": await self._read(self.order_service.count_orders, client_id)}
+
+    async def create_order(self, req):
+        """
+        Pedido directo sin carrito: {"client_id": 1, "items": [{"menu_name", "quantity"}]}.
+        Igual que en el carrito, el precio sale de la carta del servidor: un "price" enviado
+        por el cliente se ignora.
+        """
+        client_id, items = _require(req.body, "client_id", "items")
+        client_id = await self._client_id(client_id)
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise ApiError(400, "items debe ser una lista de objetos.")
+        lines = [(_require(item, "menu_name")[0], int(item.get("quantity", 1))) for item in items]
+        if any(quantity <= 0 for _, quantity in lines):
+            raise ApiError(400, "La cantidad debe ser mayor que cero.")
+
+        def price(menu_names):
+            menus = {}
+            for name in menu_names:
+                menu, _ = self.menu_service.get_menu(name)
+                if not menu:
+                    return None, f"Menú '{name}' no encontrado."
+                menus[name] = menu.price
+            return menus, None
+
+        prices, msg = await self._read(price, {name for name, _ in lines})
+        if prices is None:
+            return {"ok": False, "message": msg}
+        cart_list = [{"menu_name": name, "quantity": quantity, "price": prices[name]} for name, quantity in lines]
+        success, msg, _ = await self._write(self.order_service.process_order, client_id, cart_list)
+        return {"ok": success, "message": msg}
+
+    async def delete_order(self, req):
+        success, msg = await self._write(self.order_service.delete_order, int(req.params["order_id"]))
+        return {"ok": success, "message": msg}
+
+    async def generate_receipt(self, req):
+        # Solo lee la BD; el archivo de la boleta se escribe en el servidor
+        backend = req.body.get("backend")
+        success, result = await self._read(self.order_service.generate_receipt, int(req.params["order_id"]), backend)
+        return {"ok": success, "message": result}
+
+    # --- Carritos por terminal ---
+    def _cart_payload(self, terminal: str) -> dict:
+        cart = self.carts.get(terminal, {})
+        items = [{"menu_name": name, "quantity": line["quantity"], "price": line["price"]} for name, line in cart.items()]
+        total = sum(item["quantity"] * item["price"] for item in items)
+        return {"terminal": terminal, "items": items, "total": total}
+
+    async def get_cart(self, req):
+        return {"ok": True, **self._cart_payload(req.params["terminal"])}
+
+    async def clear_cart(self, req):
+        self.carts.pop(req.params["terminal"], None)
+        return {"ok": True, **self._cart_payload(req.params["terminal"])}
+
+    async def add_cart_item(self, req):
+        terminal = req.params["terminal"]
+        (menu_name,) = _require(req.body, "menu_name")
+        quantity = int(req.body.get("quantity", 1))
+        if quantity <= 0:
+            raise ApiError(400, "La cantidad debe ser mayor que cero.")
+
+        def validate(requested):
+            menu, ingredients = self.menu_service.get_menu(menu_name)
+            if not menu:
+                return None, f"Menú '{menu_name}' no encontrado.", []
+            success, msg, unavailable = self.order_service.validate_stock(menu_name, requested, ingredients)
+            return (menu.price if success else None), msg, unavailable
+
+        current = self.carts.get(terminal, {}).get(menu_name, {}).get("quantity", 0)
+        price, msg, unavailable = await self._read(validate, current + quantity)
+        if price is None:
+            return {"ok": False, "message": msg, "unavailable": unavailable, **self._cart_payload(terminal)}
+
+        # El carrito se modifica recién aquí, de vuelta en el event loop
+        line = self.carts.setdefault(terminal, {}).setdefault(menu_name, {"quantity": 0, "price": price})
+        line["quantity"] += quantity
+        return {"ok": True, **self._cart_payload(terminal)}
+
+    async def remove_cart_item(self, req):
+        terminal, menu_name = req.params["terminal"], req.params["menu_name"]
+        cart = self.carts.get(terminal, {})
+        if menu_name not in cart:
+            return {"ok": False, "message": "El ítem no se encuentra en el carrito.", **self._cart_payload(terminal)}
+        del cart[menu_name]
+        return {"ok": True, **self._cart_payload(terminal)}
+
+    async def checkout(self, req):
+        terminal = req.params["terminal"]
+        (client_id,) = _require(req.body, "client_id")
+        client_id = await self._client_id(client_id)
+        if terminal in self._checkouts:
+            raise ApiError(409, "Ya hay un cobro en curso para este carrito.")
+
+        # El carrito sale de self.carts antes de escribir: un segundo checkout no lo vuelve a cobrar
+        cart_list = self._cart_payload(terminal)["items"]
+        cart = self.carts.pop(terminal, {})
+        self._checkouts.add(terminal)
+        success = False
+        try:
+            success, msg, _ = await self._write(self.order_service.process_order, client_id, cart_list)
+        finally:
+            self._checkouts.discard(terminal)
+            if not success:
+                # Se devuelve el carrito, sumando lo que la terminal agregó mientras tanto
+                current = self.carts.setdefault(terminal, {})
+                for menu_name, line in cart.items():
+                    if menu_name in current:
+                        current[menu_name]["quantity"] += line["quantity"]
+                    else:
+                        current[menu_name] = line
+        return {"ok": success, "message": msg, **self._cart_payload(terminal)}
+
+    # --- HTTP ---
+    async def dispatch(self, method: str, target: str, body: bytes) -> tuple[int, dict]:
+        self.stats["requests"] += 1
+        started = time.perf_counter()
+        try:
+            url = urlsplit(target)
+            path = unquote(url.path.rstrip("/") or "/")
+            allowed = False
+            for route_method, pattern, handler in self._routes:
+                match = pattern.match(path)
+                if not match:
+                    continue
+                allowed = True
+                if route_method != method:
+                    continue
+                try:
+                    payload = json.loads(body) if body else {}
+                except ValueError:
+                    raise ApiError(400, "El cuerpo no es JSON válido.")
+                if not isinstance(payload, dict):
+                    raise ApiError(400, "El cuerpo debe ser un objeto JSON.")
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                req = sn(params=match.groupdict(), query=query, body=payload)
+                return 200, await handler(req)
+            raise ApiError(405 if allowed else 404, f"{method} {path} no existe.")
+        except ApiError as e:
+            self.stats["errors"] += 1
+            return e.status, {"ok": False, "message": str(e)}
+        except (ValueError, TypeError) as e:
+            self.stats["errors"] += 1
+            return 400, {"ok": False, "message": f"Parámetros inválidos: {e}"}
+        except Exception as e:
+            self.stats["errors"] += 1
+            return 500, {"ok": False, "message": f"Error inesperado: {e}"}
+        finally:
+            self.stats["busy_seconds"] += time.perf_counter() - started
+
+    async def handle_connection(self, reader, writer):
+        """HTTP/1.1 mínimo con keep-alive: una petición tras otra por conexión."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self.dispatch(method.upper(), target, body)
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                writer.write((
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                ).encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass  # Cliente desconectado o petición mal formada: se cierra la conexión
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = SERVER_HOST, port: int = SERVER_PORT, ready=None):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Servidor POS escuchando en http://{host}:{port}")
+        if ready:
+            ready(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=False, cancel_futures=True)
+
+def _require(body: dict, *fields):
+    missing = [field for field in fields if body.get(field) in (None, "")]
+    if missing:
+        raise ApiError(400, f"Faltan campos: {', '.join(missing)}")
+    return [body[field] for field in fields]
+
+def run_server(host: str = SERVER_HOST, port: int = SERVER_PORT):
+    telemetry.start_exporter()
+    # Con POS_BACKUP_MINUTES respalda la BD del local en segundo plano, sin cortar las ventas
+    locations.get().start_backups()
+    # Con POS_ORDER_JOURNAL=1 los pedidos se confirman al quedar en el diario (aplica lo pendiente primero)
+    locations.get().start_journal()
+    # Foto periódica del stock (POS_STOCK_SNAPSHOT_MINUTES): las ventas solo agregan movimientos
+    locations.get().start_stock_snapshots()
+    # Con POS_OFFLINE=1 la caja sigue vendiendo contra una copia local si la BD no responde
+    locations.get().start_offline()
+    try:
+        asyncio.run(PosServer().serve(host, port))
+    except KeyboardInterrupt:
+        print("Servidor detenido.")
+    finally:
+        locations.get().stop_offline()
+        locations.get().stop_journal()
+        locations.get().stop_stock_snapshots()
+        locations.get().stop_backups()
+        telemetry.shutdown()
@@ -1,14 +1,44 @@
 import re # Para expresiones regulares
 from sqlalchemy.exc import SQLAlchemyError
-from src.config.database import db
+from src.config.database import locations
+from src.utils.telemetry import instrument_service
 from src.crud.client_crud import ClientCRUD
+from src.crud.order_crud import OrderCRUD
 
+@instrument_service
 class ClientService:
+    def __init__(self, location: str = None):
+        # Local (shard) sobre el que opera; None = el de esta terminal (POS_LOCATION)
+        self.location = location or locations.current
+        self._db = locations.get(self.location)
+
     def get_all_clients(self):
-        session_gen = db.get_session()
+        """Retorna todos los clientes (ClientRow de solo lectura)."""
+        session_gen = self._db.get_session()
+        session = next(session_gen)
+        try:
+            return ClientCRUD.get_all_rows(session)
+        finally:
+            session.close()
+
+    def search_clients(self, prefix: str, limit: int = 20):
+        """
+        Búsqueda incremental por prefijo de nombre o email (consulta indexada).
+        Con prefijo vacío retorna los primeros 'limit' clientes por nombre.
+        """
+        session_gen = self._db.get_session()
+        session = next(session_gen)
+        try:
+            return ClientCRUD.search_prefix(session, (prefix or "").strip(), limit)
+        finally:
+            session.close()
+
+    def client_exists(self, client_id: int) -> bool:
+        """True si el cliente existe en este local (para validar pedidos que llegan por la API)."""
+        session_gen = self._db.get_session()
         session = next(session_gen)
         try:
-            return ClientCRUD.get_all(session)
+            return ClientCRUD.get_by_id(session, client_id) is not None
         finally:
             session.close()
 
@@ -26,7 +56,7 @@ class ClientService:
         if not re.match(email_regex, email):
             return False, "El formato del correo electrónico no es válido."
 
-        session_gen = db.get_session()
+        session_gen = self._db.get_session()
         session = next(session_gen)
         try:
             # 3. Validar Unicidad
@@ -46,7 +76,7 @@ class ClientService:
         """
         Elimina un cliente SOLO si no tiene pedidos asociados.
         """
-        session_gen = db.get_session()
+        session_gen = self._db.get_session()
         session = next(session_gen)
         try:
             client = ClientCRUD.get_by_id(session, client_id)
@@ -55,9 +85,10 @@ class ClientService:
                 return False, "Cliente no encontrado."
             
             # 4. Validar Integridad Referencial (Pedidos Asociados)
-            # Al acceder a client.orders, SQLAlchemy hace la consulta gracias a la relación
-            if client.orders:
-                return False, f"No se puede eliminar a '{client.name}': Tiene {len(client.orders)} pedidos históricos asociados."
+            # Se cuenta en SQL: cargar client.orders traería cada pedido (y sus detalles al borrar)
+            order_count = OrderCRUD.count(session, client_id)
+            if order_count:
+                return False, f"No se puede eliminar a '{client.name}': Tiene {order_count} pedidos históricos asociados."
             
             ClientCRUD.delete(session, client)
             session.commit()
@@ -1,22 +1,29 @@
 import csv
 from sqlalchemy.exc import SQLAlchemyError
-from src.config.database import db
+from src.config.database import locations
+from src.utils.telemetry import instrument_service
 from src.crud.ingredient_crud import IngredientCRUD
 from src.models import IngredientModel
 
+@instrument_service
 class IngredientService:
     """
     Gestor de lógica de negocio para Ingredientes.
     Maneja transacciones, validaciones y procesamiento de datos.
     """
 
+    def __init__(self, location: str = None):
+        # Local (shard) sobre el que opera; None = el de esta terminal (POS_LOCATION)
+        self.location = location or locations.current
+        self._db = locations.get(self.location)
+
     def get_all_ingredients(self):
-        """Retorna todos los ingredientes disponibles."""
+        """Retorna todos los ingredientes (IngredientRow de solo lectura)."""
         # Usamos el generador de sesión de nuestra clase DatabaseManager
-        session_gen = db.get_session()
+        session_gen = self._db.get_session()
         session = next(session_gen)
         try:
-            return IngredientCRUD.get_all(session)
+            return IngredientCRUD.get_all_rows(session)
         finally:
             session.close()
 
@@ -27,15 +34,17 @@ class IngredientService:
         
         name = name.strip().capitalize()
         
-        session_gen = db.get_session()
+        session_gen = self._db.get_session()
         session = next(session_gen)
         
         try:
             existing = IngredientCRUD.get_by_name(session, name)
             
             if existing:
-                IngredientCRUD.update_quantity(session, existing, quantity)
-                msg = f"Stock actualizado para '{name}'. Nuevo total: {existing.quantity}"
+                # Entrega: se agrega un movimiento, el stock anterior no se toca
+                IngredientCRUD.add_movement(session, existing.id, "entrega", quantity)
+                total = IngredientCRUD.get_quantities(session, [existing.id])[existing.id]
+                msg = f"Stock actualizado para '{name}'. Nuevo total: {total}"
             else:
                 IngredientCRUD.create(session, name, unit, quantity)
                 msg = f"Ingrediente '{name}' creado exitosamente."
@@ -49,7 +58,7 @@ class IngredientService:
             session.close()
 
     def delete_ingredient(self, name: str) -> tuple[bool, str]:
-        session_gen = db.get_session()
+        session_gen = self._db.get_session()
         session = next(session_gen)
         try:
             existing = IngredientCRUD.get_by_name(session, name)
@@ -112,7 +121,7 @@ class IngredientService:
 
     def save_bulk_ingredients(self, ingredients_data: list) -> tuple[bool, str]:
         """Recibe la lista procesada del CSV y la guarda en BD en una sola transacción."""
-        session_gen = db.get_session()
+        session_gen = self._db.get_session()
         session = next(session_gen)
         count = 0
         try:
@@ -123,7 +132,7 @@ class IngredientService:
                 existing = IngredientCRUD.get_by_name(session, clean_name)
                 
                 if existing:
-                    IngredientCRUD.update_quantity(session, existing, item['quantity'])
+                    IngredientCRUD.add_movement(session, existing.id, "entrega", item['quantity'], note="Carga CSV")
                 else:
                     IngredientCRUD.create(session, clean_name, item['unit'], item['quantity'])
                     # CAMBIO CRÍTICO: flush() fuerza a que este nuevo ingrediente sea visible 
@@ -139,4 +148,79 @@ class IngredientService:
             # Mostramos el error original para depurar mejor
             return False, f"Error en transacción masiva: {str(e)}"
         finally:
-            session.close()
\ No newline at end of file
+            session.close()
+
+    # --- Libro de movimientos de stock ---
+    def _register_movement(self, name: str, kind: str, amount_for, note: str = None) -> tuple[bool, str]:
+        """amount_for(stock actual) -> (cantidad con signo, mensaje de error o None)."""
+        session_gen = self._db.get_session()
+        session = next(session_gen)
+        try:
+            # Candado de escritura antes de leer: una venta concurrente no puede cambiar el stock
+            # entre el cálculo de la merma o del ajuste y su registro
+            self._db.begin_write(session)
+            existing = IngredientCRUD.get_by_name(session, name)
+            if not existing:
+                session.rollback()
+                return False, f"Ingrediente '{name}' no encontrado."
+            current = IngredientCRUD.get_quantities(session, [existing.id])[existing.id]
+            amount, error = amount_for(current)
+            if error:
+                session.rollback()
+                return False, error
+            if amount:
+                IngredientCRUD.add_movement(session, existing.id, kind, amount, note=note)
+            session.commit()
+            return True, f"Stock de '{existing.name}': {current + amount:,.2f} {existing.unit}."
+        except SQLAlchemyError as e:
+            session.rollback()
+            return False, f"Error de base de datos: {str(e)}"
+        finally:
+            session.close()
+
+    def adjust_stock(self, name: str, counted: float, note: str = "") -> tuple[bool, str]:
+        """Ajuste por inventario físico: registra la diferencia entre lo contado y el stock actual."""
+        if counted < 0:
+            return False, "El stock no puede ser negativo."
+        return self._register_movement(name, "ajuste", lambda current: (counted - current, None), note or "Inventario")
+
+    def register_waste(self, name: str, quantity: float, note: str = "") -> tuple[bool, str]:
+        """Merma (vencido, dañado, ...): descuenta 'quantity' sin superar el stock actual."""
+        if quantity <= 0:
+            return False, "La merma debe ser mayor que cero."
+        return self._register_movement(name, "merma", lambda current: (
+            (-quantity, None) if quantity <= current else (0.0, f"La merma supera el stock actual ({current:,.2f}).")
+        ), note or None)
+
+    def get_movements(self, name: str, limit: int = 100) -> list:
+        """Últimos movimientos (MovementRow) de un ingrediente; lista vacía si no existe."""
+        session_gen = self._db.get_session()
+        session = next(session_gen)
+        try:
+            existing = IngredientCRUD.get_by_name(session, name)
+            return IngredientCRUD.get_movements(session, existing.id, limit) if existing else []
+        finally:
+            session.close()
+
+    def get_stock_at(self, when) -> list:
+        """Stock de todos los ingredientes (IngredientRow) a una fecha y hora pasadas."""
+        session_gen = self._db.get_session()
+        session = next(session_gen)
+        try:
+            return IngredientCRUD.get_stock_at(session, when)
+        finally:
+            session.close()
+
+    def take_stock_snapshot(self) -> tuple[bool, str]:
+        """Materializa la foto del stock (también la toma StockSnapshotScheduler periódicamente)."""
+        session_gen = self._db.get_session()
+        session = next(session_gen)
+        try:
+            changed = IngredientCRUD.take_snapshot(session)
+            session.commit()
+            return True, f"Foto de stock tomada: {changed} ingredientes actualizados."
+        except SQLAlchemyError as e:
+            session.rollback()
+            return False, f"Error al tomar la foto de stock: {str(e)}"
+        finally:
+            session.close()
@@ -1,34 +1,54 @@
 from sqlalchemy.exc import SQLAlchemyError
-from src.config.database import db
+from src.config.database import locations
+from src.utils.telemetry import instrument_service
 from src.crud.menu_crud import MenuCRUD
 from src.crud.ingredient_crud import IngredientCRUD
-from src.models import MenuItemModel, IngredientModel
+from src.read_models import MenuRow
+from src.utils.bom import bom_cache, new_recipe_version
+from src.utils.offline_queue import is_unavailable
+from src.config.migrations import seed_default_menus
 
+@instrument_service
 class MenuService:
     """
     Gestor de lógica de negocio para Menús.
     Calcula disponibilidad basada en stock y gestiona recetas.
     """
 
+    def __init__(self, location: str = None):
+        # Local (shard) sobre el que opera; None = el de esta terminal (POS_LOCATION)
+        self.location = location or locations.current
+        self._db = locations.get(self.location)
+
     def get_all_menus(self):
-        """Retorna todos los menús con sus recetas cargadas."""
-        session_gen = db.get_session()
+        """
+        Retorna todos los menús (MenuRow) con su disponibilidad ya calculada en SQL
+        (los que tienen sub-recetas, con la lista de materiales en caché).
+        """
+        offline = self._db.offline
+        if offline is not None and offline.active:
+            return offline.store.menu_rows()   # Sin conexión: copia local de la carta
+
+        session_gen = self._db.get_session()
         session = next(session_gen)
 
         try:
-            return MenuCRUD.get_all(session)
+            return bom_cache.resolve_availability(session, MenuCRUD.get_all_rows(session))
+        except SQLAlchemyError as e:
+            if offline is None or not is_unavailable(e):
+                raise
+            offline.go_offline(e)
+            return offline.store.menu_rows()
         finally:
             session.close()
 
-    def check_availability(self, menu_item: MenuItemModel) -> bool:
+    def check_availability(self, menu_item: MenuRow) -> bool:
         """
         Valida si un menú puede prepararse con el stock actual.
-        Retorna True si TODOS los ingredientes tienen stock suficiente.
+        True si tiene receta y TODOS los ingredientes (expandidas las sub-recetas) tienen stock
+        suficiente (ver MenuCRUD._availability_column y BomCache.resolve_availability).
         """
-        if not menu_item.recipe_links:
-            return False # O True, dependiendo si permites vender items sin receta
-            
-        return all(link.ingredient.quantity >= link.required_quantity for link in menu_item.recipe_links)
+        return menu_item.available
 
     def get_menu_status(self) -> dict:
         """
@@ -49,24 +69,55 @@ class MenuService:
             "unavailable": unavailable
         }
     
-    def create_custom_menu(self, name: str, price: float, description: str, recipe_list: list) -> tuple[bool, str]:
+    def _validate_recipe_list(self, recipe_list: list) -> str:
+        """Mensaje de error de la receta, o "" si es válida."""
+        if not recipe_list:
+            return "El menú debe tener al menos un ingrediente."
+
+        # Validar cantidades negativas usando FILTER (Requisito EV3)
+        invalid_qtys = list(filter(lambda x: float(x['qty']) <= 0, recipe_list))
+        if invalid_qtys:
+            return "Hay ingredientes con cantidad 0 o negativa."
+        return ""
+
+    def _add_recipe_lines(self, session, menu, recipe_list: list, forbidden_components: set = frozenset()):
+        """
+        Agrega las líneas de recipe_list al menú. Las que traen 'menu': True son sub-recetas
+        (otro menú usado como componente); forbidden_components son los ids que formarían un ciclo.
+        """
+        for item in recipe_list:
+            if item.get('menu'):
+                component = MenuCRUD.get_by_name(session, item['name'])
+                if not component:
+                    raise ValueError(f"El menú '{item['name']}' no existe en BD.")
+                if component.id in forbidden_components:
+                    raise ValueError(f"'{item['name']}' ya contiene a '{menu.name}': la receta sería circular.")
+                MenuCRUD.add_recipe_component(session, menu, component, float(item['qty']))
+                continue
+
+            ingredient = IngredientCRUD.get_by_name(session, item['name'])
+            if not ingredient:
+                raise ValueError(f"El ingrediente '{item['name']}' no existe en BD.")
+
+            MenuCRUD.add_recipe_item(session, menu, ingredient, float(item['qty']))
+
+    def create_custom_menu(self, name: str, price: float, description: str, recipe_list: list, image_path: str = None) -> tuple[bool, str]:
         """
         Crea un menú nuevo validando reglas de negocio.
-        recipe_list: lista de diccionarios [{'name': 'Pan', 'qty': 1}, ...]
+        recipe_list: lista de diccionarios [{'name': 'Pan', 'qty': 1}, ...]; con 'menu': True
+                     la línea es una sub-receta (otro menú, ej. una salsa o masa)
+        image_path: imagen opcional del botón de venta (relativa a la raíz del proyecto)
         """
         # 1. Validaciones básicas
         if not name or price <= 0:
             return False, "Nombre inválido o precio debe ser mayor a 0."
-        
-        if not recipe_list:
-            return False, "El menú debe tener al menos un ingrediente."
 
-        # 2. Validar cantidades negativas usando FILTER (Requisito EV3)
-        invalid_qtys = list(filter(lambda x: float(x['qty']) <= 0, recipe_list))
-        if invalid_qtys:
-            return False, "Hay ingredientes con cantidad 0 o negativa."
+        # 2. Receta no vacía y sin cantidades 0 o negativas
+        error = self._validate_recipe_list(recipe_list)
+        if error:
+            return False, error
 
-        session_gen = db.get_session()
+        session_gen = self._db.get_session()
         session = next(session_gen)
 
         try:
@@ -75,15 +126,10 @@ class MenuService:
                 return False, f"El menú '{name}' ya existe."
 
             # 4. Crear Cabecera
-            new_menu = MenuCRUD.create_menu(session, name, price, description)
+            new_menu = MenuCRUD.create_menu(session, name, price, description, image_path, new_recipe_version())
             
-            # 5. Procesar Receta
-            for item in recipe_list:
-                ingredient = IngredientCRUD.get_by_name(session, item['name'])
-                if not ingredient:
-                    raise ValueError(f"El ingrediente '{item['name']}' no existe en BD.")
-                
-                MenuCRUD.add_recipe_item(session, new_menu, ingredient, float(item['qty']))
+            # 5. Procesar Receta (ingredientes y sub-recetas)
+            self._add_recipe_lines(session, new_menu, recipe_list)
             
             session.commit()
             return True, f"Menú '{name}' creado exitosamente."
@@ -94,16 +140,54 @@ class MenuService:
         finally:
             session.close()
 
+    def update_recipe(self, name: str, recipe_list: list) -> tuple[bool, str]:
+        """
+        Reemplaza la receta de un menú (mismo formato que create_custom_menu).
+        Cambia recipe_version del menú y de los que lo usan como sub-receta: sus listas de
+        materiales en caché quedan obsoletas en todas las terminales.
+        """
+        error = self._validate_recipe_list(recipe_list)
+        if error:
+            return False, error
+
+        session_gen = self._db.get_session()
+        session = next(session_gen)
+        try:
+            menu = MenuCRUD.get_by_name(session, name)
+            if not menu:
+                return False, "Menú no encontrado."
+
+            ancestors = MenuCRUD.get_ancestor_ids(session, menu.id)
+            MenuCRUD.clear_recipe(session, menu)
+            self._add_recipe_lines(session, menu, recipe_list, forbidden_components=ancestors | {menu.id})
+            MenuCRUD.touch_recipes(session, ancestors | {menu.id}, new_recipe_version())
+
+            session.commit()
+            bom_cache.invalidate(ancestors | {menu.id})
+            return True, f"Receta de '{name}' actualizada."
+        except Exception as e:
+            session.rollback()
+            return False, f"Error al actualizar receta: {str(e)}"
+        finally:
+            session.close()
+
     def delete_menu(self, menu_name: str) -> tuple[bool, str]:
-        session_gen = db.get_session()
+        session_gen = self._db.get_session()
         session = next(session_gen)
         try:
             menu = MenuCRUD.get_by_name(session, menu_name)
             if not menu:
                 return False, "Menú no encontrado."
+
+            # Borrarlo dejaría recetas de otros menús apuntando a nada
+            parents = MenuCRUD.get_names_using_component(session, menu.id)
+            if parents:
+                return False, f"El menú se usa como sub-receta en: {', '.join(parents)}."
             
+            menu_id = menu.id
             MenuCRUD.delete_menu(session, menu)
             session.commit()
+            bom_cache.invalidate([menu_id])
             return True, "Menú eliminado."
         except Exception as e:
             session.rollback()
@@ -111,83 +195,40 @@ class MenuService:
         finally:
             session.close()
 
-    def get_menu(self, name) -> list:
-        session_gen = db.get_session()
+    def get_menu(self, name) -> tuple:
+        """
+        Retorna (MenuRow, [RecipeLine]) o (None, []) si el menú no existe.
+        La receta viene aplanada: ingredientes crudos con las sub-recetas ya expandidas.
+        """
+        offline = self._db.offline
+        if offline is not None and offline.active:
+            return offline.store.get_menu(name)
+
+        session_gen = self._db.get_session()
         session = next(session_gen)
         try:
-            menu = MenuCRUD.get_by_name(session, name)
+            menu = MenuCRUD.get_row_by_name(session, name)
             if menu:
-                ingredients = [link for link in menu.recipe_links]
-                return menu, ingredients
+                menu = bom_cache.resolve_availability(session, [menu])[0]
+                return menu, MenuCRUD.get_ingredient_lines(session, bom_cache.get(session, menu.id, menu.recipe_version))
             return None, []
+        except SQLAlchemyError as e:
+            if offline is None or not is_unavailable(e):
+                raise
+            offline.go_offline(e)
+            return offline.store.get_menu(name)
         finally:
             session.close()
 
     def initialize_default_menus(self):
         """
-        Carga los menús por defecto en la BD si no existen.
-        Crea automáticamente los ingredientes necesarios con stock 0.
-        """
-        defaults = [
-            {"name": "Papas Fritas", "price": 500, "recipe": [("Papas", 5)]},
-            {"name": "Completo", "price": 1800, "recipe": [("Vienesa", 1), ("Pan de completo", 1), ("Tomate", 1), ("Palta", 1)]},
-            {"name": "Hamburguesa", "price": 3500, "recipe": [("Pan de hamburguesa", 1), ("Lamina de queso", 1), ("Churrasco de carne", 1)]},
-            {"name": "Pollo Frito", "price": 2500, "recipe": [("Presa de pollo", 1), ("Porcion de harina", 1), ("Porcion de aceite", 1)]},
-            {"name": "Panqueques", "price": 2000, "recipe": [("Panqueques", 2), ("Manjar", 1), ("Azucar flor", 1)]},
-            {"name": "Ensalada Mixta", "price": 1500, "recipe": [("Lechuga", 1), ("Tomate", 1), ("Zanahoria rallada", 1)]},
-            {"name": "Pepsi", "price": 1100, "recipe": [("Pepsi", 1)]}
-        ]
-
-        defaults_unid = {
-          'Papas': 'kg',
-          'Vienesa': 'unid',
-          'Pan de completo': 'unid',
-          'Tomate': 'kg',
-          'Palta': 'kg',
-          'Pan de hamburguesa': 'unid',
-          'Lamina de queso': 'unid',
-          'Churrasco de carne': 'unid',
-          'Presa de pollo': 'unid',
-          'Porcion de harina': 'kg',
-          'Porcion de aceite': 'unid',
-          'Panqueques': 'unid',
-          'Manjar': 'kg',
-          'Azucar flor': 'kg',
-          'Lechuga': 'kg',
-          'Zanahoria rallada': 'kg',
-          'Pepsi': 'unid',
-        }
-
-        session_gen = db.get_session()
-        session = next(session_gen)
-        
+        Crea en bloque los menús por defecto que falten (y sus ingredientes con stock 0).
+        Al iniciar ya lo hace UNA vez la migración de datos semilla; este método queda
+        para restaurar manualmente los menús por defecto.
+        """
         try:
-            for item in defaults:
-                if not MenuCRUD.get_by_name(session, item["name"]):
-                    print(f"Creando menú por defecto: {item['name']}")
-                    menu = MenuCRUD.create_menu(session, item["name"], item["price"])
-                    
-                    # Crear Receta
-                    for ing_name, qty in item["recipe"]:
-                        # Buscar ingrediente
-                        ingredient = IngredientCRUD.get_by_name(session, ing_name)
-                        
-                        # --- CORRECCIÓN AQUÍ ---
-                        # Si el ingrediente no existe, lo creamos al vuelo.
-                        if not ingredient:
-                            ingredient = IngredientCRUD.create(session, ing_name, defaults_unid.get(ing_name, "unid"), 0.0)
-                            # Flush es vital aquí: guarda el ingrediente en la transacción actual
-                            # para que 'get_by_name' lo encuentre en la siguiente iteración del bucle
-                            # (ej. si dos menús usan Tomate)
-                            session.flush()
-                        # -----------------------
-
-                        MenuCRUD.add_recipe_item(session, menu, ingredient, qty)
-            
-            session.commit()
-            print("Inicialización de menús completada correctamente.")
+            with self._db._engine.begin() as connection:
+                created = seed_default_menus(connection)
+            print(f"Inicialización de menús completada correctamente ({created} creados).")
         except SQLAlchemyError as e:
             print(f"Error inicializando menús: {e}")
-            session.rollback()
-        finally:
-            session.close()
\ No newline at end of file
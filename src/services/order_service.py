@@ -1,18 +1,26 @@
 from functools import reduce
 from sqlalchemy.exc import SQLAlchemyError
-from src.config.database import db
+from src.config.database import locations
+from src.utils.telemetry import instrument_service
 from src.crud.order_crud import OrderCRUD
 from src.crud.menu_crud import MenuCRUD
 from src.crud.ingredient_crud import IngredientCRUD
-from src.services.menu_service import MenuService
+from src.utils.bom import bom_cache
+from src.utils.offline_queue import is_unavailable
 from src.utils.receipt import Receipt
 
+@instrument_service
 class OrderService:
     """
     Gestiona el proceso de compra completo.
     Utiliza REDUCE para calcular totales (Requisito EV3).
     """
 
+    def __init__(self, location: str = None):
+        # Local (shard) sobre el que opera; None = el de esta terminal (POS_LOCATION)
+        self.location = location or locations.current
+        self._db = locations.get(self.location)
+
     def process_order(self, client_id: int, cart_items: list) -> tuple[bool, str, str]:
         """
         Procesa el carrito, descuenta stock y genera el pedido en UNA transacción atómica.
@@ -25,7 +33,19 @@ class OrderService:
         if not client_id:
             return False, "Debe seleccionar un cliente.", ""
 
-        session_gen = db.get_session()
+        if any(item['quantity'] <= 0 for item in cart_items):
+            return False, "La cantidad debe ser mayor que cero.", ""
+
+        # Sin conexión (POS_OFFLINE=1) la venta va a la cola local hasta que vuelva la BD
+        offline = self._db.offline
+        if offline is not None and offline.active:
+            return offline.enqueue(client_id, cart_items)
+
+        # Con el diario de pedidos (POS_ORDER_JOURNAL=1) la venta se confirma al quedar en disco
+        if self._db.journal is not None:
+            return self._db.journal.submit(client_id, cart_items)
+
+        session_gen = self._db.get_session()
         session = next(session_gen)
 
         try:
@@ -36,27 +56,43 @@ class OrderService:
             new_order = OrderCRUD.create_order(session, client_id, total_order)
             session.flush() # Para obtener el ID del pedido antes de commit
 
-            # 3. Procesar cada item del carrito
+            # 3. Menús e ingredientes del carrito en dos consultas (no una por línea). Las recetas
+            #    salen aplanadas (sub-recetas expandidas) de la caché por versión de receta
+            menus = MenuCRUD.get_rows_by_names(session, [item['menu_name'] for item in cart_items])
+            missing = [item['menu_name'] for item in cart_items if item['menu_name'] not in menus]
+            if missing:
+                raise ValueError(f"Menú '{missing[0]}' no encontrado en BD.")
+            boms = {menu.id: bom_cache.get(session, menu.id, menu.recipe_version) for menu in menus.values()}
+            stock = IngredientCRUD.get_stock_rows(session, {ingredient_id for bom in boms.values() for ingredient_id in bom})
+            remaining = {ingredient_id: row.quantity for ingredient_id, row in stock.items()}
+
+            details, sold = [], {}
             for item in cart_items:
-                menu_obj, ingredients = MenuService().get_menu(item['menu_name'])
-                if not menu_obj:
-                    raise ValueError(f"Menú '{item['menu_name']}' no encontrado en BD.")
-                print(ingredients)
-                for ingr in ingredients:
-                  ingr = session.merge(ingr)
-                  ingr_stock = ingr.ingredient
-                  print(ingr_stock)
-                  print(ingr.required_quantity)
-                  required_total = ingr.required_quantity * item['quantity']
-
-                  if ingr_stock.quantity < required_total:
-                    raise ValueError(f"Stock insuficiente de '{ingr_stock.name}' para preparar {item['menu_name']}.")
-
-                  IngredientCRUD.update_quantity(session, ingr_stock, -required_total)
-
-                # 5. Agregar detalle al pedido
-                subtotal = item['price'] * item['quantity']
-                OrderCRUD.add_detail(session, new_order.id, menu_obj.id, item['quantity'], subtotal)
+                menu_obj = menus[item['menu_name']]
+
+                for ingredient_id, required_quantity in boms[menu_obj.id].items():
+                  # 4. Validar contra el stock restante (compartido entre ítems del carrito)
+                  required_total = required_quantity * item['quantity']
+
+                  if remaining[ingredient_id] < required_total:
+                    raise ValueError(f"Stock insuficiente de '{stock[ingredient_id].name}' para preparar {item['menu_name']}.")
+
+                  remaining[ingredient_id] -= required_total
+                  sold[ingredient_id] = sold.get(ingredient_id, 0.0) + required_total
+
+                # 5. Detalle del pedido (se inserta todo junto al final)
+                details.append({
+                    "order_id": new_order.id, "menu_item_id": menu_obj.id, "quantity": item['quantity'],
+                    "subtotal": item['price'] * item['quantity'], "menu_name": menu_obj.name,
+                    "unit_price": item['price'],
+                })
+
+            OrderCRUD.add_details(session, details)
+            # 6. Salida de stock: un movimiento 'venta' por ingrediente (solo se agregan filas)
+            IngredientCRUD.add_movements(session, [
+                {"ingredient_id": ingredient_id, "kind": "venta", "quantity": -amount, "order_id": new_order.id}
+                for ingredient_id, amount in sold.items()
+            ])
 
             session.commit()
             return True, f"Pedido registrado con éxito. Total: ${total_order:,.0f}", "boleta_generada.pdf"
@@ -66,59 +102,92 @@ class OrderService:
             return False, str(ve), ""
         except SQLAlchemyError as e:
             session.rollback()
+            if offline is not None and is_unavailable(e):
+                offline.go_offline(e)
+                return offline.enqueue(client_id, cart_items)
             return False, f"Error crítico en BD: {e}", ""
         finally:
             session.close()
 
     def validate_stock(self, menu_name, menu_quantity, ingredients):
-      session_gen = db.get_session()
+      """
+      Verifica contra el stock actual si alcanzan los ingredientes para 'menu_quantity' unidades.
+      ingredients: receta aplanada del menú ([RecipeLine] de MenuService.get_menu).
+      Retorna (ok, mensaje, menús que usan el ingrediente faltante).
+      """
+      session_gen = self._db.get_session()
       session = next(session_gen)
+      offline = self._db.offline
+      ingredient_ids = [line.ingredient_id for line in ingredients]
 
-      for ingr in ingredients:
-        ingr = session.merge(ingr)
-        ingr_stock = ingr.ingredient
-        required_total = ingr.required_quantity * menu_quantity
+      try:
+        try:
+          if offline is not None and offline.active:
+            # Sin conexión: stock local (la copia menos lo vendido en la cola)
+            stock, menus_using = offline.store.quantities(ingredient_ids), offline.store.menu_names_using
+          else:
+            stock = IngredientCRUD.get_quantities(session, ingredient_ids)
+            if self._db.journal is not None:
+              # Lo vendido que el diario aún no aplicó ya no está disponible
+              stock = self._db.journal.available(stock)
+            menus_using = lambda ingredient_id: MenuCRUD.get_menu_names_using(session, ingredient_id)
+        except SQLAlchemyError as e:
+          if offline is None or not is_unavailable(e):
+            raise
+          offline.go_offline(e)
+          stock, menus_using = offline.store.quantities(ingredient_ids), offline.store.menu_names_using
+
+        for line in ingredients:
+          required_total = line.required_quantity * menu_quantity
+
+          if stock.get(line.ingredient_id, 0.0) < required_total:
+            related_menus = menus_using(line.ingredient_id)
+            return False, (f"Stock insuficiente de '{line.ingredient_name}' para preparar {menu_name}."), related_menus
 
-        if ingr_stock.quantity < required_total:
-          related_menus = [ link.menu_item.name for link in ingr_stock.recipe_links ]
-          print(related_menus)
-          return False, (f"Stock insuficiente de '{ingr_stock.name}' para preparar {menu_name}."), related_menus
+        return True, 'Ingredientes actualizados correctamente.', []
+      finally:
+        session.close()
 
-      return True, 'Ingredientes actualizados correctamente.', []
+    def count_orders(self, client_id: int = None) -> int:
+        """Total de pedidos (de un cliente o de todos) para dimensionar la tabla virtual."""
+        session_gen = self._db.get_session()
+        session = next(session_gen)
+        try:
+            return OrderCRUD.count(session, client_id if client_id and client_id > 0 else None)
+        finally:
+            session.close()
 
-    def get_formatted_orders(self, client_id: int = None) -> list:
+    def get_formatted_orders(self, client_id: int = None, offset: int = 0, limit: int = None) -> list:
         """
         Recupera pedidos y los formatea para mostrar en la tabla.
         Aplica lógica de negocio: Generar descripción resumen y conteo de ítems.
+        offset/limit: página a recuperar (None = todos).
         """
-        session_gen = db.get_session()
+        session_gen = self._db.get_session()
         session = next(session_gen)
         formatted_list = []
 
         try:
-            # Filtrar por cliente si se especifica ID, si no traer todos
-            if client_id and client_id > 0:
-                orders = OrderCRUD.get_orders_by_client(session, client_id)
-            else:
-                orders = OrderCRUD.get_all(session)
+            # Filtrar por cliente si se especifica ID, si no traer todos (proyección, sin entidades ORM)
+            orders = OrderCRUD.get_history_rows(session, client_id if client_id and client_id > 0 else None, offset, limit)
 
             for order in orders:
                 # Validar integridad básica (requisito pauta)
-                if not order.client or not order.date:
+                if not order.date:
                     continue # Saltamos registros corruptos si los hubiera
 
                 # Generar Descripción: "2x Menu A, 1x Menu B..."
                 # Usamos MAP para crear la lista de strings y JOIN para unirla
-                desc_items = map(lambda d: f"{d.quantity}x {d.menu_item.name}", order.details)
+                desc_items = map(lambda line: f"{line[0]}x {line[1]}", order.lines)
                 description = ", ".join(desc_items)
                 
                 # Calcular cantidad total de menús
-                total_items = sum(d.quantity for d in order.details)
+                total_items = sum(quantity for quantity, _ in order.lines)
 
                 formatted_list.append({
                     "id": order.id,
                     "date": order.date.strftime("%d/%m/%Y %H:%M"),
-                    "client": order.client.name,
+                    "client": order.client_name,
                     "description": description,
                     "item_count": total_items,
                     "total": f"${order.total:,.0f}"
@@ -130,7 +199,7 @@ class OrderService:
 
     def delete_order(self, order_id: int) -> tuple[bool, str]:
         """Elimina un pedido por su ID."""
-        session_gen = db.get_session()
+        session_gen = self._db.get_session()
         session = next(session_gen)
         try:
             order = OrderCRUD.get_by_id(session, order_id)
@@ -150,16 +219,23 @@ class OrderService:
         """
         Busca un pedido histórico por ID y genera su documento PDF.
         """
-        session_gen = db.get_session()
+        return self.generate_receipt(order_id, backend="pdf")
+
+    def generate_receipt(self, order_id: int, backend: str = None, output_path: str = None) -> tuple[bool, str]:
+        """
+        Genera la boleta de un pedido con el backend de la terminal (PDF, texto o ESC/POS).
+        Si no se indica backend se usa RECEIPT_BACKEND de la configuración.
+        """
+        session_gen = self._db.get_session()
         session = next(session_gen)
         try:
             order = OrderCRUD.get_by_id(session, order_id)
             if not order:
                 return False, "El pedido solicitado no existe."
             
-            # Generar PDF usando el objeto recuperado de la BD
+            # Generar la boleta usando el objeto recuperado de la BD
             receipt_gen = Receipt(order)
-            success, result = receipt_gen.generate_pdf()
+            success, result = receipt_gen.generate(backend, output_path)
             
             return success, result
         except Exception as e:
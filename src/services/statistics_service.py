@@ -1,13 +1,24 @@
-import pandas as pd
 from sqlalchemy import text
-from src.config.database import db
+from src.config.consts import MAX_RECIPE_DEPTH
+from src.config.database import locations
+from src.utils.telemetry import instrument_service
 
+# pandas se importa dentro de cada método: solo se paga su carga al abrir los gráficos
+
+@instrument_service
 class StatisticsService:
-    def __init__(self):
-        self.engine = db._engine # Acceso al motor para pandas
+    def __init__(self, location: str = None):
+        # Local (shard) sobre el que opera; None = el de esta terminal (POS_LOCATION)
+        self.location = location or locations.current
+        self._db = locations.get(self.location)
+
+    @property
+    def engine(self):
+        return self._db._engine # Acceso al motor para pandas (el vigente, aunque db se reconfigure)
 
     def get_sales_data(self):
         """Obtiene datos de ventas (Fecha y Total)."""
+        import pandas as pd
         query = "SELECT date, total FROM orders"
         try:
             df = pd.read_sql(query, self.engine)
@@ -22,11 +33,12 @@ class StatisticsService:
 
     def get_popular_menus_data(self):
         """Obtiene cantidad vendida por menú."""
+        import pandas as pd
+        # Se agrupa por el nombre guardado en la línea (no requiere JOIN con menu_items)
         query = """
-        SELECT m.name, SUM(d.quantity) as total_qty
+        SELECT d.menu_name AS name, SUM(d.quantity) as total_qty
         FROM order_details d
-        JOIN menu_items m ON d.menu_item_id = m.id
-        GROUP BY m.name
+        GROUP BY d.menu_name
         ORDER BY total_qty DESC
         """
         try:
@@ -40,13 +52,24 @@ class StatisticsService:
     def get_ingredient_usage_data(self):
         """
         Calcula el uso de ingredientes basado en ventas y recetas.
-        JOIN complejo: DetallePedido -> Menu -> Receta -> Ingrediente
+        CTE recursiva: unidades vendidas por menú -> Receta -> (sub-recetas) -> Ingrediente
         """
-        query = """
-        SELECT i.name, SUM(d.quantity * r.required_quantity) as total_used, i.unit
-        FROM order_details d
-        JOIN recipes r ON d.menu_item_id = r.menu_item_id
-        JOIN ingredients i ON r.ingredient_id = i.id
+        import pandas as pd
+        query = f"""
+        WITH RECURSIVE sold(menu_item_id, quantity) AS (
+            SELECT menu_item_id, SUM(quantity) FROM order_details GROUP BY menu_item_id
+        ),
+        bom(ingredient_id, component_menu_id, quantity, depth) AS (
+            SELECT r.ingredient_id, r.component_menu_id, s.quantity * r.required_quantity, 1
+            FROM sold s JOIN recipes r ON r.menu_item_id = s.menu_item_id
+            UNION ALL
+            SELECT r.ingredient_id, r.component_menu_id, b.quantity * r.required_quantity, b.depth + 1
+            FROM bom b JOIN recipes r ON r.menu_item_id = b.component_menu_id
+            WHERE b.depth <= {MAX_RECIPE_DEPTH}
+        )
+        SELECT i.name, SUM(b.quantity) as total_used, i.unit
+        FROM bom b
+        JOIN ingredients i ON b.ingredient_id = i.id
         GROUP BY i.name
         ORDER BY total_used DESC
         """
@@ -56,4 +79,41 @@ class StatisticsService:
                 return False, "No hay datos de consumo de ingredientes."
             return True, df
         except Exception as e:
-            return False, str(e)
\ No newline at end of file
+            return False, str(e)
+    # --- Todos los locales (un shard SQLite por local) ---
+    def _fan_out(self, method: str) -> dict:
+        """
+        Ejecuta el mismo método en la BD de cada local, en paralelo (un hilo por shard: SQLite
+        y pandas liberan el GIL mientras leen). Retorna {local: (ok, datos)}.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        names = locations.names()
+        with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="stats") as pool:
+            futures = {name: pool.submit(lambda n=name: getattr(StatisticsService(n), method)()) for name in names}
+        return {name: future.result() for name, future in futures.items()}
+
+    def _merge(self, results: dict, combine):
+        """Une los DataFrame de los locales que tienen datos (columna 'location') y los combina."""
+        import pandas as pd
+        frames = [data.assign(location=name) for name, (success, data) in results.items() if success]
+        if not frames:
+            return False, next(iter(results.values()))[1] if results else "No hay locales registrados."
+        return True, combine(pd.concat(frames, ignore_index=True))
+
+    def get_sales_data_all_locations(self):
+        """Ventas de todos los locales (mismas columnas que get_sales_data, más 'location')."""
+        return self._merge(self._fan_out("get_sales_data"),
+                           lambda df: df.sort_values("date", ignore_index=True))
+
+    def get_popular_menus_data_all_locations(self):
+        """Cantidad vendida por menú sumando todos los locales."""
+        return self._merge(self._fan_out("get_popular_menus_data"),
+                           lambda df: df.groupby("name", as_index=False)["total_qty"].sum()
+                           .sort_values("total_qty", ascending=False, ignore_index=True))
+
+    def get_ingredient_usage_data_all_locations(self):
+        """Uso de ingredientes sumando todos los locales (por nombre y unidad)."""
+        return self._merge(self._fan_out("get_ingredient_usage_data"),
+                           lambda df: df.groupby(["name", "unit"], as_index=False)["total_used"].sum()
+                           .sort_values("total_used", ascending=False, ignore_index=True))
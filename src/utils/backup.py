@@ -0,0 +1,230 @@
+"""
+Respaldo en caliente de las BD SQLite, sin detener la caja.
+
+- online_backup copia con la API de respaldo de SQLite en pasos de BACKUP_STEP_PAGES
+  páginas. Cada paso toma el bloqueo de lectura solo mientras copia esas páginas; entre
+  pasos se cede BACKUP_PAUSE_MS para que los pedidos puedan escribir. Si otra conexión
+  escribe, SQLite reinicia la copia desde el principio: tras max_restarts reinicios se hace
+  una pasada completa (bloqueo breve, pero termina aunque la caja no pare de vender). Si la
+  BD está en modo WAL se copia en una sola pasada: ahí leer no bloquea a los escritores.
+- vacuum_backup usa 'VACUUM INTO' (copia compacta y desfragmentada); mantiene una sola
+  transacción de lectura de principio a fin, así que con el journal por defecto bloquea las
+  escrituras durante toda la copia: conviene fuera de horario.
+- Toda copia se escribe primero a '.part', se verifica (PRAGMA integrity_check) y recién
+  entonces se renombra: un respaldo con su nombre final siempre está completo.
+- restore copia un respaldo verificado sobre la BD viva, guardando antes un respaldo del
+  estado actual.
+- Un respaldo de 'restaurante.db' se llama restaurante_<AAAAMMDD_HHMMSS>[_n][_etiqueta].db;
+  solo esos nombres cuentan como suyos (no los de 'restaurante_norte.db', otro local). La
+  rotación no toca los que llevan etiqueta (copias previas a una restauración).
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import NamedTuple
+
+from src.config.consts import BACKUP_DIR, BACKUP_KEEP, BACKUP_PAUSE_MS, BACKUP_STEP_PAGES
+
+class BackupResult(NamedTuple):
+    path: str
+    method: str         # 'pasos', 'completo' (tras demasiados reinicios), 'wal' o 'vacuum'
+    pages: int
+    steps: int
+    restarts: int
+    seconds: float
+
+class _TooManyRestarts(Exception):
+    pass
+
+def snapshot_path(db_path: str, directory: str = BACKUP_DIR, label: str = "") -> str:
+    """backups/<bd>_<AAAAMMDD_HHMMSS>[_etiqueta].db (ordenables por nombre)."""
+    stem = os.path.splitext(os.path.basename(db_path))[0]
+    suffix = f"_{label}" if label else ""
+    base = os.path.join(directory, f"{stem}_{time.strftime('%Y%m%d_%H%M%S')}")
+    path, n = f"{base}{suffix}.db", 1
+    while os.path.exists(path):   # Dos respaldos en el mismo segundo no se pisan
+        n += 1
+        path = f"{base}_{n}{suffix}.db"
+    return path
+
+def _backup_key(name: str, stem: str):
+    """(fecha, n, etiqueta) si 'name' es un respaldo de la BD 'stem'; si no, None."""
+    match = re.fullmatch(rf"{re.escape(stem)}_(\d{{8}}_\d{{6}})(?:_(\d+))?(?:_([^\d].*))?\.db", name)
+    if match is None:
+        return None
+    return match.group(1), int(match.group(2) or 1), match.group(3) or ""
+
+def list_backups(db_path: str, directory: str = BACKUP_DIR, labeled: bool = True) -> list:
+    """Respaldos de esta BD, del más reciente al más antiguo (labeled=False omite los con etiqueta)."""
+    stem = os.path.splitext(os.path.basename(db_path))[0]
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for name in os.listdir(directory):
+        key = _backup_key(name, stem)
+        if key is not None and (labeled or not key[2]):
+            found.append((key[:2], os.path.join(directory, name)))
+    return [path for _, path in sorted(found, reverse=True)]
+
+def verify(path: str) -> tuple[bool, str]:
+    """(ok, mensaje): integridad de páginas e índices y versión del esquema del respaldo."""
+    try:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            result = connection.execute("PRAGMA integrity_check").fetchone()[0]
+            if result != "ok":
+                return False, f"Respaldo dañado: {result}"
+            version = connection.execute("SELECT MAX(version) FROM schema_version").fetchone()[0]
+        finally:
+            connection.close()
+    except sqlite3.Error as e:
+        return False, f"No se pudo verificar {path}: {e}"
+    return True, f"Respaldo íntegro (esquema v{version})"
+
+def _finish(part_path: str, dest_path: str):
+    ok, msg = verify(part_path)
+    if not ok:
+        os.remove(part_path)
+        raise sqlite3.DatabaseError(msg)
+    os.replace(part_path, dest_path)
+
+def online_backup(db_path: str, dest_path: str, step_pages: int = BACKUP_STEP_PAGES,
+                  pause_ms: float = BACKUP_PAUSE_MS, max_restarts: int = 20) -> BackupResult:
+    """Copia db_path en dest_path por pasos, cediendo entre cada uno (ver docstring del módulo)."""
+    os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+    part_path = dest_path + ".part"
+    if os.path.exists(part_path):
+        os.remove(part_path)
+
+    state = {"steps": 0, "restarts": 0, "remaining": None, "pages": 0}
+
+    def progress(status, remaining, total):
+        state["steps"] += 1
+        state["pages"] = total
+        # Si quedan más páginas que en el paso anterior, otra conexión escribió y SQLite reinició
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > max_restarts:
+                raise _TooManyRestarts()
+        state["remaining"] = remaining
+        if remaining:
+            time.sleep(pause_ms / 1000)
+
+    started = time.perf_counter()
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(part_path)
+    try:
+        if source.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            # En WAL los lectores no bloquean a los escritores: una pasada lee una foto consistente
+            source.backup(target, pages=-1, progress=progress)
+            method = "wal"
+        else:
+            try:
+                source.backup(target, pages=step_pages, progress=progress, sleep=pause_ms / 1000)
+                method = "pasos"
+            except _TooManyRestarts:
+                source.backup(target, pages=-1)
+                method = "completo"
+    finally:
+        target.close()
+        source.close()
+
+    _finish(part_path, dest_path)
+    return BackupResult(dest_path, method, state["pages"], state["steps"], state["restarts"],
+                        time.perf_counter() - started)
+
+def vacuum_backup(db_path: str, dest_path: str) -> BackupResult:
+    """Copia compacta con VACUUM INTO (bloquea escrituras mientras dura, ver docstring del módulo)."""
+    os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+    part_path = dest_path + ".part"
+    if os.path.exists(part_path):
+        os.remove(part_path)
+
+    started = time.perf_counter()
+    source = sqlite3.connect(db_path)
+    try:
+        source.execute("VACUUM INTO ?", (part_path,))
+        pages = source.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        source.close()
+
+    _finish(part_path, dest_path)
+    return BackupResult(dest_path, "vacuum", pages, 1, 0, time.perf_counter() - started)
+
+def rotate(db_path: str, directory: str = BACKUP_DIR, keep: int = BACKUP_KEEP) -> list:
+    """
+    Borra los respaldos periódicos más antiguos de esta BD dejando 'keep'. Retorna los borrados.
+    Los con etiqueta (ej. 'antes_de_restaurar') se conservan hasta borrarlos a mano.
+    """
+    removed = list_backups(db_path, directory, labeled=False)[keep:] if keep > 0 else []
+    for path in removed:
+        os.remove(path)
+    return removed
+
+def restore(snapshot: str, db_path: str, directory: str = BACKUP_DIR) -> str:
+    """
+    Reemplaza el contenido de db_path por el del respaldo (verificado antes). Guarda primero
+    el estado actual como respaldo 'antes_de_restaurar' y retorna su ruta ("" si no había BD).
+    Pensado con la aplicación y el servidor detenidos.
+    """
+    ok, msg = verify(snapshot)
+    if not ok:
+        raise sqlite3.DatabaseError(msg)
+
+    safety = ""
+    if os.path.exists(db_path):
+        safety = online_backup(db_path, snapshot_path(db_path, directory, "antes_de_restaurar")).path
+
+    source = sqlite3.connect(f"file:{snapshot}?mode=ro", uri=True)
+    target = sqlite3.connect(db_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return safety
+
+class BackupScheduler:
+    """Hilo de fondo que respalda, verifica y rota cada 'interval' segundos."""
+
+    def __init__(self, db_path_getter, interval: float, directory: str = BACKUP_DIR, keep: int = BACKUP_KEEP):
+        self._db_path = db_path_getter      # La ruta vigente (DatabaseManager.configure puede cambiarla)
+        self.interval = interval
+        self.directory = directory
+        self.keep = keep
+        self.last_result = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="db-backup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def run_once(self) -> BackupResult:
+        db_path = self._db_path()
+        try:
+            result = online_backup(db_path, snapshot_path(db_path, self.directory))
+            rotate(db_path, self.directory, self.keep)
+        except (sqlite3.Error, OSError) as e:
+            self.last_error = str(e)
+            print(f"[Respaldo] Error: {e}")
+            raise
+        self.last_result, self.last_error = result, None
+        return result
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except (sqlite3.Error, OSError):
+                pass   # Ya informado; se reintenta en el próximo intervalo
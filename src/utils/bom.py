@@ -0,0 +1,84 @@
+"""
+Listas de materiales (BOM) de los menús con sub-recetas.
+
+Una línea de receta puede ser un ingrediente o otro menú (una salsa, una masa, la base de
+panqueques). Para descontar stock o ver disponibilidad hay que expandir el árbol hasta los
+ingredientes; MenuCRUD.flatten_recipe lo hace en una consulta y BomCache memoriza el
+resultado por (menú, recipe_version), así una venta no vuelve a recorrer el árbol.
+
+Editar una receta cambia recipe_version del menú y de todos los que lo usan como
+sub-receta (MenuService): las demás terminales ven la versión nueva en su próxima lectura y
+descartan su copia sin necesidad de avisos entre procesos.
+"""
+import threading
+import time
+
+from src.crud.ingredient_crud import IngredientCRUD
+from src.crud.menu_crud import MenuCRUD
+
+def new_recipe_version() -> int:
+    """Versión para una receta creada o editada: marca de tiempo en µs (no se repite al reutilizar ids)."""
+    return time.time_ns() // 1000
+
+class BomCache:
+    """
+    {archivo de BD: {menu_id: (recipe_version, {ingredient_id: cantidad por unidad})}}.
+
+    Guarda una sola versión por menú (la última pedida): una versión nueva reemplaza a la
+    anterior, así el tamaño queda acotado por la cantidad de menús. Los diccionarios que
+    retorna get() se comparten entre llamadas y no deben modificarse.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, session, menu_id: int, version: int) -> dict:
+        """Lista de materiales aplanada; solo consulta la BD si la versión no está en caché."""
+        # Cada local tiene su BD (y sus propios ids de menú): una caché por archivo
+        entries = self._entries.get(session.get_bind().url.database)
+        entry = entries.get(menu_id) if entries is not None else None
+        if entry is not None and entry[0] == version:
+            self.stats["hits"] += 1
+            return entry[1]
+
+        bom = MenuCRUD.flatten_recipe(session, menu_id)
+        with self._lock:
+            self.stats["misses"] += 1
+            self._entries.setdefault(session.get_bind().url.database, {})[menu_id] = (version, bom)
+        return bom
+
+    def invalidate(self, menu_ids=None):
+        """Descarta las listas de los menús indicados (None = todas), en todos los locales."""
+        with self._lock:
+            if menu_ids is None:
+                self._entries.clear()
+            for entries in self._entries.values():
+                for menu_id in menu_ids or ():
+                    entries.pop(menu_id, None)
+
+    def resolve_availability(self, session, rows: list) -> list:
+        """
+        Completa 'available' de los MenuRow con sub-recetas (None desde SQL, ver
+        MenuCRUD._availability_column) con la lista aplanada y una consulta de stock.
+        """
+        pending = [row for row in rows if row.available is None]
+        if not pending:
+            return rows
+
+        boms = {}
+        for row in pending:
+            try:
+                boms[row.id] = self.get(session, row.id, row.recipe_version)
+            except ValueError:
+                boms[row.id] = {}   # Receta circular: no se puede preparar
+        stock = IngredientCRUD.get_quantities(session, list({ing for bom in boms.values() for ing in bom}))
+        available = {
+            menu_id: bool(bom) and all(stock.get(ing, 0.0) >= qty for ing, qty in bom.items())
+            for menu_id, bom in boms.items()
+        }
+        return [row._replace(available=available[row.id]) if row.available is None else row for row in rows]
+
+# Instancia global: compartida por MenuService y OrderService
+bom_cache = BomCache()
@@ -0,0 +1,85 @@
+def build_chart(chart_type: str, success: bool, data):
+    """
+    Arma la figura del gráfico estadístico (tema oscuro) a partir de los datos del servicio.
+    Retorna (figura, "") o (None, mensaje) si no hay nada que dibujar.
+
+    Se usa matplotlib.figure.Figure y no pyplot: pyplot registra cada figura en su gestor
+    global y, si no se cierra con plt.close(), queda viva para siempre. Una Figure suelta se
+    libera junto con el canvas que la muestra.
+    """
+    from matplotlib.artist import setp  # Importación diferida (igual que en la pestaña)
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(6, 4), dpi=100)
+    ax = fig.subplots()
+    fig.patch.set_facecolor('#2b2b2b')
+    ax.set_facecolor('#2b2b2b')
+    ax.tick_params(axis='x', colors='white')
+    ax.tick_params(axis='y', colors='white')
+    for spine in ax.spines.values():
+        spine.set_color('white')
+    ax.set_title(chart_type, color='white', fontsize=14)
+
+    msg = ""
+
+    # Lógica de Gráficos de Ventas
+    if "Ventas" in chart_type:
+        if success:
+            # Mapeo de lógica de agrupación
+            if chart_type == "Ventas Diarias":
+                grouped = data.groupby(data['date'].dt.date)['total'].sum()
+                xlabel = "Día"
+            elif chart_type == "Ventas Semanales":
+                grouped = data.groupby(data['date'].dt.to_period('W').apply(lambda r: r.start_time))['total'].sum()
+                xlabel = "Semana (Inicio)"
+            elif chart_type == "Ventas Mensuales":
+                grouped = data.groupby(data['date'].dt.to_period('M').astype(str))['total'].sum()
+                xlabel = "Mes"
+            elif chart_type == "Ventas Anuales":
+                grouped = data.groupby(data['date'].dt.to_period('Y').astype(str))['total'].sum()
+                xlabel = "Año"
+
+            if not grouped.empty:
+                # Línea para ventas diarias, barras para el resto ('marker' solo aplica a líneas)
+                kind = 'line' if chart_type == "Ventas Diarias" else 'bar'
+                plot_kwargs = {'kind': kind, 'ax': ax, 'color': '#4CAF50' if kind == 'line' else '#2196F3'}
+                if kind == 'line':
+                    plot_kwargs['marker'] = 'o'
+                grouped.plot(**plot_kwargs)
+
+                ax.set_ylabel("Total ($)", color='white')
+                ax.set_xlabel(xlabel, color='white')
+                ax.grid(True, linestyle='--', alpha=0.3)
+
+                setp(ax.get_xticklabels(), rotation=45, ha="right")
+            else:
+                success = False
+                msg = "No hay datos para el periodo seleccionado."
+
+    # Menús Populares
+    elif chart_type == "Menús Más Vendidos":
+        if success:
+            top_5 = data.head(5)
+            # Pie chart no usa 'kind', usa función directa ax.pie
+            ax.pie(top_5['total_qty'], labels=top_5['name'], autopct='%1.1f%%',
+                   startangle=90, textprops={'color': "white"})
+        else:
+            msg = data
+
+    # Ingredientes
+    elif chart_type == "Uso de Ingredientes":
+        if success:
+            top_10 = data.head(10)
+            y_pos = range(len(top_10))
+            ax.barh(y_pos, top_10['total_used'], color='#FF9800')
+            ax.set_yticks(y_pos)
+            ax.set_yticklabels(top_10['name'])
+            ax.invert_yaxis()
+            ax.set_xlabel("Cantidad (unid/kg)", color='white')
+        else:
+            msg = data
+
+    if not success:
+        return None, msg or "No hay datos disponibles para mostrar."
+    fig.tight_layout()
+    return fig, ""
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+
+from customtkinter import CTkImage
+from PIL import Image
+
+from src.config.consts import BASE_DIR, THUMBNAIL_CACHE_DIR
+
+class ImageCache:
+  """
+  Caché de miniaturas para los botones de menú.
+
+  - En disco: miniaturas ya escaladas, clave = hash SHA-1 del archivo original + tamaño.
+    Solo se genera una vez por imagen (sobrevive a reinicios de la aplicación).
+  - En memoria: LRU de CTkImage ya decodificados. Reconstruir la grilla de botones
+    reutiliza los mismos objetos y no decodifica ningún PNG.
+  """
+
+  def __init__(self, cache_dir=THUMBNAIL_CACHE_DIR, max_items=128):
+    self.cache_dir = cache_dir
+    self.max_items = max_items
+    self._images = OrderedDict()   # (ruta, mtime, bytes, tamaño) -> CTkImage
+    self._hashes = {}              # (ruta, mtime, bytes) -> sha1 del archivo
+    self.stats = {'hits': 0, 'misses': 0, 'thumbnails_created': 0}
+
+  def get(self, source, size=(24, 24)):
+    """Retorna un CTkImage del tamaño pedido, o None si la imagen no existe."""
+    path = source if os.path.isabs(source) else os.path.join(BASE_DIR, source)
+    try:
+      st = os.stat(path)
+    except FileNotFoundError:
+      print('Error: Imagen no encontrada')
+      return None
+
+    size = tuple(size)
+    file_key = (path, st.st_mtime_ns, st.st_size)
+    key = file_key + (size,)
+
+    img = self._images.get(key)
+    if img is not None:
+      self._images.move_to_end(key)
+      self.stats['hits'] += 1
+      return img
+
+    self.stats['misses'] += 1
+    thumb_pil = self._load_thumbnail(path, file_key, size)
+    img = CTkImage(light_image=thumb_pil, dark_image=thumb_pil, size=size)
+
+    self._images[key] = img
+    if len(self._images) > self.max_items:
+      self._images.popitem(last=False)
+    return img
+
+  def clear(self):
+    """Vacía la caché en memoria (las miniaturas en disco se conservan)."""
+    self._images.clear()
+
+  def _load_thumbnail(self, path, file_key, size):
+    digest = self._hashes.get(file_key)
+    if digest is None:
+      with open(path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+      self._hashes[file_key] = digest
+
+    thumb_path = os.path.join(self.cache_dir, f"{digest}_{size[0]}x{size[1]}.png")
+    if not os.path.exists(thumb_path):
+      self._create_thumbnail(path, thumb_path, size)
+
+    thumb = Image.open(thumb_path)
+    thumb.load()  # Decodifica ahora (archivo pequeño) y libera el descriptor
+    return thumb
+
+  def _create_thumbnail(self, path, thumb_path, size):
+    os.makedirs(self.cache_dir, exist_ok=True)
+    with Image.open(path) as original:
+      thumb = original.convert('RGBA').resize(size, Image.LANCZOS)
+
+    # Escritura atómica: otra instancia de la app puede estar generando la misma miniatura
+    fd, tmp_path = tempfile.mkstemp(suffix='.png', dir=self.cache_dir)
+    with os.fdopen(fd, 'wb') as f:
+      thumb.save(f, format='PNG')
+    os.replace(tmp_path, thumb_path)
+    self.stats['thumbnails_created'] += 1
+
+# Instancia compartida por toda la interfaz
+image_cache = ImageCache()
@@ -0,0 +1,218 @@
+import contextvars
+import functools
+import gc
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+from src.config.consts import MEMORY_WATCH, MEMORY_WATCH_CHECK_EVERY, MEMORY_WATCH_FRAMES
+
+# Acción en curso: las anidadas (servicio dentro de un clic) se cuentan en la externa
+_current_action = contextvars.ContextVar("memory_action", default=None)
+
+# Archivos que no interesan al buscar crecimiento (la propia medición)
+_IGNORED = (tracemalloc.__file__, __file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>")
+
+def _live_object_types() -> dict:
+    """
+    Clases cuyas instancias vivas se cuentan, por categoría. Solo se consideran módulos
+    ya importados: contar figuras no debe cargar matplotlib.
+    """
+    types = {}
+    models = sys.modules.get("src.models")
+    database = sys.modules.get("src.config.database")
+    if models is not None and database is not None:
+        types["entidades ORM"] = tuple(mapper.class_ for mapper in database.Base.registry.mappers)
+    orm_session = sys.modules.get("sqlalchemy.orm.session")
+    if orm_session is not None:
+        types["sesiones"] = (orm_session.Session,)
+    figure = sys.modules.get("matplotlib.figure")
+    if figure is not None:
+        types["figuras"] = (figure.Figure,)
+    images = []
+    ctk = sys.modules.get("customtkinter")
+    if ctk is not None:
+        images.append(ctk.CTkImage)
+    pil_image = sys.modules.get("PIL.Image")
+    if pil_image is not None:
+        images.append(pil_image.Image)
+    pil_tk = sys.modules.get("PIL.ImageTk")
+    if pil_tk is not None:
+        images.append(pil_tk.PhotoImage)
+    if images:
+        types["imágenes"] = tuple(images)
+    if ctk is not None:
+        types["widgets"] = (ctk.CTkBaseClass,)
+    return types
+
+def live_objects() -> dict:
+    """Cantidad de objetos vivos por categoría (recorre el heap: usar en chequeos, no por llamada)."""
+    types = _live_object_types()
+    counts = dict.fromkeys(types, 0)
+    for obj in gc.get_objects():
+        for category, classes in types.items():
+            if isinstance(obj, classes):
+                counts[category] += 1
+    return counts
+
+class MemoryWatchdog:
+    """
+    Diagnóstico de fugas de memoria con tracemalloc.
+
+    - track(nombre) mide la memoria retenida por cada acción (clic o llamada a servicio):
+      bytes trazados al salir menos al entrar. Con detailed=True además toma snapshots
+      antes y después y acumula los sitios de asignación que crecieron en esa acción.
+    - Cada check_every acciones (o al llamar check()) compara un snapshot con la línea base
+      y registra los sitios que más crecieron y los objetos vivos por categoría (entidades
+      ORM, sesiones, figuras, imágenes, widgets).
+    - over_budget() indica si el crecimiento desde la línea base supera un presupuesto:
+      lo usa la prueba de resistencia (benchmarks/soak.py) para fallar.
+
+    Desactivado, las llamadas instrumentadas solo evalúan un if y tracemalloc no corre.
+    """
+
+    def __init__(self, enabled: bool = False, frames: int = 1, detailed: bool = False, check_every: int = 200):
+        self.enabled = False
+        self.frames = frames
+        self.detailed = detailed
+        self.check_every = check_every
+        self.history = []               # (segundos desde la línea base, bytes trazados, objetos vivos)
+        self._actions = {}
+        self._sites = {}                # acción -> Counter(sitio -> bytes)
+        self._lock = threading.Lock()
+        self._count = 0
+        self._baseline = None
+        self._baseline_objects = {}
+        self._started = 0.0
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self.enabled = True
+        self.reset_baseline()
+
+    def disable(self):
+        self.enabled = False
+        tracemalloc.stop()
+        self._baseline = None
+
+    def reset_baseline(self):
+        """Toma la línea base (ej. después del calentamiento de la prueba de resistencia)."""
+        gc.collect()
+        self._baseline = self._snapshot()
+        self._baseline_objects = live_objects()
+        self._started = time.perf_counter()
+        self.history = [(0.0, tracemalloc.get_traced_memory()[0], self._baseline_objects)]
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, pattern) for pattern in _IGNORED]
+        )
+
+    # --- Acciones ---
+    @contextmanager
+    def track(self, name: str):
+        if not self.enabled or _current_action.get() is not None:
+            yield
+            return
+        token = _current_action.set(name)
+        before_snapshot = self._snapshot() if self.detailed else None
+        before = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            _current_action.reset(token)
+            retained = tracemalloc.get_traced_memory()[0] - before
+            growth = None
+            if before_snapshot is not None:
+                growth = [stat for stat in self._snapshot().compare_to(before_snapshot, "lineno") if stat.size_diff > 0]
+            self._record(name, retained, growth)
+
+    def wrap(self, name: str, fn):
+        """Envuelve un comando de la interfaz; desactivado retorna el mismo comando."""
+        if not self.enabled or fn is None:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self.track(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def _record(self, name, retained, growth):
+        with self._lock:
+            stats = self._actions.setdefault(name, {"calls": 0, "retained": 0, "max_retained": 0})
+            stats["calls"] += 1
+            stats["retained"] += retained
+            stats["max_retained"] = max(stats["max_retained"], retained)
+            if growth:
+                sites = self._sites.setdefault(name, Counter())
+                for stat in growth[:10]:
+                    sites[str(stat.traceback[0])] += stat.size_diff
+            self._count += 1
+            due = self.check_every and self._count % self.check_every == 0
+        if due:
+            self.check()
+
+    # --- Chequeos ---
+    def growth(self) -> int:
+        """Bytes trazados ahora menos en la línea base."""
+        return tracemalloc.get_traced_memory()[0] - self.history[0][1] if self.history else 0
+
+    def top_growth(self, limit: int = 10) -> list:
+        """Sitios de asignación que más crecieron desde la línea base: [(sitio, bytes, bloques)]."""
+        if self._baseline is None:
+            return []
+        stats = self._snapshot().compare_to(self._baseline, "lineno")
+        return [(str(stat.traceback[0]), stat.size_diff, stat.count_diff) for stat in stats if stat.size_diff > 0][:limit]
+
+    def object_growth(self) -> dict:
+        current = live_objects()
+        return {category: current[category] - self._baseline_objects.get(category, 0) for category in current}
+
+    def check(self) -> dict:
+        if not self.enabled:
+            return {}
+        gc.collect()
+        objects = live_objects()
+        self.history.append((time.perf_counter() - self._started, tracemalloc.get_traced_memory()[0], objects))
+        return objects
+
+    def over_budget(self, budget_bytes: int, object_budget: dict = None) -> list:
+        """Motivos por los que se superó el presupuesto (lista vacía = dentro del presupuesto)."""
+        gc.collect()
+        reasons = []
+        if self.growth() > budget_bytes:
+            reasons.append(f"memoria trazada +{self.growth() / 1024:.0f} KiB (presupuesto {budget_bytes / 1024:.0f} KiB)")
+        for category, delta in self.object_growth().items():
+            limit = (object_budget or {}).get(category)
+            if limit is not None and delta > limit:
+                reasons.append(f"{category}: +{delta} vivos (presupuesto {limit})")
+        return reasons
+
+    def report(self, top: int = 10) -> str:
+        lines = [f"--- Memoria (tracemalloc) --- crecimiento desde la línea base: {self.growth() / 1024:+.0f} KiB"]
+        with self._lock:
+            actions = sorted(self._actions.items(), key=lambda item: item[1]["retained"], reverse=True)
+            sites = {name: counter.most_common(3) for name, counter in self._sites.items()}
+        lines.append(f"{'Acción':<44} {'llamadas':>8} {'retenido KiB':>13} {'máx KiB':>9}")
+        for name, stats in actions[:top]:
+            lines.append(f"{name[:44]:<44} {stats['calls']:>8} {stats['retained'] / 1024:>13.1f} {stats['max_retained'] / 1024:>9.1f}")
+            for site, size in sites.get(name, []):
+                lines.append(f"    {size / 1024:>8.1f} KiB  {site}")
+        lines.append("Objetos vivos (variación desde la línea base):")
+        for category, delta in self.object_growth().items():
+            lines.append(f"  {category:<16} {delta:+d}")
+        lines.append("Sitios que más crecieron:")
+        for site, size, count in self.top_growth(top):
+            lines.append(f"  {size / 1024:>8.1f} KiB {count:>+7d} bloques  {site}")
+        return "\n".join(lines)
+
+# Instancia global (POS_MEMORY_WATCH=1, o =detail para snapshots por acción)
+memory_watchdog = MemoryWatchdog(enabled=bool(MEMORY_WATCH), frames=MEMORY_WATCH_FRAMES,
+                                 detailed=MEMORY_WATCH == "detail", check_every=MEMORY_WATCH_CHECK_EVERY)
@@ -0,0 +1,412 @@
+"""
+Modo sin conexión (store-and-forward) de una terminal: si la BD compartida no responde
+(bloqueada más allá del tiempo de espera de SQLite o inaccesible), la caja sigue vendiendo.
+
+- Copia local: la terminal guarda en su propio archivo SQLite (OFFLINE_DIR, disco local) la
+  carta con la lista de materiales aplanada de cada menú y el stock. Se refresca cada
+  OFFLINE_REFRESH_SECONDS mientras hay conexión y no quedan ventas por sincronizar.
+- Cola: sin conexión, cada venta se valida contra el stock local, se lo descuenta y queda en
+  la cola del mismo archivo (una transacción local por venta). Desde el primer error, las
+  ventas, la carta y la validación del carrito van directo a la copia local sin esperar a la BD.
+- Sincronización: un hilo reintenta cada OFFLINE_RETRY_SECONDS y pasa la cola a la BD en
+  lotes de OFFLINE_SYNC_BATCH pedidos por transacción, con la fecha de la venta. Cada pedido
+  lleva un id (orders.offline_id) que hace idempotente el reintento de un lote ya grabado.
+- Conflictos: otras cajas pudieron vender el mismo stock. Con OFFLINE_OVERSELL='registrar' la
+  venta se graba igual (el stock queda negativo) y la fila queda como 'conflicto'; con
+  'rechazar' no se graba y queda como 'rechazado'. Un menú que ya no existe también se rechaza.
+  Las filas en conflicto o rechazadas quedan en la cola local para revisión (conflicts()).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+
+from src.config.consts import OFFLINE_OVERSELL, OFFLINE_REFRESH_SECONDS, OFFLINE_RETRY_SECONDS, OFFLINE_SYNC_BATCH
+from src.crud.ingredient_crud import IngredientCRUD
+from src.crud.menu_crud import MenuCRUD
+from src.crud.order_crud import OrderCRUD
+from src.read_models import MenuRow, RecipeLine
+from src.utils.bom import bom_cache
+
+# Errores de SQLite que indican que la BD no está disponible (no un problema del pedido)
+UNAVAILABLE_ERRORS = ("database is locked", "database table is locked", "unable to open database", "disk i/o error")
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS menus (
+        id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, price REAL NOT NULL, description TEXT,
+        image_path TEXT, recipe_version INTEGER NOT NULL, bom TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS ingredients (id INTEGER PRIMARY KEY, name TEXT NOT NULL, unit TEXT, quantity REAL NOT NULL);
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    CREATE TABLE IF NOT EXISTS queue (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, offline_id TEXT NOT NULL UNIQUE, created_at TEXT NOT NULL,
+        client_id INTEGER NOT NULL, total REAL NOT NULL, lines TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pendiente', message TEXT, order_id INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS ix_queue_status ON queue (status, id);
+"""
+
+def is_unavailable(error: Exception) -> bool:
+    """True si el error es de BD bloqueada o inaccesible (la venta puede ir a la cola local)."""
+    return isinstance(error, OperationalError) and any(text in str(error).lower() for text in UNAVAILABLE_ERRORS)
+
+class QueuedOrder(NamedTuple):
+    id: int
+    offline_id: str
+    created_at: datetime
+    client_id: int
+    total: float
+    lines: list  # [{'menu_name', 'quantity', 'price'}]
+
+class OfflineStore:
+    """Archivo SQLite local de la terminal: copia de la carta y del stock, y cola de ventas."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Una sola conexión compartida entre hilos, serializada con el candado
+        self.lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA synchronous = FULL")
+        with self.lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self._conn.close()
+
+    # --- Copia de la carta y el stock ---
+    def refreshed_at(self):
+        with self.lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'refreshed_at'").fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def save_catalog(self, menus: list, ingredients: list) -> bool:
+        """
+        Reemplaza la copia local con [(MenuRow, lista de materiales)] e [IngredientRow].
+        No hace nada si hay ventas sin sincronizar: su descuento solo está en el stock local.
+        """
+        with self.lock, self._conn:
+            if self._pending_count():
+                return False
+            self._conn.execute("DELETE FROM menus")
+            self._conn.execute("DELETE FROM ingredients")
+            self._conn.executemany("INSERT INTO menus VALUES (?, ?, ?, ?, ?, ?, ?)", [
+                (menu.id, menu.name, menu.price, menu.description, menu.image_path, menu.recipe_version, json.dumps(bom))
+                for menu, bom in menus
+            ])
+            self._conn.executemany("INSERT INTO ingredients VALUES (?, ?, ?, ?)", ingredients)
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('refreshed_at', ?)", (datetime.now().isoformat(),))
+        return True
+
+    def _load_menus(self, where: str = "", params: tuple = ()) -> list:
+        rows = self._conn.execute(
+            f"SELECT id, name, price, description, image_path, recipe_version, bom FROM menus {where} ORDER BY id", params
+        ).fetchall()
+        return [(row[:6], {int(key): quantity for key, quantity in json.loads(row[6]).items()}) for row in rows]
+
+    def _stock(self) -> dict:
+        return {row[0]: row for row in self._conn.execute("SELECT id, name, unit, quantity FROM ingredients")}
+
+    @staticmethod
+    def _menu_row(fields: tuple, bom: dict, stock: dict) -> MenuRow:
+        available = bool(bom) and all(
+            ingredient_id in stock and stock[ingredient_id][3] >= quantity for ingredient_id, quantity in bom.items()
+        )
+        return MenuRow(*fields[:5], available, fields[5])
+
+    def menu_rows(self) -> list:
+        """[MenuRow] de la copia local con la disponibilidad según el stock local."""
+        with self.lock:
+            menus, stock = self._load_menus(), self._stock()
+        return [self._menu_row(fields, bom, stock) for fields, bom in menus]
+
+    def get_menu(self, name: str) -> tuple:
+        """(MenuRow, [RecipeLine]) de la copia local, o (None, []) si no está."""
+        with self.lock:
+            menus, stock = self._load_menus("WHERE name = ?", (name,)), self._stock()
+        if not menus:
+            return None, []
+        fields, bom = menus[0]
+        lines = [RecipeLine(ingredient_id, stock[ingredient_id][1], quantity, stock[ingredient_id][3])
+                 for ingredient_id, quantity in bom.items() if ingredient_id in stock]
+        return self._menu_row(fields, bom, stock), lines
+
+    def quantities(self, ingredient_ids: list) -> dict:
+        with self.lock:
+            stock = self._stock()
+        return {ingredient_id: stock[ingredient_id][3] for ingredient_id in ingredient_ids if ingredient_id in stock}
+
+    def menu_names_using(self, ingredient_id: int) -> list:
+        with self.lock:
+            menus = self._load_menus()
+        return [fields[1] for fields, bom in menus if ingredient_id in bom]
+
+    # --- Cola de ventas ---
+    def enqueue(self, client_id: int, cart_items: list) -> tuple[bool, str]:
+        """Valida la venta contra el stock local, lo descuenta y la deja en la cola (una transacción)."""
+        total = sum(item['price'] * item['quantity'] for item in cart_items)
+        with self.lock, self._conn:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = 'refreshed_at'").fetchone() is None:
+                return False, "La BD no está disponible y esta terminal no tiene copia local de la carta."
+            names = list({item['menu_name'] for item in cart_items})
+            menus = {fields[1]: bom for fields, bom in self._load_menus(f"WHERE name IN ({', '.join('?' * len(names))})", tuple(names))}
+            stock = self._stock()
+
+            deductions = {}
+            for item in cart_items:
+                if item['menu_name'] not in menus:
+                    return False, f"Menú '{item['menu_name']}' no está en la copia local de la carta."
+                for ingredient_id, required_quantity in menus[item['menu_name']].items():
+                    deductions[ingredient_id] = deductions.get(ingredient_id, 0.0) + required_quantity * item['quantity']
+                    if ingredient_id not in stock or stock[ingredient_id][3] < deductions[ingredient_id]:
+                        name = stock[ingredient_id][1] if ingredient_id in stock else ingredient_id
+                        return False, f"Stock insuficiente de '{name}' para preparar {item['menu_name']}."
+
+            self._conn.executemany("UPDATE ingredients SET quantity = quantity - ? WHERE id = ?",
+                                   [(amount, ingredient_id) for ingredient_id, amount in deductions.items()])
+            self._conn.execute(
+                "INSERT INTO queue (offline_id, created_at, client_id, total, lines) VALUES (?, ?, ?, ?, ?)",
+                (uuid.uuid4().hex, datetime.now().isoformat(), client_id, total, json.dumps(cart_items, ensure_ascii=False))
+            )
+        return True, f"Pedido guardado sin conexión (se sincroniza al volver la BD). Total: ${total:,.0f}"
+
+    def _pending_count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM queue WHERE status = 'pendiente'").fetchone()[0]
+
+    def pending_count(self) -> int:
+        with self.lock:
+            return self._pending_count()
+
+    def pending(self, limit: int) -> list:
+        """Las 'limit' ventas pendientes más antiguas."""
+        with self.lock:
+            rows = self._conn.execute(
+                "SELECT id, offline_id, created_at, client_id, total, lines FROM queue "
+                "WHERE status = 'pendiente' ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [QueuedOrder(row[0], row[1], datetime.fromisoformat(row[2]), row[3], row[4], json.loads(row[5])) for row in rows]
+
+    def resolve(self, results: list):
+        """
+        Marca el resultado de la sincronización: [(id en la cola, estado, mensaje, id del pedido)].
+        Las sincronizadas sin novedad se borran; los conflictos y rechazos quedan para revisión.
+        """
+        with self.lock, self._conn:
+            self._conn.executemany("DELETE FROM queue WHERE id = ?",
+                                   [(queue_id,) for queue_id, status, _, _ in results if status == "sincronizado"])
+            self._conn.executemany("UPDATE queue SET status = ?, message = ?, order_id = ? WHERE id = ?", [
+                (status, message, order_id, queue_id) for queue_id, status, message, order_id in results if status != "sincronizado"
+            ])
+
+    def conflicts(self) -> list:
+        """[(fecha, cliente, total, estado, mensaje, id del pedido)] de las ventas en conflicto o rechazadas."""
+        with self.lock:
+            return self._conn.execute(
+                "SELECT created_at, client_id, total, status, message, order_id FROM queue "
+                "WHERE status <> 'pendiente' ORDER BY id"
+            ).fetchall()
+
+class OfflineQueue:
+    """Modo sin conexión de una BD (un DatabaseManager). Ver docstring del módulo."""
+
+    def __init__(self, db_manager, path: str, retry_seconds: float = OFFLINE_RETRY_SECONDS,
+                 refresh_seconds: float = OFFLINE_REFRESH_SECONDS, sync_batch: int = OFFLINE_SYNC_BATCH,
+                 oversell: str = OFFLINE_OVERSELL):
+        if oversell not in ("registrar", "rechazar"):
+            raise ValueError(f"Política de sobreventa desconocida: {oversell}")
+        self._db = db_manager
+        self.store = OfflineStore(path)
+        self.retry_seconds = retry_seconds
+        self.refresh_seconds = refresh_seconds
+        self.sync_batch = sync_batch
+        self.oversell = oversell
+
+        # active: sin conexión desde 'since'; las lecturas y ventas van a la copia local
+        self.active = False
+        self.since = None
+        self.last_error = None
+        self._last_refresh = 0.0
+        self._sync_lock = threading.Lock()   # Un solo sincronizador a la vez (hilo o llamada directa)
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"queued": 0, "synced": 0, "conflicts": 0, "rejected": 0, "batches": 0, "sync_seconds": 0.0}
+
+    # --- Ciclo de vida ---
+    def start(self):
+        """Refresca la copia local (o pasa a sin conexión si la BD no responde) y arranca el hilo."""
+        if self.store.pending_count():
+            # Quedaron ventas de una ejecución anterior: primero se sincronizan
+            self.active = True
+            self.since = datetime.now()
+        else:
+            self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="offline-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Intenta una última sincronización y cierra el archivo local (lo pendiente queda en él)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.sync()
+        self.store.close()
+
+    def _loop(self):
+        while not self._stop.wait(self.retry_seconds):
+            if self.active or self.store.pending_count():
+                self.sync()
+            elif time.monotonic() - self._last_refresh >= self.refresh_seconds:
+                self.refresh()
+
+    # --- Estado ---
+    def go_offline(self, error: Exception):
+        """Pasa a sin conexión (llamado por los servicios al recibir un error de BD no disponible)."""
+        self.last_error = str(error)
+        if not self.active:
+            self.active, self.since = True, datetime.now()
+            print(f"[Sin conexión] BD no disponible, se vende contra la copia local: {error}")
+
+    def enqueue(self, client_id: int, cart_items: list) -> tuple[bool, str, str]:
+        """Igual que OrderService.process_order, pero contra la copia local."""
+        success, msg = self.store.enqueue(client_id, cart_items)
+        if success:
+            self.stats["queued"] += 1
+            return True, msg, "boleta_generada.pdf"
+        return False, msg, ""
+
+    def refresh(self) -> bool:
+        """Copia la carta (con sus listas de materiales) y el stock de la BD al archivo local."""
+        session_gen = self._db.get_session()
+        session = next(session_gen)
+        try:
+            menus = [(menu, bom_cache.get(session, menu.id, menu.recipe_version)) for menu in MenuCRUD.get_all_rows(session)]
+            ingredients = IngredientCRUD.get_all_rows(session)
+        except SQLAlchemyError as e:
+            if is_unavailable(e):
+                self.go_offline(e)
+            else:
+                self.last_error = str(e)
+            return False
+        except ValueError as e:
+            self.last_error = str(e)   # Receta circular: se conserva la copia anterior
+            return False
+        finally:
+            session.close()
+        self._last_refresh = time.monotonic()
+        return self.store.save_catalog(menus, ingredients)
+
+    # --- Sincronización ---
+    def sync(self) -> int:
+        """
+        Pasa la cola a la BD en lotes hasta vaciarla o hasta que la BD falle. Al vaciarla vuelve
+        a modo en línea y refresca la copia local. Retorna los pedidos procesados.
+        """
+        done = 0
+        with self._sync_lock:
+            started = time.perf_counter()
+            while True:
+                batch = self.store.pending(self.sync_batch)
+                if not batch:
+                    break
+                try:
+                    results = self._sync_batch(batch)
+                except SQLAlchemyError as e:
+                    if is_unavailable(e):
+                        self.go_offline(e)
+                    else:
+                        self.last_error = str(e)
+                        print(f"[Sin conexión] Error al sincronizar pedidos: {e}")
+                    break
+                except ValueError as e:   # Receta circular: se reintenta cuando se corrija
+                    self.last_error = str(e)
+                    print(f"[Sin conexión] Error al sincronizar pedidos: {e}")
+                    break
+                self.store.resolve(results)
+                done += len(batch)
+                self.stats["batches"] += 1
+                for _, status, _, _ in results:
+                    key = {"sincronizado": "synced", "conflicto": "conflicts", "rechazado": "rejected"}[status]
+                    self.stats[key] += 1
+            self.stats["sync_seconds"] += time.perf_counter() - started
+
+            if not self.store.pending_count() and (self.active or done):
+                if self.active:
+                    print(f"[Sin conexión] BD disponible otra vez; {done} pedidos sincronizados")
+                self.active = False
+                self.refresh()
+        return done
+
+    def _sync_batch(self, batch: list) -> list:
+        """Graba un lote en una transacción. Retorna [(id en la cola, estado, mensaje, id del pedido)]."""
+        session_gen = self._db.get_session()
+        session = next(session_gen)
+        try:
+            # Candado de escritura antes de leer el stock: el control de sobreventa vale hasta el commit
+            self._db.begin_write(session)
+            already = OrderCRUD.get_offline_orders(session, [queued.offline_id for queued in batch])
+            menus = MenuCRUD.get_rows_by_names(session, list({line['menu_name'] for queued in batch for line in queued.lines}))
+            boms = {menu.id: bom_cache.get(session, menu.id, menu.recipe_version) for menu in menus.values()}
+            stock = IngredientCRUD.get_stock_rows(session, list({ingredient_id for bom in boms.values() for ingredient_id in bom}))
+            remaining = {ingredient_id: row.quantity for ingredient_id, row in stock.items()}
+
+            results, accepted = [], []
+            for queued in batch:
+                if queued.offline_id in already:   # Grabado por un intento anterior cortado antes de marcarlo
+                    results.append((queued.id, "sincronizado", None, already[queued.offline_id]))
+                    continue
+                missing = [line['menu_name'] for line in queued.lines if line['menu_name'] not in menus]
+                if missing:
+                    results.append((queued.id, "rechazado", f"Menú '{missing[0]}' ya no existe en la BD.", None))
+                    continue
+
+                deductions = {}
+                for line in queued.lines:
+                    for ingredient_id, required_quantity in boms[menus[line['menu_name']].id].items():
+                        deductions[ingredient_id] = deductions.get(ingredient_id, 0.0) + required_quantity * line['quantity']
+                oversold = [stock[ingredient_id].name for ingredient_id, amount in deductions.items() if remaining[ingredient_id] < amount]
+                if oversold and self.oversell == "rechazar":
+                    results.append((queued.id, "rechazado", f"Sin stock al sincronizar: {', '.join(oversold)}.", None))
+                    continue
+                for ingredient_id, amount in deductions.items():
+                    remaining[ingredient_id] -= amount
+
+                order = OrderCRUD.create_order(session, queued.client_id, queued.total, queued.created_at, offline_id=queued.offline_id)
+                accepted.append((queued, order, deductions))
+                message = f"Sobreventa (stock negativo): {', '.join(oversold)}." if oversold else None
+                results.append((queued.id, "conflicto" if oversold else "sincronizado", message, order))
+
+            session.flush()   # Ids de los pedidos del lote (antes del commit, que los expira)
+            results = [(queue_id, status, message, getattr(order, "id", order)) for queue_id, status, message, order in results]
+            OrderCRUD.add_details(session, [
+                {"order_id": order.id, "menu_item_id": menus[line['menu_name']].id, "menu_name": line['menu_name'],
+                 "quantity": line['quantity'], "unit_price": line['price'], "subtotal": line['price'] * line['quantity']}
+                for queued, order, _ in accepted for line in queued.lines
+            ])
+            IngredientCRUD.add_movements(session, [
+                {"ingredient_id": ingredient_id, "kind": "venta", "quantity": -amount, "order_id": order.id, "date": order.date}
+                for _, order, deductions in accepted for ingredient_id, amount in deductions.items()
+            ])
+            session.commit()
+            return results
+        except SQLAlchemyError:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    # --- Consultas ---
+    def backlog(self) -> int:
+        """Ventas tomadas sin conexión que todavía no están en la BD."""
+        return self.store.pending_count()
+
+    def conflicts(self) -> list:
+        return self.store.conflicts()
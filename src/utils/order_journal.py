@@ -0,0 +1,391 @@
+"""
+Diario de pedidos (write-ahead): la venta se confirma al cajero apenas queda escrita y
+sincronizada (fsync) en un archivo de solo anexado; un hilo de fondo la aplica después a
+orders, order_details e ingredient_movements en lotes.
+
+- Formato: una línea por pedido, '<crc32 en hex> <json>'. Al recuperar, una línea cortada o
+  con CRC inválido (caída a mitad de escritura) y lo que sigue se descartan: esos pedidos
+  nunca se confirmaron al cajero.
+- Confirmación en grupo: las ventas que llegan mientras se sincroniza el archivo (o dentro de
+  JOURNAL_GROUP_MS) se escriben y sincronizan juntas con un solo fsync.
+- Stock: la validación lee el stock de la BD y le resta lo vendido que aún no se aplicó
+  (reservas en memoria), así dos ventas seguidas no venden el mismo ingrediente. El commit
+  del aplicador y la liberación de sus reservas son atómicos respecto de esa validación.
+- Idempotencia: cada pedido lleva una secuencia que se guarda en orders.journal_seq, y la
+  última aplicada en journal_state, en la misma transacción que lo aplica; al arrancar se
+  aplican los que falten antes de vender. La marca no sale de MAX(journal_seq): borrar el
+  último pedido la haría retroceder y ese pedido volvería a aplicarse.
+- Compactación: cuando el archivo supera JOURNAL_COMPACT_BYTES se reescribe solo con lo que
+  falta aplicar (archivo temporal + os.replace).
+
+Supone un solo proceso escritor por BD (la caja o el servidor de terminales): con varias
+cajas sobre el mismo archivo se usa --server, que ya serializa las escrituras.
+"""
+import json
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.config.consts import JOURNAL_APPLY_BATCH, JOURNAL_APPLY_MS, JOURNAL_COMPACT_BYTES, JOURNAL_GROUP_MS
+from src.crud.ingredient_crud import IngredientCRUD
+from src.crud.menu_crud import MenuCRUD
+from src.crud.order_crud import OrderCRUD
+from src.utils.bom import bom_cache
+
+def encode(record: dict) -> bytes:
+    payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+def decode(line: bytes):
+    """Registro de una línea del diario, o None si está cortada o dañada."""
+    if not line.endswith(b"\n") or len(line) < 10 or line[8:9] != b" ":
+        return None
+    payload = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+def read_journal(path: str) -> tuple[list, int]:
+    """(registros válidos, bytes hasta el último válido). Se detiene en la primera línea dañada."""
+    records, good_bytes = [], 0
+    if not os.path.exists(path):
+        return records, good_bytes
+    with open(path, "rb") as f:
+        for line in f:
+            record = decode(line)
+            if record is None:
+                break
+            records.append(record)
+            good_bytes += len(line)
+    return records, good_bytes
+
+class OrderJournal:
+    """Diario de pedidos de una BD (un DatabaseManager). Ver docstring del módulo."""
+
+    def __init__(self, db_manager, path: str, group_ms: float = JOURNAL_GROUP_MS, apply_ms: float = JOURNAL_APPLY_MS,
+                 apply_batch: int = JOURNAL_APPLY_BATCH, compact_bytes: int = JOURNAL_COMPACT_BYTES):
+        self._db = db_manager
+        self.path = path
+        self.group_ms = group_ms
+        self.apply_ms = apply_ms
+        self.apply_batch = apply_batch
+        self.compact_bytes = compact_bytes
+
+        # _lock: secuencia, reservas, buffer y pendientes. _file_lock: escritura/compactación del archivo
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._durable = threading.Condition()
+        self._flush_wanted = threading.Event()
+        self._apply_wanted = threading.Event()
+        self._stop = threading.Event()          # Detiene la sincronización
+        self._stop_apply = threading.Event()    # Detiene el aplicador (después de la última sincronización)
+
+        self._buffer = []          # Registros aceptados aún no sincronizados: (seq, línea, registro)
+        self._pending = deque()    # Registros sincronizados y no aplicados: (seq, línea, registro)
+        self._reserved = {}        # {ingredient_id: cantidad vendida y no aplicada}
+        self._failed = {}          # {seq: mensaje} de ventas cuyo fsync falló
+        self._next_seq = 1
+        self._durable_seq = 0
+        self._applied_seq = 0
+        self._file = None
+        self._threads = []
+        self.last_error = None
+        self.stats = {"orders": 0, "fsyncs": 0, "batches": 0, "applied": 0, "recovered": 0, "compactions": 0}
+
+    # --- Ciclo de vida ---
+    def start(self) -> int:
+        """Recupera el diario (aplica lo pendiente) y arranca los hilos. Retorna los pedidos recuperados."""
+        recovered = self._recover()
+        self._file = open(self.path, "ab")
+        self._stop.clear()
+        self._stop_apply.clear()
+        self._threads = [
+            threading.Thread(target=self._flush_loop, name="journal-flush", daemon=True),
+            threading.Thread(target=self._apply_loop, name="journal-apply", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return recovered
+
+    def stop(self, timeout: float = 10.0):
+        """Sincroniza y aplica lo pendiente, detiene los hilos y cierra el archivo."""
+        self._stop.set()
+        self._flush_wanted.set()
+        self._stop_apply.set()
+        self._apply_wanted.set()
+        for thread in self._threads:   # Primero el de sincronización: el aplicador drena después
+            thread.join(timeout)
+        self._threads = []
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _recover(self) -> int:
+        session_gen = self._db.get_session()
+        session = next(session_gen)
+        try:
+            last_applied = OrderCRUD.get_last_journal_seq(session)
+        finally:
+            session.close()
+
+        records, good_bytes = read_journal(self.path)
+        if os.path.exists(self.path) and os.path.getsize(self.path) > good_bytes:
+            # Cola cortada por una caída: esas ventas nunca se confirmaron
+            with open(self.path, "r+b") as f:
+                f.truncate(good_bytes)
+                os.fsync(f.fileno())
+
+        self._applied_seq = self._durable_seq = last_applied
+        self._next_seq = max([last_applied] + [record["seq"] for record in records]) + 1
+        for record in records:
+            if record["seq"] > last_applied:
+                self._pending.append((record["seq"], encode(record), record))
+                self._reserve(record["stock"], 1)
+                self._durable_seq = record["seq"]
+
+        recovered = len(self._pending)
+        while self._pending:
+            if not self._apply_batch():
+                raise RuntimeError(f"No se pudo aplicar el diario {self.path}: {self.last_error}")
+        self.stats["recovered"] += recovered
+        if recovered:
+            print(f"[Diario] {recovered} pedidos recuperados y aplicados desde {self.path}")
+        return recovered
+
+    # --- Ventas ---
+    def submit(self, client_id: int, cart_items: list) -> tuple[bool, str, str]:
+        """Igual que OrderService.process_order, pero retorna cuando la venta está en disco."""
+        if any(item['quantity'] <= 0 for item in cart_items):
+            return False, "La cantidad debe ser mayor que cero.", ""
+        total = sum(item['price'] * item['quantity'] for item in cart_items)
+
+        session_gen = self._db.get_session()
+        session = next(session_gen)
+        try:
+            menus = MenuCRUD.get_rows_by_names(session, [item['menu_name'] for item in cart_items])
+            missing = [item['menu_name'] for item in cart_items if item['menu_name'] not in menus]
+            if missing:
+                return False, f"Menú '{missing[0]}' no encontrado en BD.", ""
+            boms = {menu.id: bom_cache.get(session, menu.id, menu.recipe_version) for menu in menus.values()}
+        except ValueError as ve:
+            return False, str(ve), ""
+        except SQLAlchemyError as e:
+            return False, f"Error crítico en BD: {e}", ""
+        finally:
+            session.close()
+
+        deductions, lines = {}, []
+        for item in cart_items:
+            menu = menus[item['menu_name']]
+            for ingredient_id, required_quantity in boms[menu.id].items():
+                deductions[ingredient_id] = deductions.get(ingredient_id, 0.0) + required_quantity * item['quantity']
+            lines.append({
+                "menu_item_id": menu.id, "menu_name": menu.name, "quantity": item['quantity'],
+                "unit_price": item['price'], "subtotal": item['price'] * item['quantity'],
+            })
+
+        with self._lock:
+            if self._stop.is_set():
+                return False, "El diario de pedidos se está cerrando; reintente la venta.", ""
+            # Stock de la BD menos lo vendido y no aplicado; la lectura y la reserva van juntas
+            session_gen = self._db.get_session()
+            session = next(session_gen)
+            try:
+                stock = IngredientCRUD.get_stock_rows(session, list(deductions))
+                for ingredient_id, amount in deductions.items():
+                    ingredient = stock.get(ingredient_id)
+                    if ingredient is None or ingredient.quantity - self._reserved.get(ingredient_id, 0.0) < amount:
+                        name = ingredient.name if ingredient is not None else ingredient_id
+                        menu_name = next(line["menu_name"] for line in lines if ingredient_id in boms[line["menu_item_id"]])
+                        return False, f"Stock insuficiente de '{name}' para preparar {menu_name}.", ""
+            except SQLAlchemyError as e:
+                return False, f"Error crítico en BD: {e}", ""
+            finally:
+                session.close()
+
+            seq = self._next_seq
+            self._next_seq += 1
+            record = {
+                "seq": seq, "date": datetime.now().isoformat(), "client_id": client_id, "total": total,
+                "lines": lines, "stock": {str(ingredient_id): amount for ingredient_id, amount in deductions.items()},
+            }
+            self._reserve(record["stock"], 1)
+            self._buffer.append((seq, encode(record), record))
+            self._flush_wanted.set()
+
+        with self._durable:
+            self._durable.wait_for(lambda: self._durable_seq >= seq or seq in self._failed)
+            error = self._failed.pop(seq, None)
+            if not error:
+                self.stats["orders"] += 1
+        if error:
+            return False, f"Error crítico en el diario de pedidos: {error}", ""
+        return True, f"Pedido registrado con éxito. Total: ${total:,.0f}", "boleta_generada.pdf"
+
+    def available(self, stock: dict) -> dict:
+        """{id: cantidad} de la BD descontando lo vendido que el aplicador aún no pasó."""
+        with self._lock:
+            return {ingredient_id: quantity - self._reserved.get(ingredient_id, 0.0) for ingredient_id, quantity in stock.items()}
+
+    def _reserve(self, amounts: dict, sign: int):
+        for key, amount in amounts.items():
+            ingredient_id = int(key)
+            value = self._reserved.get(ingredient_id, 0.0) + sign * amount
+            if abs(value) < 1e-9:
+                self._reserved.pop(ingredient_id, None)
+            else:
+                self._reserved[ingredient_id] = value
+
+    # --- Confirmación en grupo ---
+    def _flush_loop(self):
+        while True:
+            self._flush_wanted.wait()
+            if self.group_ms and not self._stop.is_set():
+                time.sleep(self.group_ms / 1000)   # Junta las ventas que llegan en esta ventana
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+                self._flush_wanted.clear()
+            if batch:
+                self._write(batch)
+            elif self._stop.is_set():
+                return
+
+    def _write(self, batch: list):
+        with self._file_lock:
+            offset = self._file.tell()
+            try:
+                self._file.write(b"".join(line for _, line, _ in batch))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                # Nada de este lote se confirmó: se quita del archivo y se liberan sus reservas
+                self.last_error = str(e)
+                try:
+                    self._file.truncate(offset)
+                    self._file.seek(offset)
+                except OSError:
+                    pass
+                with self._lock:
+                    for _, _, record in batch:
+                        self._reserve(record["stock"], -1)
+                with self._durable:
+                    self._failed.update({seq: str(e) for seq, _, _ in batch})
+                    self._durable.notify_all()
+                return
+            self.stats["fsyncs"] += 1
+            with self._lock:
+                self._pending.extend(batch)
+        with self._durable:
+            self._durable_seq = batch[-1][0]
+            self._durable.notify_all()
+        self._apply_wanted.set()
+
+    # --- Aplicación a la BD ---
+    def _apply_loop(self):
+        while True:
+            self._apply_wanted.wait(self.apply_ms / 1000)
+            self._apply_wanted.clear()
+            # Al detener se espera la sincronización final para aplicar todo lo confirmado
+            stopping = self._stop_apply.is_set() and not self._threads[0].is_alive()
+            while self._pending:
+                if not self._apply_batch():
+                    break
+            if self.path_size() > self.compact_bytes:
+                self._compact()
+            if stopping:
+                return
+            if self._pending:
+                time.sleep(self.apply_ms / 1000)   # Error de BD: se reintenta en el próximo ciclo
+
+    def _apply_batch(self) -> bool:
+        with self._lock:
+            batch = [self._pending[i] for i in range(min(self.apply_batch, len(self._pending)))]
+        if not batch:
+            return True
+
+        session_gen = self._db.get_session()
+        session = next(session_gen)
+        try:
+            orders = [
+                OrderCRUD.create_order(session, record["client_id"], record["total"],
+                                       datetime.fromisoformat(record["date"]), record["seq"])
+                for _, _, record in batch
+            ]
+            session.flush()   # Un INSERT ... RETURNING por lote para obtener los ids
+            OrderCRUD.add_details(session, [
+                {"order_id": order.id, **line} for order, (_, _, record) in zip(orders, batch) for line in record["lines"]
+            ])
+            IngredientCRUD.add_movements(session, [
+                {"ingredient_id": int(key), "kind": "venta", "quantity": -amount, "order_id": order.id,
+                 "date": order.date}
+                for order, (_, _, record) in zip(orders, batch) for key, amount in record["stock"].items()
+            ])
+            OrderCRUD.set_last_journal_seq(session, batch[-1][0])
+
+            with self._lock:
+                session.commit()
+                for _ in batch:
+                    self._pending.popleft()
+                for _, _, record in batch:
+                    self._reserve(record["stock"], -1)
+                self._applied_seq = batch[-1][0]
+        except SQLAlchemyError as e:
+            session.rollback()
+            self.last_error = str(e)
+            print(f"[Diario] Error al aplicar pedidos {batch[0][0]}-{batch[-1][0]}: {e}")
+            return False
+        finally:
+            session.close()
+
+        self.stats["batches"] += 1
+        self.stats["applied"] += len(batch)
+        return True
+
+    def path_size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def _compact(self):
+        """Reescribe el diario solo con lo sincronizado que falta aplicar."""
+        with self._file_lock:
+            with self._lock:
+                remaining = b"".join(line for _, line, _ in self._pending)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(remaining)
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, "ab")
+        self.stats["compactions"] += 1
+
+    # --- Consultas ---
+    def wait_applied(self, timeout: float = 30.0) -> bool:
+        """Espera a que todo lo confirmado hasta ahora esté en la BD (benchmarks, cierre)."""
+        deadline = time.perf_counter() + timeout
+        with self._lock:
+            queued = list(self._pending) + self._buffer
+            target = queued[-1][0] if queued else self._applied_seq
+        while time.perf_counter() < deadline:
+            with self._lock:
+                if self._applied_seq >= target:
+                    return True
+            self._apply_wanted.set()
+            time.sleep(0.005)
+        return False
+
+    def backlog(self) -> int:
+        """Pedidos confirmados al cajero que todavía no están en la BD."""
+        with self._lock:
+            return len(self._buffer) + len(self._pending)
@@ -0,0 +1,87 @@
+"""
+Capa común de generación de PDF.
+Los estilos y plantillas se construyen UNA sola vez y se comparten (solo lectura) entre renders;
+los documentos se renderizan en memoria (BytesIO) y se entregan como bytes o se vuelcan a un destino.
+"""
+import os
+import tempfile
+from functools import lru_cache
+from io import BytesIO
+
+# reportlab se importa dentro de cada función para no cargarlo al iniciar la aplicación
+
+@lru_cache(maxsize=1)
+def get_styles():
+    """Hoja de estilos compartida. Nunca se modifica después de creada."""
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    styles = getSampleStyleSheet()
+    # Copia del título para la carta (antes se mutaba styles['Title'] en cada llamada)
+    styles.add(ParagraphStyle('MenuTitle', parent=styles['Title'], textColor=colors.HexColor('#262433')))
+    return styles
+
+@lru_cache(maxsize=1)
+def get_menu_table_style():
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3B82F6')), # Encabezado Azul
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F3F4F6')), # Filas gris claro
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('ALIGN', (1, 1), (1, -1), 'RIGHT'), # Precio a la derecha
+    ])
+
+@lru_cache(maxsize=1)
+def get_receipt_table_style():
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#004D40')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (2, -3), (-1, -1), 'Helvetica-Bold'),
+        ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),
+        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#4CAF50')),
+        ('TEXTCOLOR', (0, -1), (-1, -1), colors.whitesmoke),
+    ])
+
+def render_pdf(story: list, pagesize=None) -> bytes:
+    """Renderiza una lista de flowables en memoria y retorna los bytes del PDF (A4 por defecto)."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+
+    buffer = BytesIO()
+    SimpleDocTemplate(buffer, pagesize=pagesize or A4).build(story)
+    return buffer.getvalue()
+
+def write_pdf(pdf_bytes: bytes, sink) -> str:
+    """
+    Vuelca un PDF ya renderizado a un destino.
+    sink: objeto con write() (socket, respuesta HTTP, BytesIO...) o ruta de archivo.
+    Las rutas se escriben de forma atómica (archivo temporal único + os.replace), así dos renders
+    concurrentes al mismo nombre nunca dejan un archivo mezclado.
+    Retorna la ruta escrita o '' si el destino era un stream.
+    """
+    if hasattr(sink, "write"):
+        sink.write(pdf_bytes)
+        return ""
+
+    directory = os.path.dirname(os.path.abspath(sink))
+    fd, tmp_path = tempfile.mkstemp(prefix=".pdf-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, sink)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return sink
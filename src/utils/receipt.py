@@ -1,8 +1,26 @@
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
 from src.models import OrderModel
+from src.utils.pdf_templates import get_styles, get_receipt_table_style, render_pdf, write_pdf
+from src.config.consts import RECEIPT_BACKEND, RECEIPT_OUTPUT, RECEIPT_WIDTH
+
+# --- Comandos ESC/POS (impresoras térmicas) ---
+ESC_INIT = b"\x1b@"
+ESC_CODEPAGE_PC858 = b"\x1bt\x13"   # Tabla de caracteres con tildes, Ñ y símbolo de euro
+ESC_ALIGN_LEFT = b"\x1ba\x00"
+ESC_ALIGN_CENTER = b"\x1ba\x01"
+ESC_BOLD_ON = b"\x1bE\x01"
+ESC_BOLD_OFF = b"\x1bE\x00"
+GS_SIZE_NORMAL = b"\x1d!\x00"
+GS_SIZE_DOUBLE = b"\x1d!\x11"
+ESC_FEED_3_LINES = b"\x1bd\x03"    # ESC d n: avanza n líneas (deja el texto pasado la cuchilla)
+GS_CUT = b"\x1dV\x00"              # GS V 0: corte completo, sin avance propio
+
+RECEIPT_BACKENDS = ("pdf", "text", "escpos")
+
+
+def _money(value: float) -> str:
+    """Formato chileno: $12.345"""
+    return f"${value:,.0f}".replace(",", ".")
+
 
 class Receipt:
     def __init__(self, order: OrderModel):
@@ -10,80 +28,190 @@ class Receipt:
         # Generamos un nombre único para no pisar archivos si se abren varios
         self.filepath = f"boleta_{self.order.id}.pdf"
 
-    def generate_pdf(self) -> tuple[bool, str]:
-        doc = SimpleDocTemplate(self.filepath, pagesize=A4)
-        styles = getSampleStyleSheet()
+    def _collect(self) -> dict:
+        """
+        Extrae una sola vez los datos de la boleta (cabecera, líneas y totales).
+        Todos los backends de salida (PDF, texto, ESC/POS) formatean este mismo diccionario.
+        """
+        client_name = self.order.client.name if self.order.client else "Cliente General"
+
+        lines = []
+        # Extraer líneas desde la relación ORM (order.details)
+        # Se usa el snapshot de la línea: nombre y precio cobrados, no los actuales del menú
+        for detail in self.order.details:
+            lines.append({
+                "qty": detail.quantity,
+                "name": detail.menu_name,
+                "price": detail.unit_price,
+                "subtotal": detail.subtotal,
+            })
+
+        total = self.order.total
+        subtotal_neto = total / 1.19
+
+        return {
+            "date": self.order.date.strftime('%d/%m/%Y %H:%M:%S'),
+            "order_id": self.order.id,
+            "client": client_name,
+            "lines": lines,
+            "subtotal": subtotal_neto,
+            "iva": total - subtotal_neto,
+            "total": total,
+        }
+
+    def generate(self, backend: str = None, output_path: str = None) -> tuple[bool, str]:
+        """
+        Genera la boleta con el backend configurado para esta terminal (RECEIPT_BACKEND).
+        output_path permite escribir en otro archivo o directamente en un dispositivo (ej. /dev/usb/lp0);
+        para PDF también acepta un stream con write().
+        """
+        backend = backend or RECEIPT_BACKEND
+
+        if backend == "pdf":
+            return self.generate_pdf(output_path)
+        if backend == "text":
+            return self.generate_text(output_path)
+        if backend == "escpos":
+            return self.generate_escpos(output_path)
+
+        return False, f"Backend de boleta desconocido: '{backend}'. Opciones: {', '.join(RECEIPT_BACKENDS)}"
+
+    def render_text(self, width: int = RECEIPT_WIDTH) -> str:
+        """Formatea la boleta como texto de ancho fijo (papel térmico de 80mm = 48 columnas)."""
+        data = self._collect()
+        return "\n".join(self._text_lines(data, width)) + "\n"
+
+    def render_escpos(self, width: int = RECEIPT_WIDTH) -> bytes:
+        """Formatea la boleta como flujo de bytes ESC/POS listo para enviar a la impresora."""
+        data = self._collect()
+        body = self._text_lines(data, width)
+
+        # La primera línea es el título: se imprime centrado, en negrita y a doble tamaño
+        title, rest = body[0].strip(), body[1:]
+        footer = rest.pop().strip()
+
+        out = [
+            ESC_INIT, ESC_CODEPAGE_PC858,
+            ESC_ALIGN_CENTER, ESC_BOLD_ON, GS_SIZE_DOUBLE,
+            title.encode("cp858", "replace"), b"\n",
+            GS_SIZE_NORMAL, ESC_BOLD_OFF, ESC_ALIGN_LEFT,
+            "\n".join(rest).encode("cp858", "replace"), b"\n",
+            ESC_ALIGN_CENTER, footer.encode("cp858", "replace"), b"\n",
+            ESC_FEED_3_LINES, GS_CUT,
+        ]
+        return b"".join(out)
+
+    def generate_text(self, output_path: str = None) -> tuple[bool, str]:
+        filepath = output_path or RECEIPT_OUTPUT or f"boleta_{self.order.id}.txt"
+        return self._write(filepath, self.render_text().encode("utf-8"))
+
+    def generate_escpos(self, output_path: str = None) -> tuple[bool, str]:
+        filepath = output_path or RECEIPT_OUTPUT or f"boleta_{self.order.id}.bin"
+        return self._write(filepath, self.render_escpos())
+
+    @staticmethod
+    def _write(filepath: str, payload: bytes) -> tuple[bool, str]:
+        try:
+            with open(filepath, "wb") as f:
+                f.write(payload)
+            return True, filepath
+        except OSError as e:
+            return False, f"Error al escribir la boleta en '{filepath}': {e}"
+
+    @staticmethod
+    def _text_lines(data: dict, width: int) -> list:
+        # Columnas: Cant. | Descripción | P. Unit. | Subtotal
+        qty_w, price_w, sub_w = 4, 9, 10
+        desc_w = width - qty_w - price_w - sub_w - 3
+        separator = "-" * width
+
+        lines = [
+            "Boleta Restaurante".center(width).rstrip(),
+            "Razón Social del Negocio",
+            "RUT: 12345678-9",
+            "Dirección: Calle Falsa 123",
+            f"Fecha Emisión: {data['date']}",
+            f"N° Pedido: {data['order_id']}",
+            f"Cliente: {data['client']}"[:width],
+            separator,
+            f"{'Cant':>{qty_w}} {'Descripción':<{desc_w}} {'P. Unit.':>{price_w}} {'Subtotal':>{sub_w}}",
+            separator,
+        ]
+
+        for line in data["lines"]:
+            lines.append(
+                f"{line['qty']:>{qty_w}} {line['name'][:desc_w]:<{desc_w}} "
+                f"{_money(line['price']):>{price_w}} {_money(line['subtotal']):>{sub_w}}"
+            )
+
+        label_w = width - sub_w - 1
+        lines += [
+            separator,
+            f"{'SUBTOTAL':>{label_w}} {_money(data['subtotal']):>{sub_w}}",
+            f"{'IVA (19%)':>{label_w}} {_money(data['iva']):>{sub_w}}",
+            f"{'TOTAL':>{label_w}} {_money(data['total']):>{sub_w}}",
+            separator,
+            "Gracias por su preferencia.".center(width).rstrip(),
+        ]
+        return lines
+
+    def build_pdf_story(self) -> list:
+        """Arma los flowables de la boleta usando los estilos y plantillas compartidos."""
+        from reportlab.platypus import Table, Paragraph, Spacer  # Importación diferida
+
+        styles = get_styles()
         story = []
-        
+        data = self._collect()
+
         # Encabezado con datos reales del pedido
-        client_name = self.order.client.name if self.order.client else "Cliente General"
-        
         story_items_texts = [
-            "<b>Boleta Restaurante</b>", 
+            "<b>Boleta Restaurante</b>",
             "<b>Razón Social del Negocio</b>",
-            "<b>RUT:</b> 12345678-9", 
+            "<b>RUT:</b> 12345678-9",
             "<b>Dirección:</b> Calle Falsa 123",
-            f"<b>Fecha Emisión:</b> {self.order.date.strftime('%d/%m/%Y %H:%M:%S')}",
-            f"<b>N° Pedido:</b> {self.order.id}",
-            f"<b>Cliente:</b> {client_name}"
+            f"<b>Fecha Emisión:</b> {data['date']}",
+            f"<b>N° Pedido:</b> {data['order_id']}",
+            f"<b>Cliente:</b> {data['client']}"
         ]
-        
+
         for i, txt in enumerate(story_items_texts):
             story.append(Paragraph(txt, styles['Heading1'] if i == 0 else styles['Normal']))
         story.append(Spacer(1, 18))
 
         # Tabla de Detalles
         table_data = [['Cant.', 'Descripción', 'P. Unit.', 'Subtotal']]
-        
-        # Extraer líneas desde la relación ORM (order.details)
-        for detail in self.order.details:
-            name = detail.menu_item.name
-            qty = detail.quantity
-            price = detail.menu_item.price
-            subtotal = detail.subtotal
-            
+
+        for line in data["lines"]:
             table_data.append([
-                str(qty),
-                name,
-                f"${price:,.0f}".replace(",", "."),
-                f"${subtotal:,.0f}".replace(",", ".")
+                str(line["qty"]),
+                line["name"],
+                _money(line["price"]),
+                _money(line["subtotal"])
             ])
-        
-        # Totales
-        total = self.order.total
-        subtotal_neto = total / 1.19
-        iva_amount = total - subtotal_neto
-        
-        subtotal_str = f"${subtotal_neto:,.0f}".replace(",", ".")
-        iva_str = f"${iva_amount:,.0f}".replace(",", ".")
-        total_str = f"${total:,.0f}".replace(",", ".")
 
-        table_data.append(["", "", "SUBTOTAL", subtotal_str])
-        table_data.append(["", "", "IVA (19%)", iva_str])
-        table_data.append(["", "", "TOTAL", total_str])
+        # Totales
+        table_data.append(["", "", "SUBTOTAL", _money(data["subtotal"])])
+        table_data.append(["", "", "IVA (19%)", _money(data["iva"])])
+        table_data.append(["", "", "TOTAL", _money(data["total"])])
 
-        # Estilos
         table = Table(table_data, colWidths=[40, 250, 80, 80])
-        style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#004D40')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTNAME', (2, -3), (-1, -1), 'Helvetica-Bold'),
-            ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),
-            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#4CAF50')),
-            ('TEXTCOLOR', (0, -1), (-1, -1), colors.whitesmoke),
-        ])
-        
-        table.setStyle(style)
+        table.setStyle(get_receipt_table_style())
         story.append(table)
         story.append(Spacer(1, 12))
         story.append(Paragraph("Gracias por su preferencia.", styles['Italic']))
+        return story
+
+    def render_pdf(self) -> bytes:
+        """Genera la boleta en memoria y retorna los bytes del PDF."""
+        return render_pdf(self.build_pdf_story())
 
+    def generate_pdf(self, sink=None) -> tuple[bool, str]:
+        """
+        Genera el PDF y lo vuelca en sink (ruta o stream con write()).
+        Sin sink se escribe en boleta_{id}.pdf.
+        """
         try:
-            doc.build(story)
-            return True, self.filepath
+            filepath = write_pdf(self.render_pdf(), sink or self.filepath)
+            return True, filepath
         except Exception as e:
-            return False, f"Error al generar el PDF: {e}"
\ No newline at end of file
+            return False, f"Error al generar el PDF: {e}"
@@ -0,0 +1,71 @@
+from src.utils.sql_profiler import sql_profiler
+from src.utils.ui_profiler import ui_profiler
+
+class RefreshScheduler:
+  """
+  Agrupa los refrescos de la interfaz en una sola pasada en tiempo ocioso.
+
+  Las acciones no refrescan vistas directamente: llaman a mark_dirty() con las vistas
+  afectadas y se agenda UNA sola pasada con after_idle(). En esa pasada cada vista sucia
+  se refresca una vez, en el orden en que se registró (una vista puede marcar a otra
+  posterior y se refresca en la misma pasada).
+
+  Varias marcas de la misma vista antes de la pasada (ráfagas del lector de códigos,
+  clics rápidos, acciones encadenadas) cuentan como refrescos fusionados ('coalesced').
+  """
+
+  def __init__(self, root):
+    self.root = root
+    self._views = {}        # nombre -> función de refresco (en orden de registro)
+    self._dirty = set()
+    self._scheduled = False
+    self._flushing = False
+    self.stats = {'requested': 0, 'executed': 0, 'coalesced': 0, 'passes': 0}
+
+  def register(self, name, fn):
+    self._views[name] = fn
+
+  def mark_dirty(self, *names):
+    for name in names:
+      if name not in self._views:
+        raise KeyError(f"Vista no registrada: {name}")
+      self.stats['requested'] += 1
+      if name in self._dirty:
+        self.stats['coalesced'] += 1
+      else:
+        self._dirty.add(name)
+
+    if self._dirty and not self._scheduled and not self._flushing:
+      self._scheduled = True
+      self.root.after_idle(self.flush)
+
+  def flush(self):
+    """Refresca cada vista sucia una vez. También se puede llamar directamente."""
+    self._scheduled = False
+    if not self._dirty:
+      return
+    self.stats['passes'] += 1
+    self._flushing = True
+    try:
+      for name, fn in self._views.items():
+        if name not in self._dirty:
+          continue
+        self._dirty.discard(name)
+        self.stats['executed'] += 1
+        try:
+          with sql_profiler.action(f"vista:{name}"):
+            ui_profiler.section(f"vista:{name}", fn)
+        except Exception as e:
+          print(f"Error al refrescar la vista '{name}': {e}")
+    finally:
+      self._flushing = False
+
+    # Marcas hacia vistas ya recorridas en esta pasada: van a la siguiente
+    if self._dirty and not self._scheduled:
+      self._scheduled = True
+      self.root.after_idle(self.flush)
+
+  def report(self) -> str:
+    s = self.stats
+    return (f"Refrescos: {s['requested']} solicitados, {s['executed']} ejecutados, "
+            f"{s['coalesced']} fusionados en {s['passes']} pasadas")
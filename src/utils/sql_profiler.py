@@ -0,0 +1,193 @@
+import contextvars
+import csv
+import re
+import threading
+import time
+import weakref
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from src.config.consts import SQL_PROFILE, SQL_REPEAT_LIMIT, SQL_SLOW_MS
+
+# Acción en curso (llamada a servicio o acción de la interfaz) del hilo/tarea actual
+_current_action = contextvars.ContextVar("sql_action", default=None)
+
+UNATTRIBUTED = "(sin acción)"
+
+_SPACES = re.compile(r"\s+")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+def statement_shape(statement: str) -> str:
+    """
+    Forma normalizada de una sentencia: sin espacios repetidos, literales como '?' y listas
+    IN (?, ?, ...) colapsadas. Dos consultas que solo cambian de parámetros tienen la misma forma.
+    """
+    shape = _LITERALS.sub("?", _SPACES.sub(" ", statement).strip())
+    return _IN_LIST.sub("(?...)", shape)
+
+class _ActionStats:
+    """Sentencias y tiempo SQL de UNA ejecución de una acción."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.statements = 0
+        self.sql_ms = 0.0
+        self.shapes = Counter()
+
+    def record(self, shape: str, ms: float):
+        self.statements += 1
+        self.sql_ms += ms
+        self.shapes[shape] += 1
+
+class SQLProfiler:
+    """
+    Instrumentación SQL con los eventos del motor de SQLAlchemy.
+
+    Cada sentencia se atribuye a la acción en curso (ver action() e instrument_service en
+    src/utils/telemetry.py), y
+    al cerrar la acción se acumulan: llamadas, sentencias, tiempo SQL y tiempo total.
+    - Sentencias más lentas que slow_ms quedan en slow_queries y se informan por consola.
+    - Si una misma forma de sentencia se repite más de repeat_limit veces dentro de una
+      acción, se informa como posible N+1 (queda en repeats).
+
+    Desactivado no registra eventos en el motor: el costo es un if por llamada a servicio.
+    """
+
+    def __init__(self, enabled: bool = False, slow_ms: float = 50.0, repeat_limit: int = 10):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.repeat_limit = repeat_limit
+        self.slow_queries = deque(maxlen=200)   # (acción, ms, sentencia)
+        self.repeats = deque(maxlen=200)        # (acción, veces, forma)
+        self._actions = {}
+        self._lock = threading.Lock()
+        self._engines = weakref.WeakSet()       # Motores conocidos (para enable() posterior)
+        self._attached = weakref.WeakSet()
+
+    # --- Motores ---
+    def attach(self, engine):
+        """Registra el motor; los eventos solo se escuchan mientras el perfilador esté activo."""
+        self._engines.add(engine)
+        if self.enabled and engine not in self._attached:
+            event.listen(engine, "before_cursor_execute", self._before_execute)
+            event.listen(engine, "after_cursor_execute", self._after_execute)
+            self._attached.add(engine)
+
+    def enable(self):
+        self.enabled = True
+        for engine in list(self._engines):
+            self.attach(engine)
+
+    def disable(self):
+        self.enabled = False
+        for engine in list(self._attached):
+            event.remove(engine, "before_cursor_execute", self._before_execute)
+            event.remove(engine, "after_cursor_execute", self._after_execute)
+            self._attached.discard(engine)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("sql_profiler_start", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("sql_profiler_start")
+        if not starts:
+            return  # Sentencia iniciada antes de activar el perfilador
+        ms = (time.perf_counter() - starts.pop()) * 1000
+        shape = statement_shape(statement)
+        action = _current_action.get()
+        if action is not None:
+            action.record(shape, ms)
+            name = action.name
+        else:
+            # Fuera de una acción cada sentencia cuenta como una llamada suelta
+            name = UNATTRIBUTED
+            stats = _ActionStats(name)
+            stats.record(shape, ms)
+            self._merge(stats, ms, check_repeats=False)
+
+        if ms >= self.slow_ms:
+            self.slow_queries.append((name, ms, shape))
+            print(f"[SQL lento] {ms:.1f} ms en '{name}': {shape[:200]}")
+
+    # --- Acciones ---
+    @contextmanager
+    def action(self, name: str):
+        """
+        Atribuye las sentencias del bloque a 'name'. Las acciones anidadas se cuentan en la
+        más externa (ej. un servicio llamado desde un refresco de la interfaz).
+        """
+        if not self.enabled or _current_action.get() is not None:
+            yield
+            return
+        stats = _ActionStats(name)
+        token = _current_action.set(stats)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            _current_action.reset(token)
+            self._merge(stats, (time.perf_counter() - start) * 1000)
+
+    def _merge(self, stats: _ActionStats, wall_ms: float, check_repeats: bool = True):
+        suspects = []
+        if check_repeats:
+            suspects = [(count, shape) for shape, count in stats.shapes.items() if count > self.repeat_limit]
+        with self._lock:
+            total = self._actions.setdefault(stats.name, {
+                "calls": 0, "statements": 0, "sql_ms": 0.0, "wall_ms": 0.0, "max_statements": 0, "n_plus_one": 0,
+            })
+            total["calls"] += 1
+            total["statements"] += stats.statements
+            total["sql_ms"] += stats.sql_ms
+            total["wall_ms"] += wall_ms
+            total["max_statements"] = max(total["max_statements"], stats.statements)
+            total["n_plus_one"] += len(suspects)
+            for count, shape in suspects:
+                self.repeats.append((stats.name, count, shape))
+        for count, shape in suspects:
+            print(f"[N+1] '{stats.name}' ejecutó {count} veces: {shape[:200]}")
+
+    # --- Resultados ---
+    def summary(self) -> list:
+        """Una fila por acción, ordenadas por tiempo SQL total (mayor primero)."""
+        with self._lock:
+            rows = [{"action": name, **values} for name, values in self._actions.items()]
+        for row in rows:
+            row["statements_per_call"] = row["statements"] / row["calls"]
+            row["sql_ms"] = round(row["sql_ms"], 3)
+            row["wall_ms"] = round(row["wall_ms"], 3)
+        return sorted(rows, key=lambda row: row["sql_ms"], reverse=True)
+
+    def report(self, top: int = 25) -> str:
+        lines = [
+            "--- Perfil SQL por acción ---",
+            f"{'Acción':<44} {'llamadas':>8} {'sent.':>7} {'sent./ll.':>9} {'máx':>5} {'SQL ms':>10} {'total ms':>10} {'N+1':>4}",
+        ]
+        for row in self.summary()[:top]:
+            lines.append(
+                f"{row['action'][:44]:<44} {row['calls']:>8} {row['statements']:>7} {row['statements_per_call']:>9.1f} "
+                f"{row['max_statements']:>5} {row['sql_ms']:>10.1f} {row['wall_ms']:>10.1f} {row['n_plus_one']:>4}"
+            )
+        lines.append(f"Sentencias lentas (>= {self.slow_ms:.0f} ms): {len(self.slow_queries)} | "
+                     f"posibles N+1 (> {self.repeat_limit} repeticiones): {len(self.repeats)}")
+        return "\n".join(lines)
+
+    def export_csv(self, path: str):
+        rows = self.summary()
+        fields = ["action", "calls", "statements", "statements_per_call", "max_statements", "sql_ms", "wall_ms", "n_plus_one"]
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def reset(self):
+        with self._lock:
+            self._actions.clear()
+            self.slow_queries.clear()
+            self.repeats.clear()
+
+# Instancia global: DatabaseManager registra aquí cada motor que crea
+sql_profiler = SQLProfiler(enabled=SQL_PROFILE, slow_ms=SQL_SLOW_MS, repeat_limit=SQL_REPEAT_LIMIT)
@@ -0,0 +1,58 @@
+import re
+import subprocess
+import sys
+import time
+
+class StartupTimer:
+    """
+    Mide el tiempo de pared de cada fase del arranque (imports, BD, ventana, primer idle).
+    mark(nombre) cierra la fase actual: registra el tiempo transcurrido desde la marca anterior.
+    """
+
+    def __init__(self, start: float = None):
+        self._start = start if start is not None else time.perf_counter()
+        self._last = self._start
+        self.phases = []
+
+    def mark(self, name: str):
+        now = time.perf_counter()
+        self.phases.append((name, (now - self._last) * 1000))
+        self._last = now
+
+    def report(self) -> str:
+        total = (self._last - self._start) * 1000
+        lines = ["--- Tiempos de arranque ---"]
+        for name, ms in self.phases:
+            lines.append(f"{name:<28} {ms:>9.1f} ms")
+        lines.append(f"{'TOTAL':<28} {total:>9.1f} ms")
+        return "\n".join(lines)
+
+def import_time_report(module: str = "src.restaurant", top: int = 15) -> str:
+    """
+    Ejecuta 'python -X importtime -c "import <module>"' en un proceso limpio y resume
+    los paquetes que más tiempo de importación consumen.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+
+    # Formato: "import time:  self [us] | cumulative | imported package"
+    # Se suma el tiempo propio (self) de cada módulo a su paquete raíz, sin contar dos veces
+    pattern = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+    totals = {}
+    for line in result.stderr.splitlines():
+        match = pattern.match(line)
+        if not match:
+            continue
+        root = match.group(3).split(".")[0]
+        totals[root] = totals.get(root, 0) + int(match.group(1))
+
+    if not totals:
+        return f"No se pudo medir la importación de '{module}':\n{result.stderr[-500:]}"
+
+    ranking = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    lines = [f"--- Importación de {module} (tiempo propio por paquete) ---"]
+    for name, us in ranking:
+        lines.append(f"{name:<28} {us / 1000:>9.1f} ms")
+    return "\n".join(lines)
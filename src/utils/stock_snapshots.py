@@ -0,0 +1,59 @@
+"""
+Foto periódica del stock (libro de movimientos, ver IngredientCRUD).
+
+Las ventas, entregas, ajustes y mermas solo agregan filas a ingredient_movements; el stock
+actual es la última foto (ingredients.quantity) más los movimientos posteriores. Este hilo
+materializa la foto cada STOCK_SNAPSHOT_MINUTES para que esa suma recorra pocas filas y las
+consultas de stock a una fecha partan de una foto cercana.
+"""
+import threading
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.crud.ingredient_crud import IngredientCRUD
+
+class StockSnapshotScheduler:
+    """Hilo de fondo que toma la foto del stock de una BD cada 'interval' segundos."""
+
+    def __init__(self, db_manager, interval: float):
+        self._db = db_manager
+        self.interval = interval
+        self.last_changed = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="stock-snapshots", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def run_once(self) -> int:
+        """Toma la foto y retorna cuántos ingredientes cambiaron desde la anterior."""
+        session_gen = self._db.get_session()
+        session = next(session_gen)
+        try:
+            changed = IngredientCRUD.take_snapshot(session)
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            self.last_error = str(e)
+            print(f"[Stock] Error al tomar la foto: {e}")
+            raise
+        finally:
+            session.close()
+        self.last_changed, self.last_error = changed, None
+        return changed
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except SQLAlchemyError:
+                pass   # Ya informado; se reintenta en el próximo intervalo
@@ -0,0 +1,114 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+class TaskRunner:
+  """
+  Ejecuta llamadas a servicios en un pool de hilos para no congelar la interfaz.
+
+  - submit() retorna un Future; el resultado (o el error) se entrega SIEMPRE en el hilo
+    de Tk, mediante after(), a los callbacks on_success / on_error.
+  - widget: se deshabilita mientras la tarea está en curso (estado "ocupado").
+  - key: semántica "la última solicitud gana". Una tarea nueva con la misma clave cancela
+    la anterior si aún no empezó, y si ya estaba corriendo su resultado se descarta.
+  """
+
+  def __init__(self, root, max_workers=4, poll_ms=25):
+    self.root = root
+    self.poll_ms = poll_ms
+    self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pos-task")
+    self._done = queue.SimpleQueue()   # Futures terminados, los escriben los hilos del pool
+    self._latest = {}                  # key -> Future vigente
+    self._busy = {}                    # widget -> [tareas activas, estado previo]
+    self._pending = 0
+    self._polling = False
+
+  def submit(self, fn, *args, on_success=None, on_error=None, widget=None, key=None, **kwargs):
+    """Debe llamarse desde el hilo de Tk (callbacks de botones, etc.)."""
+    if key is not None:
+      self.cancel(key)
+
+    future = self._executor.submit(fn, *args, **kwargs)
+    if key is not None:
+      self._latest[key] = future
+
+    self._pending += 1
+    self._set_busy(widget)
+    future.add_done_callback(lambda f: self._done.put((f, key, widget, on_success, on_error)))
+    self._ensure_polling()
+    return future
+
+  def cancel(self, key):
+    """Cancela la tarea vigente de esa clave (si ya está corriendo, su resultado se ignora)."""
+    future = self._latest.pop(key, None)
+    if future is not None:
+      future.cancel()
+
+  def shutdown(self):
+    self._executor.shutdown(wait=False, cancel_futures=True)
+
+  def _ensure_polling(self):
+    if not self._polling:
+      self._polling = True
+      self.root.after(self.poll_ms, self._drain)
+
+  def _drain(self):
+    try:
+      while True:
+        try:
+          future, key, widget, on_success, on_error = self._done.get_nowait()
+        except queue.Empty:
+          break
+
+        self._pending -= 1
+        self._release_busy(widget)
+
+        # Descartar resultados cancelados u obsoletos (hay una solicitud más nueva con la misma clave)
+        if future.cancelled():
+          continue
+        if key is not None:
+          if self._latest.get(key) is not future:
+            continue
+          del self._latest[key]
+
+        self._deliver(future, on_success, on_error)
+    finally:
+      # Aunque algo falle, el sondeo sigue: si no, los resultados siguientes se perderían
+      if self._pending > 0:
+        self.root.after(self.poll_ms, self._drain)
+      else:
+        self._polling = False
+
+  def _deliver(self, future, on_success, on_error):
+    """Entrega el resultado; un error dentro de un callback se informa y no corta el sondeo."""
+    error = future.exception()
+    try:
+      if error is None:
+        if on_success:
+          on_success(future.result())
+        return
+      if on_error:
+        on_error(error)
+        return
+    except Exception as callback_error:
+      error = callback_error
+    print(f"Error en tarea en segundo plano: {error}")
+
+  def _set_busy(self, widget):
+    if widget is None:
+      return
+    entry = self._busy.get(widget)
+    if entry is None:
+      self._busy[widget] = [1, widget.cget("state")]
+      widget.configure(state="disabled")
+    else:
+      entry[0] += 1
+
+  def _release_busy(self, widget):
+    entry = self._busy.get(widget)
+    if entry is None:
+      return
+    entry[0] -= 1
+    if entry[0] == 0:
+      del self._busy[widget]
+      if widget.winfo_exists():
+        widget.configure(state=entry[1])
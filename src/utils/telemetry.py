@@ -0,0 +1,327 @@
+import contextvars
+import functools
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from src.config.consts import TELEMETRY, TELEMETRY_EXPORT_SECONDS, TELEMETRY_METRICS_FILE, TELEMETRY_TRACE_FILE
+from src.utils.memory_watchdog import memory_watchdog
+from src.utils.sql_profiler import sql_profiler
+
+# Span en curso del hilo/tarea actual (los hijos lo toman como padre)
+_current_span = contextvars.ContextVar("telemetry_span", default=None)
+
+# Límites de los buckets del histograma de latencia (segundos)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_SQL_TARGET = re.compile(
+    r"^\s*(?:(UPDATE)\s+|(SELECT|INSERT|DELETE|WITH|CREATE|DROP|ALTER)\b.*?\b(?:FROM|INTO|TABLE)\s+)\"?(\w+)",
+    re.IGNORECASE | re.DOTALL,
+)
+_SQL_OPERATION = re.compile(r"^\s*(\w+)")
+
+@functools.lru_cache(maxsize=1024)
+def sql_span_name(statement: str) -> str:
+    """'UPDATE ingredients', 'SELECT orders'... (operación + primera tabla) para agrupar sentencias."""
+    match = _SQL_TARGET.match(statement)
+    if match:
+        return f"{(match.group(1) or match.group(2)).upper()} {match.group(3)}"
+    match = _SQL_OPERATION.match(statement)
+    return match.group(1).upper() if match else "SQL"
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start", "duration_ms", "status")
+
+    def __init__(self, name: str, kind: str, parent):
+        self.span_id = next(_span_ids)
+        self.trace_id = parent.trace_id if parent else f"{os.getpid():x}-{self.span_id:x}"
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.kind = kind
+        self.start = time.time()
+        self.duration_ms = 0.0
+        self.status = "ok"   # ok | failed (servicio retornó False) | error (excepción)
+
+    def to_dict(self) -> dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+_span_ids = itertools.count(1)
+
+class _Series:
+    """Contadores e histograma de un (tipo, nombre)."""
+    __slots__ = ("calls", "failures", "errors", "total", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.errors = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)   # El último es +Inf
+
+    def observe(self, seconds: float, status: str):
+        self.calls += 1
+        self.total += seconds
+        if status == "failed":
+            self.failures += 1
+        elif status == "error":
+            self.errors += 1
+        for i, limit in enumerate(BUCKETS):
+            if seconds <= limit:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+class Telemetry:
+    """
+    Métricas y trazas livianas de servicios, CRUD y SQL.
+
+    - Métricas: por (tipo, nombre) cuenta llamadas, fallos (el servicio retornó (False, ...)),
+      excepciones y un histograma de latencia. Se exportan en formato de texto de Prometheus
+      (write_metrics) a un archivo que puede leer el textfile collector de node_exporter.
+    - Trazas: cada llamada es un span con su padre (servicio -> CRUD -> SQL). Si hay archivo
+      de trazas se agrega una línea JSON por span (por lotes, desde el exportador).
+    - Errores de SQLite "database is locked" se cuentan aparte (contención en escrituras).
+
+    Desactivada, los métodos instrumentados solo evalúan un if y los motores no tienen
+    eventos registrados.
+    """
+
+    def __init__(self, enabled: bool = False, metrics_path: str = "", trace_path: str = ""):
+        self.enabled = enabled
+        self.metrics_path = metrics_path
+        self.trace_path = trace_path
+        self.lock_errors = 0
+        self.sql_errors = 0
+        self._series = {}
+        self._pending = []          # Spans terminados aún sin escribir
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._engines = weakref.WeakSet()
+        self._attached = weakref.WeakSet()
+        self._exporter = None
+        self._stop = threading.Event()
+
+    # --- Motores ---
+    def attach(self, engine):
+        self._engines.add(engine)
+        if self.enabled and engine not in self._attached:
+            event.listen(engine, "before_cursor_execute", self._before_execute)
+            event.listen(engine, "after_cursor_execute", self._after_execute)
+            event.listen(engine, "handle_error", self._on_error)
+            self._attached.add(engine)
+
+    def enable(self):
+        self.enabled = True
+        for engine in list(self._engines):
+            self.attach(engine)
+
+    def disable(self):
+        self.enabled = False
+        for engine in list(self._attached):
+            event.remove(engine, "before_cursor_execute", self._before_execute)
+            event.remove(engine, "after_cursor_execute", self._after_execute)
+            event.remove(engine, "handle_error", self._on_error)
+            self._attached.discard(engine)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["telemetry_start"] = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("telemetry_start", None)
+        if started is None:
+            return
+        span = Span(sql_span_name(statement), "sql", _current_span.get())
+        span.duration_ms = (time.perf_counter() - started) * 1000
+        self._finish(span)
+
+    def _on_error(self, context):
+        if context.connection is not None:
+            context.connection.info.pop("telemetry_start", None)
+        with self._lock:
+            self.sql_errors += 1
+            if "database is locked" in str(context.original_exception):
+                self.lock_errors += 1
+
+    # --- Spans ---
+    @contextmanager
+    def span(self, name: str, kind: str = "internal"):
+        """Mide el bloque como hijo del span en curso. Retorna el Span (o None si está desactivada)."""
+        if not self.enabled:
+            yield None
+            return
+        span = Span(name, kind, _current_span.get())
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.status = "error"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.duration_ms = (time.perf_counter() - started) * 1000
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        with self._lock:
+            series = self._series.get((span.kind, span.name))
+            if series is None:
+                series = self._series[(span.kind, span.name)] = _Series()
+            series.observe(span.duration_ms / 1000, span.status)
+            if self.trace_path:
+                self._pending.append(span)
+                flush = len(self._pending) >= 500   # El resto lo escribe el exportador
+            else:
+                flush = False
+        if flush:
+            self.flush_traces()
+
+    # --- Exportación ---
+    def flush_traces(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        # Lock aparte: los hilos que terminan spans no esperan la escritura del archivo
+        with self._write_lock, open(self.trace_path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(span.to_dict(), ensure_ascii=False) + "\n" for span in pending)
+
+    def summary(self) -> list:
+        """Resumen por (tipo, nombre): llamadas, fallos, errores y latencia media en ms."""
+        with self._lock:
+            items = list(self._series.items())
+        return [
+            {"kind": kind, "name": name, "calls": s.calls, "failures": s.failures, "errors": s.errors,
+             "avg_ms": round(s.total / s.calls * 1000, 3)}
+            for (kind, name), s in sorted(items, key=lambda item: item[1].total, reverse=True)
+        ]
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP pos_calls_total Llamadas por tipo (service, crud, sql) y nombre.",
+            "# TYPE pos_calls_total counter",
+        ]
+        with self._lock:
+            items = sorted(self._series.items())
+            lock_errors, sql_errors = self.lock_errors, self.sql_errors
+        for (kind, name), s in items:
+            lines.append(f'pos_calls_total{{kind="{kind}",name="{name}"}} {s.calls}')
+        lines += ["# HELP pos_failures_total Llamadas a servicios que retornaron (False, mensaje).",
+                  "# TYPE pos_failures_total counter"]
+        for (kind, name), s in items:
+            if kind == "service":
+                lines.append(f'pos_failures_total{{kind="{kind}",name="{name}"}} {s.failures}')
+        lines += ["# HELP pos_errors_total Llamadas que terminaron con una excepción.",
+                  "# TYPE pos_errors_total counter"]
+        for (kind, name), s in items:
+            lines.append(f'pos_errors_total{{kind="{kind}",name="{name}"}} {s.errors}')
+        lines += ["# HELP pos_duration_seconds Latencia por tipo y nombre.",
+                  "# TYPE pos_duration_seconds histogram"]
+        for (kind, name), s in items:
+            labels = f'kind="{kind}",name="{name}"'
+            cumulative = 0
+            for limit, count in zip(BUCKETS, s.buckets):
+                cumulative += count
+                lines.append(f'pos_duration_seconds_bucket{{{labels},le="{limit}"}} {cumulative}')
+            lines.append(f'pos_duration_seconds_bucket{{{labels},le="+Inf"}} {s.calls}')
+            lines.append(f"pos_duration_seconds_sum{{{labels}}} {s.total:.6f}")
+            lines.append(f"pos_duration_seconds_count{{{labels}}} {s.calls}")
+        lines += [
+            "# HELP pos_sql_errors_total Errores del driver SQL.",
+            "# TYPE pos_sql_errors_total counter",
+            f"pos_sql_errors_total {sql_errors}",
+            "# HELP pos_sql_lock_errors_total Esperas de bloqueo agotadas (database is locked).",
+            "# TYPE pos_sql_lock_errors_total counter",
+            f"pos_sql_lock_errors_total {lock_errors}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self, path: str = None):
+        """Escribe las métricas de forma atómica (un lector nunca ve el archivo a medias)."""
+        path = path or self.metrics_path
+        if not path:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def start_exporter(self, interval: float = TELEMETRY_EXPORT_SECONDS):
+        """Hilo de fondo que reescribe el archivo de métricas cada 'interval' segundos."""
+        if not self.enabled or self._exporter is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.write_metrics()
+                if self.trace_path:
+                    self.flush_traces()
+
+        self._stop.clear()
+        self._exporter = threading.Thread(target=loop, name="telemetry-exporter", daemon=True)
+        self._exporter.start()
+
+    def shutdown(self):
+        """Detiene el exportador y escribe lo pendiente (llamar al cerrar la aplicación)."""
+        self._stop.set()
+        self._exporter = None
+        if self.enabled:
+            self.write_metrics()
+            if self.trace_path:
+                self.flush_traces()
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._pending.clear()
+            self.lock_errors = self.sql_errors = 0
+
+# Instancia global: DatabaseManager registra aquí cada motor que crea
+telemetry = Telemetry(enabled=TELEMETRY, metrics_path=TELEMETRY_METRICS_FILE, trace_path=TELEMETRY_TRACE_FILE)
+
+def instrument_service(cls):
+    """
+    Decorador de clase para servicios: cada método público es un span 'service', una
+    acción del perfil SQL y una acción del diagnóstico de memoria ('Clase.método').
+    """
+    return _instrument(cls, "service")
+
+def instrument_crud(cls):
+    """Decorador de clase para CRUD: cada método estático público es un span 'crud'."""
+    return _instrument(cls, "crud")
+
+def _instrument(cls, kind: str):
+    for attr, member in list(vars(cls).items()):
+        if attr.startswith("_"):
+            continue
+        if isinstance(member, staticmethod):
+            setattr(cls, attr, staticmethod(_wrap(f"{cls.__name__}.{attr}", kind, member.__func__)))
+        elif callable(member) and not isinstance(member, classmethod):
+            setattr(cls, attr, _wrap(f"{cls.__name__}.{attr}", kind, member))
+    return cls
+
+def _wrap(name: str, kind: str, fn):
+    is_service = kind == "service"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not telemetry.enabled and not (is_service and (sql_profiler.enabled or memory_watchdog.enabled)):
+            return fn(*args, **kwargs)
+        with telemetry.span(name, kind) as span:
+            if is_service:
+                with sql_profiler.action(name), memory_watchdog.track(name):
+                    result = fn(*args, **kwargs)
+            else:
+                result = fn(*args, **kwargs)
+            # Los servicios informan errores de negocio como (False, mensaje, ...)
+            if span is not None and isinstance(result, tuple) and result and result[0] is False:
+                span.status = "failed"
+            return result
+    return wrapper
@@ -1,29 +1,45 @@
 from customtkinter import *
 
-from PIL import Image
-
 from types import SimpleNamespace as sn
 from tkinter import ttk
 
-def Button(master, text, command, **kwargs):
+from src.utils.image_cache import image_cache
+from src.utils.memory_watchdog import memory_watchdog
+from src.utils.ui_profiler import ui_profiler
+
+def Button(master, text, command, action=None, **kwargs):
+  # Con POS_UI_PROFILE=1 / POS_MEMORY_WATCH=1 el comando se mide como la acción 'action'
+  # (por defecto el nombre de la función, o el texto del botón si es una lambda)
+  if (ui_profiler.enabled or memory_watchdog.enabled) and command is not None and not action:
+    action = getattr(command, "__name__", "<lambda>")
+    action = text.split("\n")[0] if action == "<lambda>" else action
+  command = ui_profiler.wrap(action, memory_watchdog.wrap(action, command))
   return CTkButton(master, text=text, command=command,  **kwargs)
 
 def Label(master,  text,  **kwargs):
   return CTkLabel(master, text=text, **kwargs)
 
+def destroy_widget(widget):
+  """
+  Destruye el widget (y sus hijos) soltando los CTkImage que usan. CTkButton y CTkLabel
+  registran un callback en su CTkImage y destroy() no lo quita: como las imágenes de la
+  caché viven toda la sesión, cada botón destruido quedaría vivo a través de ellas.
+  """
+  pending = [widget]
+  while pending:
+    current = pending.pop()
+    pending.extend(current.winfo_children())
+    image = getattr(current, "_image", None)
+    if isinstance(image, CTkImage):
+      try:
+        image.remove_configure_callback(current._update_image)
+      except ValueError:
+        pass
+  widget.destroy()
+
 def load_image_to_btn(source, size=(24, 24)):
-  try:
-    img_pil = Image.open(source)
-  except FileNotFoundError:
-    print('Error: Imagen no encontrada')
-    img_pil = None
-
-  if img_pil:
-    return CTkImage(
-      light_image=img_pil,
-      dark_image=img_pil,
-      size=size
-    )
+  # Miniatura pre-escalada desde la caché (disco + LRU en memoria), None si no existe
+  return image_cache.get(source, size)
   
 class MsgBox(CTkToplevel):
    def __init__(self, master, title, msg):
@@ -36,40 +52,140 @@ class MsgBox(CTkToplevel):
     self.label = Label(self, msg, wraplength=280)
     self.label.pack(pady=20, padx=20)
 
-    self.button = Button(self, 'OK', self.destroy)
+    self.button = Button(self, 'OK', self.destroy, action='MsgBox.OK')
     self.button.pack(pady=10)
 
 
 class TABView(CTkTabview):
-  def __init__(self, master, size = (780, 580), **kwargs):
+  """
+  Tabview con pestañas por clave.
+  Con lazy=True el contenido de cada pestaña se construye recién la primera vez que se
+  selecciona (o con set_tab/build_tab), acortando el arranque de la aplicación.
+  """
+  def __init__(self, master, size = (780, 580), lazy=False, **kwargs):
     width, height = size
-    super().__init__(master, width=width, height=height, **kwargs)
+    self._user_command = kwargs.pop('command', None)
+    super().__init__(master, width=width, height=height, command=self._on_tab_change, **kwargs)
+    self.lazy = lazy
     self._tabs = {}
+    self._keys_by_title = {}
 
   def add_tabs(self, tabs_list:list[dict|sn]):
      for tab_props in tabs_list:
         self.add(**(vars(tab_props) if isinstance(tab_props, sn) else tab_props))
 
+     # Con carga diferida solo se construye la pestaña visible al inicio
+     if self.lazy and self._tabs:
+        self.build_tab(self._keys_by_title.get(self.get()))
+
   def add(self, key:str, title:str, content:callable):
     if key in self._tabs:
       print(f"La clave '{ key }' ya existe. No se añadió la pestaña.")
       return None
 
     frame = super().add(title)
-    content = content(frame)
+    self._tabs[key] = sn(frame=frame, title=title, content=None, builder=content, built=False)
+    self._keys_by_title[title] = key
+
+    if not self.lazy:
+      self.build_tab(key)
 
-    self._tabs[key] = sn(frame=frame, title=title, content=content)
+  def build_tab(self, key):
+    """Construye el contenido de la pestaña si aún no existe. Retorna su información."""
+    tab_info = self.get_tab(key)
+    if tab_info and not tab_info.built:
+      tab_info.built = True
+      tab_info.content = tab_info.builder(tab_info.frame)
+    return tab_info
+
+  def is_built(self, key) -> bool:
+    tab_info = self.get_tab(key)
+    return bool(tab_info and tab_info.built)
+
+  def _on_tab_change(self):
+    self.build_tab(self._keys_by_title.get(self.get()))
+    if self._user_command:
+      self._user_command()
 
   def get_tab(self, key):
     return self._tabs.get(key)
 
   def set_tab(self, key: str):
-     tab_info = self.get_tab(key)
+     tab_info = self.build_tab(key)
      if tab_info:
         super().set(tab_info.title)
      else:
         print(f'Pestaña con la clave "{key}" no se encontró.') 
 
+class SearchComboBox(CTkComboBox):
+  """
+  Combo con búsqueda incremental (type-ahead) en lugar de una lista completa.
+
+  search(texto) -> lista de (etiqueta, valor). Se consulta al escribir, con debounce de
+  delay_ms, y el desplegable muestra solo esas coincidencias. fixed: opciones que siempre
+  van al inicio (ej. [("Todos", 0)]). Enter elige la primera coincidencia.
+  on_select(valor) se llama al elegir una opción.
+  """
+  def __init__(self, master, search, fixed=None, on_select=None, delay_ms=150, **kwargs):
+    super().__init__(master, values=[], command=self._on_choice, **kwargs)
+    self._search = search
+    self._fixed = list(fixed or [])
+    self._on_select = on_select
+    self._delay_ms = delay_ms
+    self._after_id = None
+    self._query = ""
+    self._options = {}   # etiqueta -> valor
+    self.bind("<KeyRelease>", self._on_key)
+
+  def refresh(self, query=None):
+    """Vuelve a consultar (por defecto con el último texto buscado) y actualiza las opciones."""
+    if query is not None:
+      self._query = query
+    self._options = dict(self._fixed)
+    self._options.update(self._search(self._query))
+    self.configure(values=list(self._options))
+
+  def get_value(self):
+    """Valor de la opción escrita/elegida, o None si el texto no corresponde a ninguna."""
+    return self._options.get(self.get())
+
+  def _on_key(self, event):
+    if event.keysym in ("Return", "KP_Enter"):
+      self._cancel_pending()
+      self._select_first()
+      return
+    if event.keysym in ("Up", "Down", "Left", "Right", "Tab", "Escape"):
+      return
+    self._cancel_pending()
+    self._after_id = self.after(self._delay_ms, self._run_search)
+
+  def _cancel_pending(self):
+    if self._after_id is not None:
+      self.after_cancel(self._after_id)
+      self._after_id = None
+
+  def _run_search(self):
+    self._after_id = None
+    text = self.get()
+    # Ya es una opción válida (ej. recién elegida): no hace falta consultar
+    if text not in self._options:
+      self.refresh(text)
+
+  def _select_first(self):
+    text = self.get()
+    if text not in self._options:
+      self.refresh(text)
+      matches = [label for label in self._options if label not in dict(self._fixed)]
+      if not matches:
+        return
+      text = matches[0]
+      self.set(text)
+    self._on_choice(text)
+
+  def _on_choice(self, label):
+    if self._on_select:
+      self._on_select(self._options.get(label))
+
 class Fonts:
   _fonts = {}
   
@@ -106,11 +222,29 @@ class Frame(CTkFrame):
       self.grid(**grid_args)
 
 class TreeViewManager:
-  def __init__(self, parent, columns, show_scrollbar=True):
+  """
+  Envoltorio de ttk.Treeview con tres modos de carga:
+
+  - Simple (por defecto): load_data borra y reinserta todas las filas.
+  - Con clave (key=índice de columna o función): load_data compara contra lo que ya
+    está en pantalla e inserta/actualiza/elimina solo lo que cambió. Se conservan la
+    selección y la posición del scroll.
+  - Virtual (virtual=True): el widget mantiene solo la ventana visible de `height` filas,
+    pedidas bajo demanda a una fuente de datos (set_data_source). Sirve para tablas de
+    cientos de miles de filas paginadas desde la BD. Con key, la selección se sigue por
+    la clave de la fila aunque cambie su posición.
+  """
+  def __init__(self, parent, columns, show_scrollbar=True, key=None, virtual=False, height=15):
     self.frame = ttk.Frame(parent)
     self.columns = columns
     self.row_count = 0
 
+    # Modo con clave: iid del Treeview = clave de la fila
+    self.key = (lambda values, i=key: values[i]) if isinstance(key, int) else key
+    self._rows = {}      # iid -> (valores, tag) tal como están en pantalla
+    self._order = []     # iids en el orden mostrado
+    self.last_diff = {'inserted': 0, 'updated': 0, 'deleted': 0}
+
     column_ids = list(self.columns.keys())
     self.tree = ttk.Treeview(self.frame, columns=column_ids, show="headings")
 
@@ -123,11 +257,19 @@ class TreeViewManager:
 
     self.tree.tag_configure('oddrow', background='#E8E8E8')
     self.tree.tag_configure('evenrow', background='white')
-    
+
+    self.virtual = virtual
+    self.scrollbar = None
+    if virtual:
+        self._setup_virtual(height)
+
     if show_scrollbar:
-        scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side="right", fill="y")
+        # En modo virtual el scrollbar representa el total de filas, no las del widget
+        command = self._on_scrollbar if virtual else self.tree.yview
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=command)
+        if not virtual:
+            self.tree.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.pack(side="right", fill="y")
 
     self.tree.pack(side="left", fill="both", expand=True)
 
@@ -143,20 +285,80 @@ class TreeViewManager:
   def insert_row(self, values, at_end=True):
     tag = 'evenrow' if self.row_count % 2 == 0 else 'oddrow'
     index = 'end' if at_end else 0
-    self.tree.insert("", index, values=values, tags=(tag,))
+    iid = str(self.key(values)) if self.key else None
+    iid = self.tree.insert("", index, iid=iid, values=values, tags=(tag,))
+    if self.key:
+        self._rows[iid] = (tuple(values), tag)
+        self._order.insert(len(self._order) if at_end else 0, iid)
     self.row_count += 1
 
   def load_data(self, data_list):
+    if self.virtual:
+        # Una lista en memoria también puede mostrarse virtualizada
+        self.set_data_source(lambda: len(data_list), lambda start, stop: data_list[start:stop])
+        return
+
+    if self.key:
+        self._load_diff(data_list)
+        return
+
     self.clear_data()
     for row_values in data_list:
         self.insert_row(row_values)
 
+  def _load_diff(self, data_list):
+    """Aplica solo las diferencias entre las filas en pantalla y data_list (claves únicas)."""
+    tree = self.tree
+    new_rows = {}
+    new_order = []
+    inserted = updated = 0
+
+    for index, values in enumerate(data_list):
+        iid = str(self.key(values))
+        row = (tuple(values), 'evenrow' if index % 2 == 0 else 'oddrow')
+        current = self._rows.get(iid)
+
+        if current is None:
+            tree.insert("", "end", iid=iid, values=row[0], tags=(row[1],))
+            inserted += 1
+        elif current != row:
+            tree.item(iid, values=row[0], tags=(row[1],))
+            updated += 1
+
+        new_rows[iid] = row
+        new_order.append(iid)
+
+    removed = [iid for iid in self._order if iid not in new_rows]
+    if removed:
+        tree.delete(*removed)
+
+    # Reordenar solo si el orden cambió (una sola llamada a Tk)
+    if [iid for iid in self._order if iid in new_rows] + [iid for iid in new_order if iid not in self._rows] != new_order:
+        tree.set_children("", *new_order)
+
+    self._rows = new_rows
+    self._order = new_order
+    self.row_count = len(new_order)
+    self.last_diff = {'inserted': inserted, 'updated': updated, 'deleted': len(removed)}
+
   def clear_data(self):
-    for item in self.tree.get_children():
-        self.tree.delete(item)
+    if self.virtual:
+        self.set_data_source(lambda: 0, lambda start, stop: [])
+        return
+
+    children = self.tree.get_children()
+    if children:
+        self.tree.delete(*children)
+    self._rows = {}
+    self._order = []
     self.row_count = 0
 
   def get_selected_item_values(self):
+    if self.virtual:
+        # Los valores de la fila que se seleccionó, no lo que hoy ocupa esa posición: con
+        # pedidos nuevos arriba el mismo índice apunta a otra fila
+        return list(self._selected_values) if self._selected_values is not None else None
+
     selected_items = self.tree.selection()
     if not selected_items:
         return None
@@ -171,4 +373,129 @@ class TreeViewManager:
         if values:
             callback(values)
     
-    self.tree.bind("<<TreeviewSelect>>", _on_select)
\ No newline at end of file
+    self.tree.bind("<<TreeviewSelect>>", _on_select, add="+")
+
+  # --- Modo virtual ---
+
+  def _setup_virtual(self, height):
+    self.height = height
+    self.tree.configure(height=height, selectmode="browse")
+    self._offset = 0
+    self._selected_index = None
+    self._selected_values = None   # Fila seleccionada (se identifica con key o por sus valores)
+    self._count = lambda: 0
+    self._fetch = lambda start, stop: []
+    self._slots = [f"v{i}" for i in range(height)]   # Filas fijas del widget que se reciclan
+    self._slot_rows = [None] * height
+    self._render_pending = False
+
+    self.tree.bind("<<TreeviewSelect>>", self._on_virtual_select)
+    self.tree.bind("<MouseWheel>", lambda e: self._scroll_by(-1 if e.delta > 0 else 1) or "break")
+    self.tree.bind("<Button-4>", lambda e: self._scroll_by(-1) or "break")
+    self.tree.bind("<Button-5>", lambda e: self._scroll_by(1) or "break")
+    self.tree.bind("<Up>", lambda e: self._move_selection(-1) or "break")
+    self.tree.bind("<Down>", lambda e: self._move_selection(1) or "break")
+    self.tree.bind("<Prior>", lambda e: self._scroll_by(-self.height) or "break")
+    self.tree.bind("<Next>", lambda e: self._scroll_by(self.height) or "break")
+
+  def set_data_source(self, count, fetch):
+    """
+    count(): total de filas. fetch(start, stop): filas [start, stop) como listas de valores.
+    Conserva el desplazamiento actual (acotado al nuevo total).
+    """
+    self._count = count
+    self._fetch = fetch
+    self.refresh()
+
+  def refresh(self):
+    """Vuelve a consultar la fuente y redibuja solo la ventana visible."""
+    self.row_count = self._count()
+    self._offset = max(0, min(self._offset, self.row_count - self.height))
+    if self._selected_index is not None and self._selected_index >= self.row_count:
+        self._selected_index = self._selected_values = None
+    self._render()
+
+  def _scroll_by(self, rows):
+    self._scroll_to(self._offset + rows)
+
+  def _scroll_to(self, offset):
+    offset = max(0, min(int(offset), self.row_count - self.height))
+    if offset != self._offset:
+        self._offset = offset
+        self._schedule_render()
+
+  def _on_scrollbar(self, *args):
+    if args[0] == "moveto":
+        self._scroll_to(float(args[1]) * self.row_count)
+    elif args[0] == "scroll":
+        step = int(args[1]) * (self.height if args[2] == "pages" else 1)
+        self._scroll_by(step)
+
+  def _move_selection(self, delta):
+    if not self.row_count:
+        return
+    index = 0 if self._selected_index is None else self._selected_index + delta
+    self._selected_index = max(0, min(index, self.row_count - 1))
+    self._selected_values = None   # Se toma de la fila al redibujar
+    # Desplazar la ventana para que la fila seleccionada quede visible
+    if self._selected_index < self._offset:
+        self._offset = self._selected_index
+    elif self._selected_index >= self._offset + self.height:
+        self._offset = self._selected_index - self.height + 1
+    self._schedule_render()
+
+  def _on_virtual_select(self, event):
+    selected = self.tree.selection()
+    if selected:
+        slot = self._slots.index(selected[0])
+        self._selected_index = self._offset + slot
+        self._selected_values = self._slot_rows[slot][0] if self._slot_rows[slot] else None
+
+  def _row_key(self, values):
+    return self.key(values) if self.key else tuple(values)
+
+  def _schedule_render(self):
+    # Varios eventos de scroll seguidos se agrupan en un solo redibujado
+    if not self._render_pending:
+        self._render_pending = True
+        self.tree.after_idle(self._render)
+
+  def _render(self):
+    self._render_pending = False
+    rows = self._fetch(self._offset, self._offset + self.height) if self.row_count else []
+
+    for i, slot in enumerate(self._slots):
+        if i < len(rows):
+            absolute = self._offset + i
+            row = (tuple(rows[i]), 'evenrow' if absolute % 2 == 0 else 'oddrow')
+            if self._slot_rows[i] is None:
+                self.tree.insert("", i, iid=slot, values=row[0], tags=(row[1],))
+            elif self._slot_rows[i] != row:
+                self.tree.item(slot, values=row[0], tags=(row[1],))
+            self._slot_rows[i] = row
+        elif self._slot_rows[i] is not None:
+            self.tree.delete(slot)
+            self._slot_rows[i] = None
+
+    # La selección sigue a la fila, no a la posición en pantalla: si los datos se corrieron se
+    # busca en la ventana por su clave y, si ya no está, se quita la selección
+    if self._selected_index is not None and self._offset <= self._selected_index < self._offset + len(rows):
+        row = rows[self._selected_index - self._offset]
+        if self._selected_values is None:
+            self._selected_values = tuple(row)
+        elif self._row_key(row) != self._row_key(self._selected_values):
+            keys = [self._row_key(values) for values in rows]
+            if self._row_key(self._selected_values) in keys:
+                self._selected_index = self._offset + keys.index(self._row_key(self._selected_values))
+            else:
+                self._selected_index = self._selected_values = None
+    visible = self._selected_index is not None and self._offset <= self._selected_index < self._offset + len(rows)
+    target = (self._slots[self._selected_index - self._offset],) if visible else ()
+    if self.tree.selection() != target:
+        self.tree.selection_set(target)
+
+    if self.scrollbar is not None:
+        if self.row_count:
+            self.scrollbar.set(self._offset / self.row_count, min(1.0, (self._offset + self.height) / self.row_count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
@@ -0,0 +1,190 @@
+import cProfile
+import functools
+import io
+import os
+import pstats
+import re
+import time
+from collections import deque
+
+from src.config.consts import UI_PROFILE, UI_PROFILE_DIR, UI_PROFILE_SLOW_MS
+
+# Límites de los buckets del histograma (ms): 1, 2, 3 y 6 cuadros a 60 Hz, luego segundos
+BUCKETS_MS = (16, 33, 50, 100, 200, 500, 1000, 2000)
+
+class _ActionStats:
+  """Duraciones (clic -> ocioso) de una acción: histograma, recientes para percentiles y máximos."""
+
+  def __init__(self):
+    self.count = 0
+    self.total_ms = 0.0
+    self.callback_ms = 0.0
+    self.max_ms = 0.0
+    self.slow = 0
+    self.buckets = [0] * (len(BUCKETS_MS) + 1)   # El último es "más de 2000 ms"
+    self.recent = deque(maxlen=500)
+
+  def observe(self, total_ms, callback_ms, slow):
+    self.count += 1
+    self.total_ms += total_ms
+    self.callback_ms += callback_ms
+    self.max_ms = max(self.max_ms, total_ms)
+    self.slow += slow
+    self.recent.append(total_ms)
+    for i, limit in enumerate(BUCKETS_MS):
+      if total_ms <= limit:
+        self.buckets[i] += 1
+        return
+    self.buckets[-1] += 1
+
+  def percentile(self, pct):
+    ordered = sorted(self.recent)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+class UIProfiler:
+  """
+  Mide la latencia de las interacciones: desde que Tk invoca el comando de un botón hasta
+  que vuelve a estar ocioso (incluye la pasada de refresco, popups y redibujos agendados).
+
+  - wrap(nombre, comando) envuelve el comando; desactivado retorna el mismo comando.
+  - Cada acción tiene su histograma; las que superan slow_ms guardan un perfil de cProfile
+    (.prof, se abre con pstats o snakeviz) y se informan por consola con sus funciones más
+    costosas (máximo max_snapshots por acción).
+  - report() ordena las acciones por p95; F12 muestra/oculta un overlay con ese ranking.
+
+  El trabajo que termina en segundo plano (TaskRunner) queda fuera: se mide hasta que la
+  interfaz vuelve a responder, no hasta que llega el resultado.
+  """
+
+  def __init__(self, enabled=False, slow_ms=100.0, profile_dir=UI_PROFILE_DIR, max_snapshots=3):
+    self.enabled = enabled
+    self.slow_ms = slow_ms
+    self.profile_dir = profile_dir
+    self.max_snapshots = max_snapshots
+    self.root = None
+    self.snapshots = []           # (acción, ms, ruta del .prof)
+    self._stats = {}
+    self._sections = {}           # Tramos internos medidos con section() (ej. vistas del refresco)
+    self._profiling = False       # cProfile admite un solo perfilador activo por hilo
+    self._overlay = None
+
+  def install(self, root):
+    self.root = root
+    if self.enabled:
+      root.bind_all("<F12>", lambda event: self.toggle_overlay())
+
+  # --- Medición ---
+  def wrap(self, name, fn):
+    if not self.enabled or fn is None:
+      return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+      return self._run(name, fn, args, kwargs)
+    return wrapper
+
+  def _run(self, name, fn, args, kwargs):
+    start = time.perf_counter()
+    profiler = None
+    if not self._profiling:
+      profiler = cProfile.Profile()
+      self._profiling = True
+      profiler.enable()
+    try:
+      return fn(*args, **kwargs)
+    finally:
+      callback_ms = (time.perf_counter() - start) * 1000
+      if self.root is None:
+        self._finish(name, start, callback_ms, profiler)
+      else:
+        # Las pasadas de refresco y redibujos ya agendados corren antes que este callback
+        self.root.after_idle(lambda: self._finish(name, start, callback_ms, profiler))
+
+  def _finish(self, name, start, callback_ms, profiler):
+    total_ms = (time.perf_counter() - start) * 1000
+    if profiler is not None:
+      profiler.disable()
+      self._profiling = False
+
+    slow = total_ms >= self.slow_ms
+    self._stats.setdefault(name, _ActionStats()).observe(total_ms, callback_ms, slow)
+    if slow:
+      print(f"[UI lento] '{name}': {total_ms:.0f} ms hasta ocioso ({callback_ms:.0f} ms en el comando)")
+      if profiler is not None and sum(1 for s in self.snapshots if s[0] == name) < self.max_snapshots:
+        self._save_snapshot(name, total_ms, profiler)
+    self._update_overlay()
+
+  def section(self, name, fn):
+    """Ejecuta fn midiendo solo su duración (sin perfil), ej. cada vista de una pasada de refresco."""
+    if not self.enabled:
+      return fn()
+    start = time.perf_counter()
+    try:
+      return fn()
+    finally:
+      ms = (time.perf_counter() - start) * 1000
+      self._sections.setdefault(name, _ActionStats()).observe(ms, ms, ms >= self.slow_ms)
+
+  def _save_snapshot(self, name, total_ms, profiler):
+    os.makedirs(self.profile_dir, exist_ok=True)
+    safe_name = re.sub(r"\W+", "_", name).strip("_") or "accion"
+    path = os.path.join(self.profile_dir, f"{safe_name}_{time.strftime('%Y%m%d_%H%M%S')}_{int(total_ms)}ms.prof")
+    profiler.dump_stats(path)
+    self.snapshots.append((name, total_ms, path))
+
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(8)
+    top = [line for line in out.getvalue().splitlines() if line.strip()][-9:]
+    print(f"  perfil guardado en {path}")
+    print("\n".join(f"    {line}" for line in top))
+
+  # --- Resultados ---
+  def ranking(self, include_sections=True):
+    """[(nombre, stats)] ordenado por p95 descendente."""
+    items = list(self._stats.items())
+    if include_sections:
+      items += list(self._sections.items())
+    return sorted(items, key=lambda item: item[1].percentile(95), reverse=True)
+
+  def report(self, top=20):
+    lines = [
+      "--- Latencia de interacciones (clic -> ocioso) ---",
+      f"{'Acción':<36} {'n':>5} {'p50 ms':>8} {'p95 ms':>8} {'máx ms':>8} {'lentas':>6} {'cmd ms':>8}",
+    ]
+    for name, s in self.ranking()[:top]:
+      lines.append(
+        f"{name[:36]:<36} {s.count:>5} {s.percentile(50):>8.1f} {s.percentile(95):>8.1f} "
+        f"{s.max_ms:>8.1f} {s.slow:>6} {s.callback_ms / s.count:>8.1f}"
+      )
+    lines.append(f"Umbral {self.slow_ms:.0f} ms | perfiles guardados: {len(self.snapshots)} en {self.profile_dir}")
+    return "\n".join(lines)
+
+  def histogram(self, name):
+    """[(límite ms, cantidad)] de una acción; el último límite es None (más de 2000 ms)."""
+    stats = self._stats.get(name) or self._sections.get(name)
+    if not stats:
+      return []
+    return list(zip(list(BUCKETS_MS) + [None], stats.buckets))
+
+  # --- Overlay ---
+  def toggle_overlay(self):
+    if self._overlay is not None and self._overlay.winfo_exists():
+      self._overlay.destroy()
+      self._overlay = None
+      return
+
+    from customtkinter import CTkLabel, CTkToplevel
+    self._overlay = CTkToplevel(self.root)
+    self._overlay.title("Latencia de la interfaz")
+    self._overlay.attributes("-topmost", True)
+    self._overlay_label = CTkLabel(self._overlay, text="", font=("Courier", 11), justify="left", anchor="w")
+    self._overlay_label.pack(padx=10, pady=10, fill="both")
+    self._update_overlay()
+
+  def _update_overlay(self):
+    if self._overlay is None or not self._overlay.winfo_exists():
+      return
+    self._overlay_label.configure(text=self.report(top=10))
+
+# Instancia global: tools.Button envuelve los comandos con ella
+ui_profiler = UIProfiler(enabled=UI_PROFILE, slow_ms=UI_PROFILE_SLOW_MS)